@@ -27,6 +27,24 @@ class Move(BaseModel):
     degrees: Optional[bool] = True
 
 
+class Pose(BaseModel):
+    x: float
+    y: float
+    z: float
+    roll: float
+    pitch: float
+    yaw: float
+
+
+class MoveArc(BaseModel):
+    via: Pose
+    end: Pose
+    full_circle: bool = False
+    max_chord_error: float = 0.1
+    wait: Optional[bool] = False
+    degrees: Optional[bool] = True
+
+
 class Tool(BaseModel):
     toolValue: float
     wait: Optional[bool] = False
@@ -115,6 +133,25 @@ def move_relative(
         return JSONResponse(content={"message": "Not moved"}, status_code=400)
 
 
+@router.post("/arc/")
+def move_arc(
+    move: MoveArc, controller: ArmController = controller_dependency
+) -> JSONResponse:
+    via = ArmPose(**move.via.model_dump(), degree=move.degrees)
+    end = ArmPose(**move.end.model_dump(), degree=move.degrees)
+
+    move_is_possible = controller.move_arc(
+        via, end, move.max_chord_error, full_circle=move.full_circle
+    )
+
+    if move.wait:
+        controller.wait_done_moving()
+    if move_is_possible:
+        return JSONResponse(content={"message": "Moved"}, status_code=200)
+    else:
+        return JSONResponse(content={"message": "Not moved"}, status_code=400)
+
+
 @router.post("/pose/validate/")
 def valid_pose(
     move: Move, controller: ArmController = controller_dependency
@@ -131,6 +168,22 @@ def valid_pose(
         return JSONResponse(content={"message": "Pose is not valid"}, status_code=400)
 
 
+@router.get("/workspace/")
+def workspace(controller: ArmController = controller_dependency) -> JSONResponse:
+    index = controller.reachability
+    if index is None:
+        return JSONResponse(
+            content={"message": "No reachability index"}, status_code=404
+        )
+    return JSONResponse(
+        content={
+            "voxel_size": index.voxel_size,
+            "points": index.reachable_region().round(3).tolist(),
+        },
+        status_code=200,
+    )
+
+
 # --------
 # Joints
 # --------
@@ -69,6 +69,29 @@ def status(
     return status_dict
 
 
+@router.get("/commands/")
+def commands(
+    controller: ArmController = controller_dependency,
+    count: int = Query(20, description="Number of recent commands"),
+) -> Dict[Any, Any]:
+    ledger = controller.commands
+    return {
+        "pending": len(ledger.pending),
+        "latency": ledger.latency_stats(),
+        "recent": [
+            {
+                "sequence": command.sequence,
+                "name": command.name,
+                "numMoves": command.num_moves,
+                "queueLatency": command.queue_latency,
+                "latency": command.latency,
+                "completed": command.completed,
+            }
+            for command in ledger.recent(count)
+        ],
+    }
+
+
 @router.post("/stop/")
 def stop_movement(controller: ArmController = controller_dependency) -> Dict[Any, Any]:
     controller.stop_movement()
@@ -7,6 +7,7 @@ from ribot.controller import ArmController, SingletonArmController
 
 PARENT_DIR = Path(__file__).parent.parent
 CONFIG_FILE = PARENT_DIR / "config" / "main_arm.toml"
+REACHABILITY_FILE = PARENT_DIR / "config" / "reachability.bin"
 
 
 PRINT_DEBUG = False
@@ -35,6 +36,7 @@ def get_controller() -> ArmController:
 
 def start_controller() -> None:
     controller = get_controller()
+    controller.use_reachability_index(REACHABILITY_FILE)
     controller.start()
 
 
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
 import dataclasses
-from typing import Dict, List, Optional, Tuple
+import math
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from ribot.utils.algebra import (
+    create_rotation_matrices_from_euler_angles,
     create_rotation_matrix_from_euler_angles,
     degree2rad,
     extract_euler_angles,
+    extract_euler_angles_batch,
     nearest_by_2pi_ref,
+    nearest_by_2pi_ref_batch,
+    rotation_vectors_from_matrices,
+    transformation_matrices,
     transformation_matrix,
+    x_rotation_matrices,
     x_rotation_matrix,
+    y_rotation_matrices,
     y_rotation_matrix,
+    z_rotation_matrices,
     z_rotation_matrix,
 )
 from ribot.utils.prints import console
@@ -26,9 +37,15 @@ from ribot.utils.prints import console
 
 class Joint:
     def __init__(self, min_val: float = -np.pi / 2, max_val: float = np.pi / 2) -> None:
+        self.revision: int = 0
         self.min_val = min_val
         self.max_val = max_val
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name != "revision":
+            super().__setattr__("revision", self.__dict__.get("revision", 0) + 1)
+
     def in_bounds(self, angle: float) -> bool:
         return angle >= self.min_val and angle <= self.max_val
 
@@ -39,6 +56,9 @@ class Joint:
 
 class ArmParameters:
     def __init__(self) -> None:
+        # Incremented on every attribute change, used to invalidate compiled kinematic models
+        self.revision: int = 0
+
         # J1
         self.a1x: float = 0
         self.a1y: float = 0
@@ -75,6 +95,15 @@ class ArmParameters:
 
         self.joints: List[Joint] = [self.j1, self.j2, self.j3, self.j4, self.j5, self.j6]
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name != "revision":
+            super().__setattr__("revision", self.__dict__.get("revision", 0) + 1)
+
+    @property
+    def joints_revision(self) -> int:
+        return sum(joint.revision for joint in self.joints)
+
     def __str__(self) -> str:
         return f"""
         a1x: {self.a1x}
@@ -98,6 +127,149 @@ class ArmParameters:
         """
 
 
+class KinematicModel:
+    """Constants of the kinematic chain derived from an ArmParameters revision.
+
+    Built once per revision so the FK/IK hot paths do not re-read the arm parameters
+    or rebuild the link translation vectors on every call.
+    """
+
+    def __init__(self, arm_params: ArmParameters) -> None:
+        p = arm_params
+        self.revision: Tuple[int, int] = (p.revision, p.joints_revision)
+        self.num_joints: int = len(p.joints)
+
+        # Joint bounds as arrays for vectorized checks and as floats for the scalar paths
+        self.lower: np.ndarray = np.array([joint.min_val for joint in p.joints], dtype=float)
+        self.upper: np.ndarray = np.array([joint.max_val for joint in p.joints], dtype=float)
+        self.bounds_float: List[Tuple[float, float]] = [(float(low), float(up)) for low, up in zip(self.lower, self.upper)]
+
+        # Link translations D1..D6, one row per joint
+        self.offsets: np.ndarray = np.array(
+            [
+                [p.a1x, p.a1y, p.a1z],
+                [p.a2x, p.a2y, p.a2z],
+                [p.a3x, p.a3y, p.a3z],
+                [p.a4x, p.a4y, p.a4z],
+                [p.a5x, p.a5y, p.a5z],
+                [p.a6x, p.a6y, p.a6z],
+            ],
+            dtype=float,
+        )
+        self.D1, self.D2, self.D3, self.D4, self.D5, self.D6 = self.offsets
+        # Same translations as plain floats for the scalar engine
+        self.offsets_float: List[Tuple[float, float, float]] = [(float(dx), float(dy), float(dz)) for dx, dy, dz in self.offsets]
+
+        # Inverse kinematics constants
+        self.a2x: float = p.a2x
+        self.a3z: float = p.a3z
+        self.a6x: float = p.a6x
+        self.wrist_z_offset: float = p.a1z + p.a2z
+        self.b4x: float = float(np.sqrt(p.a4z**2 + (p.a4x + p.a5x) ** 2))
+        self.delta: float = float(np.arctan2(p.a4x + p.a5x, p.a4z))
+        self.max_reach: float = self.a3z + self.b4x
+        self.min_reach: float = abs(self.a3z - self.b4x)
+        # The closed form IK ignores these offsets, arms that use them need the numeric solver
+        ignored_offsets = (p.a1x, p.a1y, p.a2y, p.a3x, p.a3y, p.a4y, p.a5y, p.a5z, p.a6y, p.a6z)
+        self.is_analytic: bool = all(offset == 0 for offset in ignored_offsets)
+
+
+@dataclasses.dataclass
+class IKSolution:
+    """Seed independent inverse kinematics solution of a pose.
+
+    Holds both wrist branches (J4, J5, J6), the seed only decides which branch is used
+    and the 2π winding of every joint. In a wrist singularity `second` is None and
+    `first` holds (0, 0, J4 + J6).
+    """
+
+    J1: float
+    J2: float
+    J3: float
+    first: Tuple[float, float, float]
+    second: Optional[Tuple[float, float, float]]
+    depends_on_J1: bool = False  # wrist on the J1 axis, J1 was taken from the seed
+
+    def select(self, prev_angles: List[float]) -> List[float]:
+        J4_prev = prev_angles[3]
+        if self.second is None:
+            J4, J5, J6 = J4_prev, 0.0, self.first[2] - J4_prev  # keep the current angle of J4.
+        elif abs(J4_prev - self.first[0]) > abs(J4_prev - self.second[0]):
+            J4, J5, J6 = self.second
+        else:
+            J4, J5, J6 = self.first
+
+        # Unrolled, this runs once per scalar IK call
+        two_pi = 2 * math.pi
+        J1, J2, J3 = self.J1, self.J2, self.J3
+        return [
+            J1 + round((prev_angles[0] - J1) / two_pi) * two_pi,
+            J2 + round((prev_angles[1] - J2) / two_pi) * two_pi,
+            J3 + round((prev_angles[2] - J3) / two_pi) * two_pi,
+            J4 + round((prev_angles[3] - J4) / two_pi) * two_pi,
+            J5 + round((prev_angles[4] - J5) / two_pi) * two_pi,
+            J6 + round((prev_angles[5] - J6) / two_pi) * two_pi,
+        ]
+
+
+class IKCache:
+    """Bounded LRU cache of inverse kinematics solutions keyed on a quantized pose.
+
+    Entries store seed independent solutions so any seed resolves its branch exactly, the
+    cache is cleared whenever the arm parameters or the joint bounds change.
+    """
+
+    def __init__(self, max_size: int = 1024, position_resolution: float = 1e-3, angle_resolution: float = 1e-6) -> None:
+        self.max_size: int = max_size
+        self.position_resolution: float = position_resolution
+        self.angle_resolution: float = angle_resolution
+
+        self.entries: OrderedDict[Tuple[int, ...], Optional[IKSolution]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.revision: Tuple[int, int] = (-1, -1)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def key(self, pose: ArmPose) -> Tuple[int, ...]:
+        x, y, z, roll, pitch, yaw = pose.as_tuple
+        pos_res, ang_res = self.position_resolution, self.angle_resolution
+        return (
+            round(x / pos_res),
+            round(y / pos_res),
+            round(z / pos_res),
+            round(roll / ang_res),
+            round(pitch / ang_res),
+            round(yaw / ang_res),
+        )
+
+    def validate(self, arm_params: ArmParameters) -> None:
+        revision = (arm_params.revision, arm_params.joints_revision)
+        if revision != self.revision:
+            self.entries.clear()
+            self.revision = revision
+
+    def get(self, key: Tuple[int, ...]) -> Tuple[bool, Optional[IKSolution]]:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, self.entries[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key: Tuple[int, ...], solution: Optional[IKSolution]) -> None:
+        self.entries[key] = solution
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 @dataclasses.dataclass
 class ArmPose:
     x: float
@@ -189,9 +361,57 @@ class ArmPose:
 """
 
 
+# Cost of every IK branch: (candidates NxBx6, seeds Nx6) -> NxB
+BranchCost = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def joint_travel_cost(weights: Optional[Sequence[float]] = None) -> BranchCost:
+    """Branch cost given by the weighted sum of the joint displacements from the seed."""
+    weights_array = np.ones(6) if weights is None else np.asarray(weights, dtype=float)
+
+    def cost(candidates: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+        return (np.abs(candidates - seeds[:, None, :]) * weights_array).sum(axis=-1)
+
+    return cost
+
+
+def travel_time_cost(speeds: Sequence[float]) -> BranchCost:
+    """Branch cost given by the time of the move, joints move simultaneously at their own speed (rad/s)."""
+    speeds_array = np.asarray(speeds, dtype=float)
+
+    def cost(candidates: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+        return (np.abs(candidates - seeds[:, None, :]) / speeds_array).max(axis=-1)
+
+    return cost
+
+
+class KinematicsEngine(Enum):
+    NUMPY = 0  # matrix based implementation
+    SCALAR = 1  # closed form expressions over plain floats, fastest for single poses
+    NUMERIC = 2  # damped least squares, handles every link offset of the arm parameters
+
+
 class ArmKinematics:
-    def __init__(self, arm_parameters: ArmParameters) -> None:
+    def __init__(
+        self,
+        arm_parameters: ArmParameters,
+        engine: KinematicsEngine = KinematicsEngine.NUMPY,
+        ik_cache: Optional[IKCache] = None,
+    ) -> None:
         self.arm_params: ArmParameters = arm_parameters
+        self.engine: KinematicsEngine = engine
+        self.ik_cache: Optional[IKCache] = ik_cache
+        # When set, single pose IK evaluates every branch and keeps the cheapest one
+        self.branch_cost: Optional[BranchCost] = None
+        self._model: Optional[KinematicModel] = None
+
+    @property
+    def model(self) -> KinematicModel:
+        model = self._model
+        if model is None or model.revision != (self.arm_params.revision, self.arm_params.joints_revision):
+            model = KinematicModel(self.arm_params)
+            self._model = model
+        return model
 
     class NotReachableError(Exception):
         def __init__(self, message: str, angles: Optional[List[float]]) -> None:
@@ -199,42 +419,37 @@ class ArmKinematics:
             self.angles: Optional[List[float]] = angles
             self.message: str = message
 
+    class JointLimitError(NotReachableError):
+        def __init__(self, message: str, angles: Optional[List[float]], joint_idx: int) -> None:
+            super().__init__(message, angles)
+            self.joint_idx: int = joint_idx
+
     def angles_to_pose(self, angles: List[float]) -> ArmPose:
-        if len(angles) != len(self.arm_params.joints):
+        if len(angles) != self.model.num_joints:
             raise ValueError("angles must be the same length as joints")
+        if self.engine == KinematicsEngine.SCALAR:
+            return self._angles_to_pose_scalar(angles)
 
         J1, J2, J3, J4, J5, J6 = angles
+        model = self.model
 
         R1 = z_rotation_matrix(J1)
-
-        D1 = np.array([self.arm_params.a1x, self.arm_params.a1y, self.arm_params.a1z])
-        T1 = transformation_matrix(R1, D1)
+        T1 = transformation_matrix(R1, model.D1)
         # J1 -->  J2
         R2 = y_rotation_matrix(J2)
-
-        D2 = np.array([self.arm_params.a2x, self.arm_params.a2y, self.arm_params.a2z])
-        T2 = transformation_matrix(R2, D2)
+        T2 = transformation_matrix(R2, model.D2)
         # J2 -->  J3
         R3 = y_rotation_matrix(J3)
-
-        D3 = np.array([self.arm_params.a3x, self.arm_params.a3y, self.arm_params.a3z])
-        T3 = transformation_matrix(R3, D3)
+        T3 = transformation_matrix(R3, model.D3)
         # J3 -->  J4
-
         R4 = x_rotation_matrix(J4)
-
-        D4 = np.array([self.arm_params.a4x, self.arm_params.a4y, self.arm_params.a4z])
-        T4 = transformation_matrix(R4, D4)
+        T4 = transformation_matrix(R4, model.D4)
         # J4 -->  J5
         R5 = y_rotation_matrix(J5)
-
-        D5 = np.array([self.arm_params.a5x, self.arm_params.a5y, self.arm_params.a5z])
-        T5 = transformation_matrix(R5, D5)
+        T5 = transformation_matrix(R5, model.D5)
         # J5 -->  J6
         R6 = x_rotation_matrix(J6)
-        D6 = np.array([self.arm_params.a6x, self.arm_params.a6y, self.arm_params.a6z])
-
-        T6 = transformation_matrix(R6, D6)
+        T6 = transformation_matrix(R6, model.D6)
         # Base--> TCP
         position = T1 @ T2 @ T3 @ T4 @ T5 @ T6 @ np.array([[0], [0], [0], [1]])
         rotation = R1 @ R2 @ R3 @ R4 @ R5 @ R6
@@ -243,17 +458,297 @@ class ArmKinematics:
 
         return ArmPose(*pos, *euler_angles)
 
-    def pose_to_angles(self, target_pose: ArmPose, current_angles: List[float]) -> Optional[List[float]]:
+    def _angles_to_pose_scalar(self, angles: List[float]) -> ArmPose:
+        """Same as `angles_to_pose` using expanded expressions over floats instead of matrices."""
+        J1, J2, J3, J4, J5, J6 = angles
+        (d1x, d1y, d1z), (d2x, d2y, d2z), (d3x, d3y, d3z), (d4x, d4y, d4z), (d5x, d5y, d5z), (d6x, d6y, d6z) = (
+            self.model.offsets_float
+        )
+
+        # Base --> J1, R = Rz(J1)
+        c, s = math.cos(J1), math.sin(J1)
+        r00, r01, r02 = c, -s, 0.0
+        r10, r11, r12 = s, c, 0.0
+        r20, r21, r22 = 0.0, 0.0, 1.0
+        px, py, pz = d1x, d1y, d1z
+
+        # J1 --> J2, R = R @ Ry(J2)
+        px += r00 * d2x + r01 * d2y + r02 * d2z
+        py += r10 * d2x + r11 * d2y + r12 * d2z
+        pz += r20 * d2x + r21 * d2y + r22 * d2z
+        c, s = math.cos(J2), math.sin(J2)
+        r00, r02 = r00 * c - r02 * s, r00 * s + r02 * c
+        r10, r12 = r10 * c - r12 * s, r10 * s + r12 * c
+        r20, r22 = r20 * c - r22 * s, r20 * s + r22 * c
+
+        # J2 --> J3, R = R @ Ry(J3)
+        px += r00 * d3x + r01 * d3y + r02 * d3z
+        py += r10 * d3x + r11 * d3y + r12 * d3z
+        pz += r20 * d3x + r21 * d3y + r22 * d3z
+        c, s = math.cos(J3), math.sin(J3)
+        r00, r02 = r00 * c - r02 * s, r00 * s + r02 * c
+        r10, r12 = r10 * c - r12 * s, r10 * s + r12 * c
+        r20, r22 = r20 * c - r22 * s, r20 * s + r22 * c
+
+        # J3 --> J4, R = R @ Rx(J4)
+        px += r00 * d4x + r01 * d4y + r02 * d4z
+        py += r10 * d4x + r11 * d4y + r12 * d4z
+        pz += r20 * d4x + r21 * d4y + r22 * d4z
+        c, s = math.cos(J4), math.sin(J4)
+        r01, r02 = r01 * c + r02 * s, r02 * c - r01 * s
+        r11, r12 = r11 * c + r12 * s, r12 * c - r11 * s
+        r21, r22 = r21 * c + r22 * s, r22 * c - r21 * s
+
+        # J4 --> J5, R = R @ Ry(J5)
+        px += r00 * d5x + r01 * d5y + r02 * d5z
+        py += r10 * d5x + r11 * d5y + r12 * d5z
+        pz += r20 * d5x + r21 * d5y + r22 * d5z
+        c, s = math.cos(J5), math.sin(J5)
+        r00, r02 = r00 * c - r02 * s, r00 * s + r02 * c
+        r10, r12 = r10 * c - r12 * s, r10 * s + r12 * c
+        r20, r22 = r20 * c - r22 * s, r20 * s + r22 * c
+
+        # J5 --> J6, R = R @ Rx(J6)
+        px += r00 * d6x + r01 * d6y + r02 * d6z
+        py += r10 * d6x + r11 * d6y + r12 * d6z
+        pz += r20 * d6x + r21 * d6y + r22 * d6z
+        c, s = math.cos(J6), math.sin(J6)
+        r01, r02 = r01 * c + r02 * s, r02 * c - r01 * s
+        r21, r22 = r21 * c + r22 * s, r22 * c - r21 * s
+
+        # Euler angles, see extract_euler_angles
+        if r20 != 1 and r20 != -1:
+            roll = math.atan2(r21, r22)
+            pitch = -math.asin(r20)
+            yaw = math.atan2(r10, r00)
+        elif r20 == -1:
+            roll, pitch, yaw = math.atan2(r01, r02), math.pi / 2.0, 0.0
+        else:
+            roll, pitch, yaw = math.atan2(-r01, -r02), -math.pi / 2.0, 0.0
+
+        return ArmPose(px, py, pz, roll, pitch, yaw)
+
+    def _pose_to_angles_scalar(
+        self, target_pose: ArmPose, prev_angles: List[float], model: Optional[KinematicModel] = None
+    ) -> List[float]:
+        """Same as `_pose_to_angles` using expanded expressions over floats instead of matrices."""
+        solution = self._solve_ik_scalar(target_pose, prev_angles[0], model)
+        if solution is None:
+            raise self.NotReachableError("Target pose is not reachable", angles=prev_angles)
+        return solution.select(prev_angles)
+
+    def _solve_ik_scalar(
+        self, target_pose: ArmPose, J1_prev: float, model: Optional[KinematicModel] = None
+    ) -> Optional[IKSolution]:
+        """Seed independent part of the scalar inverse kinematics, None if the pose is not reachable.
+
+        Callers that already hold the current `model` pass it, checking its revision is a noticeable
+        share of a scalar solve.
+        """
+        if model is None:
+            model = self.model
+        x, y, z, roll, pitch, yaw = target_pose.as_tuple
+
+        # R = Rz(yaw) @ Ry(pitch) @ Rx(roll)
+        cr, sr = math.cos(roll), math.sin(roll)
+        cp, sp = math.cos(pitch), math.sin(pitch)
+        cy, sy = math.cos(yaw), math.sin(yaw)
+        r00, r01, r02 = cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr
+        r10, r11, r12 = sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr
+        r20, r21, r22 = -sp, cp * sr, cp * cr
+
+        # Wrist position, the TCP x direction is the first column of R
+        WPx = x - model.a6x * r00
+        WPy = y - model.a6x * r10
+        WPz = z - model.a6x * r20
+
+        # Finding J1,J2,J3
+        J1 = math.atan2(WPy, WPx)
+        on_axis = WPx == 0 and WPy == 0
+        if on_axis:
+            J1 = J1_prev
+        L = math.hypot(WPx, WPy) - model.a2x
+        H = WPz - model.wrist_z_offset
+        P = math.hypot(H, L)
+        a3z, b4x = model.a3z, model.b4x
+        if not ((P <= model.max_reach) and model.min_reach < P):
+            return None
+
+        alfa = math.atan2(H, L)
+        cosbeta = (P * P + a3z * a3z - b4x * b4x) / (2 * P * a3z)
+        beta = math.atan2(math.sqrt(max(0.0, 1 - cosbeta * cosbeta)), cosbeta)
+        cosgamma = (a3z * a3z + b4x * b4x - P * P) / (2 * a3z * b4x)
+        gamma = math.atan2(math.sqrt(max(0.0, 1 - cosgamma * cosgamma)), cosgamma)
+        J2 = math.pi / 2.0 - alfa - beta
+        J3 = math.pi - gamma - model.delta
+
+        # Finding Wrist Orientation, Rwrist = (Rz(J1) @ Ry(J2 + J3)).T @ R
+        c1, s1 = math.cos(J1), math.sin(J1)
+        c23, s23 = math.cos(J2 + J3), math.sin(J2 + J3)
+        a0, a1, a2 = c1 * c23, s1 * c23, -s23
+        b0, b1, b2 = c1 * s23, s1 * s23, c23
+        w00 = a0 * r00 + a1 * r10 + a2 * r20
+        w01 = a0 * r01 + a1 * r11 + a2 * r21
+        w02 = a0 * r02 + a1 * r12 + a2 * r22
+        w10 = -s1 * r00 + c1 * r10
+        w20 = b0 * r00 + b1 * r10 + b2 * r20
+        w21 = b0 * r01 + b1 * r11 + b2 * r21
+        w22 = b0 * r02 + b1 * r12 + b2 * r22
+
+        # Finding both J4, J5, J6 branches
+        sinJ5 = math.sqrt(max(0.0, 1 - w00**2))
+        J5 = math.atan2(sinJ5, w00)
+        if J5 == 0:  # Singularity, only J4 + J6 is defined
+            return IKSolution(J1, J2, J3, (0.0, 0.0, math.atan2(w21, w22)), None, on_axis)
+
+        first = (math.atan2(w10, -w20), J5, math.atan2(w01, w02))
+        second = (-math.atan2(w10, w20), math.atan2(-sinJ5, w00), -math.atan2(w01, -w02))
+        return IKSolution(J1, J2, J3, first, second, on_axis)
+
+    def _pose_to_angles_cached(self, ik_cache: IKCache, target_pose: ArmPose, prev_angles: List[float]) -> List[float]:
+        ik_cache.validate(self.arm_params)
+        key = ik_cache.key(target_pose)
+        found, solution = ik_cache.get(key)
+        if not found:
+            solution = self._solve_ik_scalar(target_pose, prev_angles[0])
+            if solution is None or not solution.depends_on_J1:
+                ik_cache.put(key, solution)
+        if solution is None:
+            raise self.NotReachableError("Target pose is not reachable", angles=prev_angles)
+        return solution.select(prev_angles)
+
+    def joint_frames_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Cumulative base --> joint frames over many joint configurations at once.
+
+        Args:
+            angles (np.ndarray): Nx6 array of joint angles in radians.
+
+        Returns:
+            np.ndarray: Nx6x4x4 array, entry i is the transform T1 @ ... @ Ti of each row. Its
+                origin lies on the axis of joint i and the last one is the TCP frame.
+        """
+        angles = np.asarray(angles, dtype=float)
+        if angles.ndim != 2 or angles.shape[1] != self.model.num_joints:
+            raise ValueError("angles must be a Nx6 array")
+
+        rotations = [
+            z_rotation_matrices(angles[:, 0]),
+            y_rotation_matrices(angles[:, 1]),
+            y_rotation_matrices(angles[:, 2]),
+            x_rotation_matrices(angles[:, 3]),
+            y_rotation_matrices(angles[:, 4]),
+            x_rotation_matrices(angles[:, 5]),
+        ]
+        offsets = self.model.offsets
+        frames = np.empty((angles.shape[0], self.model.num_joints, 4, 4))
+        frames[:, 0] = transformation_matrices(rotations[0], offsets[0])
+        for i in range(1, self.model.num_joints):
+            frames[:, i] = frames[:, i - 1] @ transformation_matrices(rotations[i], offsets[i])
+        return frames
+
+    def angles_to_frames_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Forward kinematics over many joint configurations at once.
+
+        Args:
+            angles (np.ndarray): Nx6 array of joint angles in radians.
+
+        Returns:
+            np.ndarray: Nx4x4 array with the base --> TCP homogeneous transform of each row.
+        """
+        return self.joint_frames_batch(angles)[:, -1]
+
+    def angles_to_pose_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Vectorized version of `angles_to_pose`.
+
+        Args:
+            angles (np.ndarray): Nx6 array of joint angles in radians.
+
+        Returns:
+            np.ndarray: Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+        """
+        frames = self.angles_to_frames_batch(angles)
+        poses = np.empty((frames.shape[0], 6))
+        poses[:, :3] = frames[:, :3, 3]
+        poses[:, 3:] = extract_euler_angles_batch(frames[:, :3, :3])
+        return poses
+
+    def pose_to_angles(
+        self, target_pose: ArmPose, current_angles: List[float], enforce_limits: bool = False
+    ) -> Optional[List[float]]:
         try:
-            found_angles = self._pose_to_angles(target_pose, current_angles)
+            found_angles = self._pose_to_angles(target_pose, current_angles, enforce_limits)
             return found_angles
         except self.NotReachableError as exception:
             console.log(f"NotReachableError in pose_to_angles: {exception}", style="error")
             return None
 
-    def _pose_to_angles(self, target_pose: ArmPose, current_angles: Optional[List[float]] = None) -> List[float]:
+    def _pose_to_angles(
+        self, target_pose: ArmPose, current_angles: Optional[List[float]] = None, enforce_limits: bool = False
+    ) -> List[float]:
+        found_angles = self._solve_pose_to_angles(target_pose, current_angles)
+        if enforce_limits:
+            return self.wrap_into_limits(found_angles)
+        return found_angles
+
+    def wrap_into_limits(self, angles: List[float]) -> List[float]:
+        """Shifts every angle out of its joint bounds by the 2π multiple that brings it inside them.
+
+        Raises:
+            JointLimitError: If no 2π winding of an angle lies within the bounds of its joint.
+        """
+        two_pi = 2 * math.pi
+        wrapped = list(angles)
+        for joint_idx, (angle, (lower, upper)) in enumerate(zip(angles, self.model.bounds_float)):
+            if angle < lower:
+                angle += math.ceil((lower - angle) / two_pi) * two_pi
+            elif angle > upper:
+                angle -= math.ceil((angle - upper) / two_pi) * two_pi
+            if not lower <= angle <= upper:
+                raise self.JointLimitError(
+                    f"Joint {joint_idx} angle {angles[joint_idx]:.3f} is out of bounds [{lower:.3f}, {upper:.3f}]",
+                    angles=list(angles),
+                    joint_idx=joint_idx,
+                )
+            wrapped[joint_idx] = angle
+        return wrapped
+
+    def wrap_into_limits_batch(self, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized version of `wrap_into_limits`.
+
+        Args:
+            angles (np.ndarray): Array of joint angles whose last axis has one entry per joint.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The wrapped angles and a boolean array of the same shape
+                that is True where the joint is within its bounds.
+        """
+        model = self.model
+        two_pi = 2 * np.pi
+        with np.errstate(invalid="ignore"):
+            below = angles < model.lower
+            above = angles > model.upper
+            wrapped = np.where(below, angles + np.ceil((model.lower - angles) / two_pi) * two_pi, angles)
+            wrapped = np.where(above, angles - np.ceil((angles - model.upper) / two_pi) * two_pi, wrapped)
+            within = (wrapped >= model.lower) & (wrapped <= model.upper)
+        return wrapped, within
+
+    def _solve_pose_to_angles(self, target_pose: ArmPose, current_angles: Optional[List[float]] = None) -> List[float]:
+        model = self.model
         if current_angles is None:
-            current_angles = [0 for _ in range(len(self.arm_params.joints))]
+            current_angles = [0 for _ in range(model.num_joints)]
+        if self.engine == KinematicsEngine.NUMERIC or not model.is_analytic:
+            return self._pose_to_angles_numeric(target_pose, current_angles)
+        if self.branch_cost is not None:
+            angles, reachable = self.pose_to_angles_best_batch(
+                np.array([target_pose.as_tuple]), np.asarray(current_angles, dtype=float), self.branch_cost
+            )
+            if not reachable[0]:
+                raise self.NotReachableError("Target pose is not reachable", angles=current_angles)
+            return [float(angle) for angle in angles[0]]
+        if self.ik_cache is not None:
+            return self._pose_to_angles_cached(self.ik_cache, target_pose, current_angles)
+        if self.engine == KinematicsEngine.SCALAR:
+            return self._pose_to_angles_scalar(target_pose, current_angles, model)
 
         prev_angles = current_angles
         J1_prev = prev_angles[0]
@@ -264,7 +759,7 @@ class ArmKinematics:
         TCP = np.array([[x], [y], [z]])
         xdirection = create_rotation_matrix_from_euler_angles(roll, pitch, yaw) @ np.array([[1], [0], [0]])
 
-        WP = TCP - self.arm_params.a6x * xdirection
+        WP = TCP - model.a6x * xdirection
         # Finding J1,J2,J3
 
         J1 = np.arctan2(WP[1, 0], WP[0, 0])
@@ -272,19 +767,18 @@ class ArmKinematics:
         if WP[0, 0] == 0 and WP[1, 0] == 0:
             J1 = J1_prev
         WPxy = np.sqrt(WP[0, 0] ** 2 + WP[1, 0] ** 2)
-        L = WPxy - self.arm_params.a2x
-        H = WP[2, 0] - self.arm_params.a1z - self.arm_params.a2z
+        L = WPxy - model.a2x
+        H = WP[2, 0] - model.wrist_z_offset
         P = np.sqrt(H**2 + L**2)
-        b4x = np.sqrt(self.arm_params.a4z**2 + (self.arm_params.a4x + self.arm_params.a5x) ** 2)
-        if (P <= self.arm_params.a3z + b4x) and abs(self.arm_params.a3z - b4x) < P:
+        a3z, b4x = model.a3z, model.b4x
+        if (P <= model.max_reach) and model.min_reach < P:
             alfa = np.arctan2(H, L)
-            cosbeta = (P**2 + self.arm_params.a3z**2 - b4x**2) / (2 * P * self.arm_params.a3z)
+            cosbeta = (P**2 + a3z**2 - b4x**2) / (2 * P * a3z)
             beta = np.arctan2(np.sqrt(1 - cosbeta**2), cosbeta)
-            cosgamma = (self.arm_params.a3z**2 + b4x**2 - P**2) / (2 * self.arm_params.a3z * b4x)
+            cosgamma = (a3z**2 + b4x**2 - P**2) / (2 * a3z * b4x)
             gamma = np.arctan2(np.sqrt(1 - cosgamma**2), cosgamma)
-            delta = np.arctan2(self.arm_params.a4x + self.arm_params.a5x, self.arm_params.a4z)
             J2 = np.pi / 2.0 - alfa - beta
-            J3 = np.pi - gamma - delta
+            J3 = np.pi - gamma - model.delta
             # Finding Wrist Orientation
             R1 = z_rotation_matrix(J1)
             R2 = y_rotation_matrix(J2)
@@ -314,3 +808,461 @@ class ArmKinematics:
             found_angles = [J1, J2, J3, J4, J5, J6]
             return [nearest_by_2pi_ref(angle, ref) for angle, ref in zip(found_angles, prev_angles)]
         raise self.NotReachableError("Target pose is not reachable", angles=prev_angles)
+
+    def pose_to_angles_batch(
+        self, target_poses: np.ndarray, current_angles: Optional[np.ndarray] = None, enforce_limits: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized version of `_pose_to_angles`.
+
+        Never raises for unreachable rows, instead they are flagged in the returned mask and
+        their angles are set to the corresponding seed.
+
+        Args:
+            target_poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+            current_angles (Optional[np.ndarray]): Seed angles, either one per pose (Nx6) or a
+                single set (6) shared by every pose. Defaults to all zeros.
+            enforce_limits (bool): Wrap the angles into the joint bounds and flag the rows where
+                that is not possible as not reachable.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Nx6 array of joint angles and a boolean mask of size N
+                that is True for the reachable poses.
+        """
+        if self.engine == KinematicsEngine.NUMERIC or not self.model.is_analytic:
+            found_angles, reachable, _ = self.pose_to_angles_numeric_batch(target_poses, current_angles)
+        else:
+            found_angles, reachable = self._pose_to_angles_closed_form_batch(target_poses, current_angles)
+        if enforce_limits:
+            wrapped, within = self.wrap_into_limits_batch(found_angles)
+            reachable &= within.all(axis=1)
+            found_angles = np.where(reachable[:, None], wrapped, found_angles)
+        return found_angles, reachable
+
+    def _validate_batch(self, target_poses: np.ndarray, current_angles: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Checks a batch of poses and broadcasts the seed angles to one row per pose."""
+        target_poses = np.asarray(target_poses, dtype=float)
+        num_joints = self.model.num_joints
+        if target_poses.ndim != 2 or target_poses.shape[1] != 6:
+            raise ValueError("target_poses must be a Nx6 array")
+        if current_angles is None:
+            current_angles = np.zeros(num_joints)
+        prev_angles = np.broadcast_to(np.asarray(current_angles, dtype=float), (target_poses.shape[0], num_joints))
+        return target_poses, prev_angles
+
+    def _pose_to_angles_closed_form_batch(
+        self, target_poses: np.ndarray, current_angles: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Closed form solution of `pose_to_angles_batch`, exact only when `model.is_analytic`."""
+        model = self.model
+        target_poses, prev_angles = self._validate_batch(target_poses, current_angles)
+        J1_prev = prev_angles[:, 0]
+        J4_prev = prev_angles[:, 3]
+
+        x, y, z, roll, pitch, yaw = target_poses.T
+
+        R = create_rotation_matrices_from_euler_angles(roll, pitch, yaw)
+        # x direction of the TCP is the first column of its rotation matrix
+        WPx = x - model.a6x * R[:, 0, 0]
+        WPy = y - model.a6x * R[:, 1, 0]
+        WPz = z - model.a6x * R[:, 2, 0]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Finding J1,J2,J3
+            J1 = np.where((WPx == 0) & (WPy == 0), J1_prev, np.arctan2(WPy, WPx))
+            WPxy = np.sqrt(WPx**2 + WPy**2)
+            L = WPxy - model.a2x
+            H = WPz - model.wrist_z_offset
+            P = np.sqrt(H**2 + L**2)
+            a3z, b4x = model.a3z, model.b4x
+            reachable = (P <= model.max_reach) & (model.min_reach < P)
+
+            alfa = np.arctan2(H, L)
+            cosbeta = (P**2 + a3z**2 - b4x**2) / (2 * P * a3z)
+            beta = np.arctan2(np.sqrt(1 - cosbeta**2), cosbeta)
+            cosgamma = (a3z**2 + b4x**2 - P**2) / (2 * a3z * b4x)
+            gamma = np.arctan2(np.sqrt(1 - cosgamma**2), cosgamma)
+            J2 = np.pi / 2.0 - alfa - beta
+            J3 = np.pi - gamma - model.delta
+
+            # Finding Wrist Orientation
+            Rarm = z_rotation_matrices(J1) @ y_rotation_matrices(J2) @ y_rotation_matrices(J3)
+            Rwrist = np.swapaxes(Rarm, 1, 2) @ R
+
+            # Finding J4, J5, J6
+            sinJ5 = np.sqrt(1 - Rwrist[:, 0, 0] ** 2)
+            J5 = np.arctan2(sinJ5, Rwrist[:, 0, 0])
+            singular = J5 == 0
+
+            J4_1 = np.arctan2(Rwrist[:, 1, 0], -Rwrist[:, 2, 0])
+            J4_2 = -np.arctan2(Rwrist[:, 1, 0], Rwrist[:, 2, 0])
+            J6_1 = np.arctan2(Rwrist[:, 0, 1], Rwrist[:, 0, 2])
+            J6_2 = -np.arctan2(Rwrist[:, 0, 1], -Rwrist[:, 0, 2])
+            second_branch = ~singular & (abs(J4_prev - J4_1) > abs(J4_prev - J4_2))
+
+            J4 = np.where(singular, J4_prev, np.where(second_branch, J4_2, J4_1))
+            J6 = np.where(
+                singular,
+                np.arctan2(Rwrist[:, 2, 1], Rwrist[:, 2, 2]) - J4_prev,
+                np.where(second_branch, J6_2, J6_1),
+            )
+            J5 = np.where(second_branch, np.arctan2(-sinJ5, Rwrist[:, 0, 0]), J5)
+
+        found_angles = np.stack([J1, J2, J3, J4, J5, J6], axis=1)
+        reachable &= np.isfinite(found_angles).all(axis=1)
+        found_angles = nearest_by_2pi_ref_batch(found_angles, prev_angles)
+        found_angles = np.where(reachable[:, None], found_angles, prev_angles)
+        return found_angles, reachable
+
+    def pose_to_angles_numeric_batch(
+        self,
+        target_poses: np.ndarray,
+        current_angles: Optional[np.ndarray] = None,
+        seeds: Optional[np.ndarray] = None,
+        position_tolerance: float = 1e-6,
+        orientation_tolerance: float = 1e-8,
+        max_iterations: int = 50,
+        damping: float = 1e-2,
+        max_step: float = 0.5,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Damped least squares IK of many poses at once, valid for every link offset.
+
+        Every iteration solves dq = J^T (J J^T + damping^2 |e| I)^-1 e for all the poses that have not
+        converged yet, where e stacks the position error and the rotation vector of the orientation error.
+        Scaling the damping by the error keeps steps stable far from the target and near singularities
+        while the convergence close to the solution stays quadratic.
+
+        Args:
+            target_poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+            current_angles (Optional[np.ndarray]): Current angles, Nx6 or 6. Defaults to all zeros.
+            seeds (Optional[np.ndarray]): Starting point of the iterations, Nx6 or 6. Defaults to the
+                closed form solution, which is exact for analytic arms and close for the rest, falling
+                back to the current angles where it does not exist.
+            position_tolerance (float): Max distance between the reached and the target position.
+            orientation_tolerance (float): Max rotation angle (radians) between the reached and the target orientation.
+            max_iterations (int): Iteration cap, poses not converged by then are flagged as not reachable.
+            damping (float): Damping factor, trades convergence speed for stability.
+            max_step (float): Max change of a joint angle (radians) in a single iteration.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Nx6 array of joint angles, a boolean mask of
+                size N that is True for the converged poses and the number of iterations each pose took.
+                Poses that did not converge keep their current angles.
+        """
+        target_poses, prev_angles = self._validate_batch(target_poses, current_angles)
+        num_poses = target_poses.shape[0]
+        if seeds is None:
+            angles, _ = self._pose_to_angles_closed_form_batch(target_poses, prev_angles)
+        else:
+            angles = np.broadcast_to(np.asarray(seeds, dtype=float), prev_angles.shape).copy()
+
+        target_position = target_poses[:, :3]
+        target_rotation = create_rotation_matrices_from_euler_angles(*target_poses[:, 3:].T)
+        damping_matrix = damping**2 * np.eye(6)
+
+        converged = np.zeros(num_poses, dtype=bool)
+        iterations = np.zeros(num_poses, dtype=int)
+        active = np.arange(num_poses)
+        for iteration in range(max_iterations + 1):
+            frames = self.joint_frames_batch(angles[active])
+            tcp = frames[:, -1]
+            errors = np.empty((active.size, 6))
+            errors[:, :3] = target_position[active] - tcp[:, :3, 3]
+            errors[:, 3:] = rotation_vectors_from_matrices(target_rotation[active] @ np.swapaxes(tcp[:, :3, :3], 1, 2))
+
+            done = (np.linalg.norm(errors[:, :3], axis=1) <= position_tolerance) & (
+                np.linalg.norm(errors[:, 3:], axis=1) <= orientation_tolerance
+            )
+            converged[active[done]] = True
+            active, frames, errors = active[~done], frames[~done], errors[~done]
+            if active.size == 0 or iteration == max_iterations:
+                break
+
+            jacobians = self._jacobian_from_frames(frames)
+            jacobians_t = np.swapaxes(jacobians, 1, 2)
+            steps = (
+                jacobians_t
+                @ np.linalg.solve(
+                    jacobians @ jacobians_t + damping_matrix * np.linalg.norm(errors, axis=1)[:, None, None], errors[:, :, None]
+                )
+            )[:, :, 0]
+            largest = np.abs(steps).max(axis=1, keepdims=True)
+            steps *= np.minimum(1.0, max_step / np.maximum(largest, 1e-300))
+            angles[active] += steps
+            iterations[active] += 1
+
+        angles = nearest_by_2pi_ref_batch(angles, prev_angles)
+        angles = np.where(converged[:, None], angles, prev_angles)
+        return angles, converged, iterations
+
+    def _pose_to_angles_numeric(self, target_pose: ArmPose, current_angles: List[float]) -> List[float]:
+        current = np.asarray(current_angles, dtype=float)
+        poses = np.array([target_pose.as_tuple])
+        seeds = None
+        if self.branch_cost is not None:
+            seeds, _ = self.pose_to_angles_best_batch(poses, current, self.branch_cost)
+        angles, converged, _ = self.pose_to_angles_numeric_batch(poses, current, seeds)
+        if not converged[0]:
+            raise self.NotReachableError("Target pose is not reachable", angles=current_angles)
+        return [float(angle) for angle in angles[0]]
+
+    def pose_to_angles_all_branches(
+        self, target_poses: np.ndarray, current_angles: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Enumerates every closed form IK branch of many poses at once.
+
+        Branches are the combinations of shoulder (front/back), elbow (up/down) and wrist flips.
+        Angles are unwrapped to the nearest 2π winding of the seed, then wrapped into the joint bounds.
+
+        Args:
+            target_poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+            current_angles (Optional[np.ndarray]): Seed angles, Nx6 or 6. Defaults to all zeros.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Nx8x6 array of candidate angles and a Nx8 boolean mask
+                that is True for the candidates that reach the pose within the joint bounds.
+        """
+        model = self.model
+        target_poses, prev_angles = self._validate_batch(target_poses, current_angles)
+        num_poses, num_joints = prev_angles.shape
+
+        x, y, z, roll, pitch, yaw = target_poses.T
+        R = create_rotation_matrices_from_euler_angles(roll, pitch, yaw)
+        WPx = x - model.a6x * R[:, 0, 0]
+        WPy = y - model.a6x * R[:, 1, 0]
+        WPz = z - model.a6x * R[:, 2, 0]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # Shoulder branches, axis 1: facing the wrist or facing away from it
+            J1_front = np.where((WPx == 0) & (WPy == 0), prev_angles[:, 0], np.arctan2(WPy, WPx))
+            WPxy = np.sqrt(WPx**2 + WPy**2)
+            J1 = np.stack([J1_front, J1_front + np.pi], axis=1)
+            L = np.stack([WPxy - model.a2x, -WPxy - model.a2x], axis=1)
+            H = (WPz - model.wrist_z_offset)[:, None]
+            P = np.sqrt(H**2 + L**2)
+            a3z, b4x = model.a3z, model.b4x
+            reach = (P <= model.max_reach) & (model.min_reach < P)
+
+            alfa = np.arctan2(H, L)
+            cosbeta = (P**2 + a3z**2 - b4x**2) / (2 * P * a3z)
+            beta = np.arctan2(np.sqrt(1 - cosbeta**2), cosbeta)
+            cosgamma = (a3z**2 + b4x**2 - P**2) / (2 * a3z * b4x)
+            gamma = np.arctan2(np.sqrt(1 - cosgamma**2), cosgamma)
+
+            # Elbow branches, axis 2: elbow up or elbow down
+            J2 = np.stack([np.pi / 2.0 - alfa - beta, np.pi / 2.0 - alfa + beta], axis=2).reshape(-1)
+            J3 = np.stack([np.pi - gamma - model.delta, gamma - np.pi - model.delta], axis=2).reshape(-1)
+            J1 = np.repeat(J1, 2, axis=1).reshape(-1)
+            reach = np.repeat(reach, 2, axis=1)
+
+            # Wrist branches for each of the 4 arm configurations
+            Rarm = z_rotation_matrices(J1) @ y_rotation_matrices(J2) @ y_rotation_matrices(J3)
+            Rwrist = np.swapaxes(Rarm, 1, 2) @ np.repeat(R, 4, axis=0)
+            J4_prev = np.repeat(prev_angles[:, 3], 4)
+
+            sinJ5 = np.sqrt(1 - Rwrist[:, 0, 0] ** 2)
+            J5 = np.arctan2(sinJ5, Rwrist[:, 0, 0])
+            singular = J5 == 0
+            J6_singular = np.arctan2(Rwrist[:, 2, 1], Rwrist[:, 2, 2]) - J4_prev
+
+            J4_1 = np.where(singular, J4_prev, np.arctan2(Rwrist[:, 1, 0], -Rwrist[:, 2, 0]))
+            J6_1 = np.where(singular, J6_singular, np.arctan2(Rwrist[:, 0, 1], Rwrist[:, 0, 2]))
+            J4_2 = np.where(singular, J4_prev, -np.arctan2(Rwrist[:, 1, 0], Rwrist[:, 2, 0]))
+            J5_2 = np.where(singular, J5, np.arctan2(-sinJ5, Rwrist[:, 0, 0]))
+            J6_2 = np.where(singular, J6_singular, -np.arctan2(Rwrist[:, 0, 1], -Rwrist[:, 0, 2]))
+
+        first = np.stack([J1, J2, J3, J4_1, J5, J6_1], axis=1)
+        second = np.stack([J1, J2, J3, J4_2, J5_2, J6_2], axis=1)
+        candidates = np.stack([first, second], axis=1).reshape(num_poses, 8, num_joints)
+        candidates = nearest_by_2pi_ref_batch(candidates, prev_angles[:, None, :])
+        candidates, within = self.wrap_into_limits_batch(candidates)
+
+        valid = np.repeat(reach.reshape(num_poses, 4), 2, axis=1)
+        valid &= np.isfinite(candidates).all(axis=-1)
+        valid &= within.all(axis=-1)
+        return candidates, valid
+
+    def pose_to_angles_best_batch(
+        self,
+        target_poses: np.ndarray,
+        current_angles: Optional[np.ndarray] = None,
+        cost: Optional[BranchCost] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves many poses keeping, for each one, the valid IK branch with the lowest cost.
+
+        Args:
+            target_poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+            current_angles (Optional[np.ndarray]): Seed angles, Nx6 or 6. Defaults to all zeros.
+            cost (Optional[BranchCost]): Cost of each branch, defaults to the total joint travel.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Nx6 array of joint angles and a boolean mask of size N
+                that is True for the reachable poses, unreachable rows keep their seed.
+        """
+        candidates, valid = self.pose_to_angles_all_branches(target_poses, current_angles)
+        num_poses, _, num_joints = candidates.shape
+        if current_angles is None:
+            current_angles = np.zeros(num_joints)
+        prev_angles = np.broadcast_to(np.asarray(current_angles, dtype=float), (num_poses, num_joints))
+
+        if cost is None:
+            cost = joint_travel_cost()
+        with np.errstate(invalid="ignore"):
+            costs = np.where(valid, cost(candidates, prev_angles), np.inf)
+        best = np.argmin(costs, axis=1)
+        reachable = np.any(valid, axis=1)
+        angles = candidates[np.arange(num_poses), best]
+        angles = np.where(reachable[:, None], angles, prev_angles)
+        return angles, reachable
+
+    def _winding_variants(self, candidates: np.ndarray, valid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Adds the other 2π windings of the joints whose bounds span more than a turn.
+
+        Args:
+            candidates (np.ndarray): NxKx6 candidate angles.
+            valid (np.ndarray): NxK mask of the valid candidates.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: NxK'x6 candidates and their NxK' mask, invalid outside the bounds.
+        """
+        model = self.model
+        wide = np.flatnonzero(model.upper - model.lower > 2 * np.pi)
+        if len(wide) == 0:
+            return candidates, valid
+        combinations = np.stack(np.meshgrid(*([np.array([0.0, -2 * np.pi, 2 * np.pi])] * len(wide)), indexing="ij"), axis=-1)
+        offsets = np.zeros((combinations[..., 0].size, model.num_joints))
+        offsets[:, wide] = combinations.reshape(-1, len(wide))
+
+        variants = (candidates[:, None, :, :] + offsets[None, :, None, :]).reshape(candidates.shape[0], -1, model.num_joints)
+        with np.errstate(invalid="ignore"):
+            within = np.all((variants >= model.lower) & (variants <= model.upper), axis=-1)
+        return variants, np.tile(valid, (1, len(offsets))) & within
+
+    def dexterity_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Inverse condition number (0 at singularities, 1 at best) of many joint configurations.
+
+        Unlike `condition_number_batch` the linear rows of the jacobian are divided by the max reach
+        of the arm, so values are unit free and can be compared against a fixed threshold.
+        """
+        jacobians = self.jacobian_batch(angles)
+        jacobians[:, :3, :] /= max(self.model.max_reach, 1e-12)
+        singular_values = np.linalg.svd(jacobians, compute_uv=False)
+        return singular_values[:, -1] / singular_values[:, 0]
+
+    def pose_to_angles_path(
+        self,
+        target_poses: np.ndarray,
+        current_angles: Optional[np.ndarray] = None,
+        cost: Optional[BranchCost] = None,
+        min_dexterity: float = 1e-3,
+        singularity_penalty: float = 1.0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Solves a path of poses choosing one IK branch per pose so the whole path is as short as possible.
+
+        Every branch (and 2π winding, for joints whose bounds span more than a turn) of every pose is
+        computed in one batch, then a dynamic programming pass over the samples picks the sequence of
+        branches with the lowest total `cost` between consecutive samples, starting at `current_angles`.
+        Unlike solving pose by pose, a branch that is cheap for one sample but forces a wrist flip or a
+        full turn later on is never picked. Branches closer to a singularity than `min_dexterity` (see
+        `dexterity_batch`) cost up to `singularity_penalty` more, so among similar paths the one staying
+        away from singularities wins, while a path that has to cross one still goes through.
+
+        Args:
+            target_poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows, in path order.
+            current_angles (Optional[np.ndarray]): Angles before the first pose (6). Defaults to all zeros.
+            cost (Optional[BranchCost]): Cost of moving between consecutive samples, defaults to the total joint travel.
+            min_dexterity (float): Dexterity below which a branch is penalized.
+            singularity_penalty (float): Extra cost of a branch right at a singularity, in units of `cost`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Nx6 array of joint angles and a boolean mask of size N that is
+                True for the reachable poses, unreachable rows repeat the angles of the previous sample.
+        """
+        model = self.model
+        start = np.zeros(model.num_joints) if current_angles is None else np.asarray(current_angles, dtype=float)
+        branches, branch_valid = self.pose_to_angles_all_branches(target_poses, start)
+        # Invalid candidates hold NaNs, zero them so they only ever add infinite costs
+        branches = np.where(branch_valid[..., None], branches, 0.0)
+        num_poses, num_branches, num_joints = branches.shape
+        branch_dexterity = self.dexterity_batch(branches.reshape(-1, num_joints)).reshape(num_poses, num_branches)
+
+        # Windings share the dexterity of their branch
+        candidates, valid = self._winding_variants(branches, branch_valid)
+        num_candidates = candidates.shape[1]
+        dexterity = np.tile(branch_dexterity, (1, num_candidates // num_branches))
+        reachable = np.any(valid, axis=1)
+        penalties = (
+            singularity_penalty * np.clip(1 - dexterity / min_dexterity, 0, 1) if min_dexterity > 0 else np.zeros_like(dexterity)
+        )
+        penalties[~valid] = np.inf
+
+        if cost is None:
+            cost = joint_travel_cost()
+        states = start[None, :]
+        totals = np.zeros(1)
+        backpointers = np.zeros((num_poses, num_candidates), dtype=int)
+        solved = np.flatnonzero(reachable)
+        for i in solved:
+            step_costs = cost(np.broadcast_to(candidates[i], (len(states), num_candidates, num_joints)), states)
+            transitions = totals[:, None] + step_costs + penalties[i]
+            backpointers[i] = np.argmin(transitions, axis=0)
+            totals = transitions[backpointers[i], np.arange(num_candidates)]
+            states = candidates[i]
+
+        angles = np.empty((num_poses, num_joints))
+        if len(solved) > 0:
+            branch = int(np.argmin(totals))
+            for i in solved[::-1]:
+                angles[i] = candidates[i, branch]
+                branch = int(backpointers[i, branch])
+        # Unreachable samples keep the previous angles
+        previous = start
+        for row in range(num_poses):
+            if not reachable[row]:
+                angles[row] = previous
+            previous = angles[row]
+        return angles, reachable
+
+    # Rotation axis of each joint in its own frame: J1 z, J2 y, J3 y, J4 x, J5 y, J6 x
+    JOINT_AXES = np.array([[0, 0, 1], [0, 1, 0], [0, 1, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0]], dtype=float)
+
+    def jacobian_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Geometric jacobian of the TCP over many joint configurations at once.
+
+        Args:
+            angles (np.ndarray): Nx6 array of joint angles in radians.
+
+        Returns:
+            np.ndarray: Nx6x6 array, rows 0-2 map joint rates to the TCP linear velocity and rows
+                3-5 to its angular velocity, both in the base frame.
+        """
+        return self._jacobian_from_frames(self.joint_frames_batch(angles))
+
+    def _jacobian_from_frames(self, frames: np.ndarray) -> np.ndarray:
+        # The axis of a joint is not changed by its own rotation
+        axes = np.einsum("njab,jb->nja", frames[:, :, :3, :3], self.JOINT_AXES)
+        origins = frames[:, :, :3, 3]
+        tcp = origins[:, -1:, :]
+
+        jacobians = np.empty((frames.shape[0], 6, self.model.num_joints))
+        jacobians[:, :3, :] = np.swapaxes(np.cross(axes, tcp - origins), 1, 2)
+        jacobians[:, 3:, :] = np.swapaxes(axes, 1, 2)
+        return jacobians
+
+    def jacobian(self, angles: List[float]) -> np.ndarray:
+        """Geometric jacobian (6x6) of the TCP at a single joint configuration, see `jacobian_batch`."""
+        return self.jacobian_batch(np.array([angles], dtype=float))[0]
+
+    def manipulability_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Yoshikawa manipulability sqrt(det(J @ J.T)) of many joint configurations, 0 at singularities."""
+        singular_values = np.linalg.svd(self.jacobian_batch(angles), compute_uv=False)
+        return singular_values.prod(axis=1)
+
+    def condition_number_batch(self, angles: np.ndarray) -> np.ndarray:
+        """Condition number of the jacobian of many joint configurations, inf at singularities.
+
+        Linear rows are in length units and angular rows in radians, so the values depend on the
+        units of the arm parameters, they are meant to be compared between configurations.
+        """
+        singular_values = np.linalg.svd(self.jacobian_batch(angles), compute_uv=False)
+        with np.errstate(divide="ignore"):
+            return singular_values[:, 0] / singular_values[:, -1]
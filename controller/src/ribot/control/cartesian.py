@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmPose
+from ribot.utils.algebra import (
+    create_rotation_matrices_from_euler_angles,
+    extract_euler_angles_batch,
+    matrices_from_quaternions,
+    quaternions_from_matrices,
+    slerp,
+)
+
+
+def _rotation_angle(q0: np.ndarray, q1: np.ndarray) -> float:
+    """Angle of the rotation between two unit quaternions."""
+    return 2 * math.acos(min(1.0, abs(float(np.dot(q0, q1)))))
+
+
+def circle_through(p0: np.ndarray, p1: np.ndarray, p2: np.ndarray) -> Tuple[np.ndarray, float, np.ndarray]:
+    """Circle through three points.
+
+    Returns:
+        Tuple[np.ndarray, float, np.ndarray]: Center, radius and unit normal, oriented so that
+            p0, p1 and p2 follow each other counterclockwise around it.
+
+    Raises:
+        ValueError: If the points are collinear (or repeated).
+    """
+    a, b = p0 - p2, p1 - p2
+    axb = np.cross(a, b)
+    norm_squared = float(np.dot(axb, axb))
+    if norm_squared < 1e-12 * max(float(np.dot(a, a)), float(np.dot(b, b)), 1e-12) ** 2:
+        raise ValueError("Arc points are collinear")
+    center = p2 + np.cross(np.dot(a, a) * b - np.dot(b, b) * a, axb) / (2 * norm_squared)
+    return center, float(np.linalg.norm(p0 - center)), axb / math.sqrt(norm_squared)
+
+
+def arc_path(
+    start: ArmPose,
+    via: ArmPose,
+    end: ArmPose,
+    max_chord_error: float = 0.1,
+    step_rad: float = math.radians(2),
+    full_circle: bool = False,
+) -> np.ndarray:
+    """Samples the circular arc from `start` through `via` to `end`, or the whole circle through them.
+
+    Samples are spaced so that the chord between consecutive ones never strays more than
+    `max_chord_error` from the arc, fewer samples for larger radii. Orientation is slerped between
+    the poses in the order they are passed, a full circle turns back to the start orientation.
+
+    Args:
+        start (ArmPose): First pose of the arc, not included in the samples.
+        via (ArmPose): Any pose on the arc between the start and the end.
+        end (ArmPose): Last pose of the arc, always the last sample unless `full_circle`.
+        max_chord_error (float): Max distance in mm between the arc and the chords joining consecutive samples.
+        step_rad (float): Max rotation angle between consecutive samples in radians.
+        full_circle (bool): Go on past `end` back to `start`, which then is the last sample.
+
+    Returns:
+        np.ndarray: Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+
+    Raises:
+        ValueError: If a step is not positive or the positions are collinear.
+    """
+    if max_chord_error <= 0 or step_rad <= 0:
+        raise ValueError("max_chord_error and step_rad must be positive")
+
+    poses = [start, via, end, start] if full_circle else [start, via, end]
+    positions = np.array([pose.as_tuple[:3] for pose in poses])
+    center, radius, normal = circle_through(*positions[:3])
+    u = (positions[0] - center) / radius
+    v = np.cross(normal, u)
+    offsets = positions - center
+    key_angles = np.mod(np.arctan2(offsets @ v, offsets @ u), 2 * np.pi)
+    key_angles[0] = 0
+    if full_circle:
+        key_angles[-1] = 2 * np.pi
+
+    rotations = create_rotation_matrices_from_euler_angles(*np.array([pose.as_tuple[3:] for pose in poses]).T)
+    quaternions = quaternions_from_matrices(rotations)
+    # Largest angle between samples keeping the sagitta of their chord within the error
+    max_step = 2 * math.acos(1 - max_chord_error / radius) if max_chord_error < radius else math.pi / 2
+
+    samples = []
+    for k in range(len(poses) - 1):
+        span = key_angles[k + 1] - key_angles[k]
+        num_samples = max(
+            1, math.ceil(span / max_step), math.ceil(_rotation_angle(quaternions[k], quaternions[k + 1]) / step_rad)
+        )
+        t = np.arange(1, num_samples + 1) / num_samples
+        angles = key_angles[k] + t * span
+        segment = np.empty((num_samples, 6))
+        segment[:, :3] = center + radius * (np.cos(angles)[:, None] * u + np.sin(angles)[:, None] * v)
+        segment[:, 3:] = extract_euler_angles_batch(matrices_from_quaternions(slerp(quaternions[k], quaternions[k + 1], t)))
+        # Keep the exact key poses, the euler extraction may pick another equivalent representation
+        segment[-1] = poses[k + 1].as_tuple
+        samples.append(segment)
+    return np.vstack(samples)
+
+
+def linear_path(start: ArmPose, end: ArmPose, step_mm: float = 5.0, step_rad: float = math.radians(2)) -> np.ndarray:
+    """Samples the straight segment between two poses, slerping the orientation.
+
+    The number of samples is the smallest that keeps consecutive samples within `step_mm` of each
+    other and their orientations within `step_rad`.
+
+    Args:
+        start (ArmPose): First pose of the segment, not included in the samples.
+        end (ArmPose): Last pose of the segment, always the last sample.
+        step_mm (float): Max distance between consecutive samples.
+        step_rad (float): Max rotation angle between consecutive samples in radians.
+
+    Returns:
+        np.ndarray: Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+
+    Raises:
+        ValueError: If a step is not positive.
+    """
+    if step_mm <= 0 or step_rad <= 0:
+        raise ValueError("step_mm and step_rad must be positive")
+
+    start_position = np.array(start.as_tuple[:3])
+    end_position = np.array(end.as_tuple[:3])
+    rotations = create_rotation_matrices_from_euler_angles(
+        np.array([start.roll, end.roll]), np.array([start.pitch, end.pitch]), np.array([start.yaw, end.yaw])
+    )
+    q_start, q_end = quaternions_from_matrices(rotations)
+    rotation_angle = _rotation_angle(q_start, q_end)
+
+    distance = float(np.linalg.norm(end_position - start_position))
+    num_samples = max(1, math.ceil(distance / step_mm), math.ceil(rotation_angle / step_rad))
+    t = np.arange(1, num_samples + 1) / num_samples
+
+    poses = np.empty((num_samples, 6))
+    poses[:, :3] = start_position + t[:, None] * (end_position - start_position)
+    poses[:, 3:] = extract_euler_angles_batch(matrices_from_quaternions(slerp(q_start, q_end, t)))
+    # Keep the exact target, the euler extraction may pick another equivalent representation
+    poses[-1] = end.as_tuple
+    return poses
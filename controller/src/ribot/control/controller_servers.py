@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import select
 import socket
 import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
 from enum import Enum
-from typing import Any, Optional, Union
+from typing import Any, Deque, List, Optional, Union
 
 import websockets
 
+from ribot.utils.command_ledger import ACK_PAYLOAD_CODES
 from ribot.utils.fifo_lock import FIFOLock
 from ribot.utils.general import no_self_call
-from ribot.utils.messages import Message, MessageOp
+from ribot.utils.messages import Message, MessageDecoder, MessageEncoder, MessageOp
 from ribot.utils.prints import console
 
 
@@ -53,9 +57,15 @@ class ControllerServer(ControllerDependencies):
         self.connection_socket: Optional[socket.socket] = None
 
         self._connection_mutex: FIFOLock = FIFOLock()
+        # Reused by every send, the sends happen while holding the connection mutex
+        self.encoder: MessageEncoder = MessageEncoder()
+        self.decoder: MessageDecoder = MessageDecoder(payload_codes=ACK_PAYLOAD_CODES)
+        self.received: Deque[Message] = deque()
         self.stop_event = controller.stop_event
 
         self.status_time_interval: float = 1 / 15
+        # Longest wait for room in the socket send buffer before the connection is considered stalled
+        self.send_timeout: float = 5.0
 
     @property
     def connection_mutex(self) -> FIFOLock:
@@ -126,10 +136,27 @@ class ControllerServer(ControllerDependencies):
                 self.thread.join()
         console.log("Controller server stopped", style="setup")
 
+    def _write(self, connection: socket.socket, data: memoryview) -> None:
+        """Writes every byte on the non blocking connection, waiting for room in the send buffer when it fills.
+
+        `sendall` would raise `BlockingIOError` mid frame, leaving the firmware with a partial message.
+
+        Raises:
+            TimeoutError: If the send buffer stays full for `send_timeout` seconds.
+        """
+        deadline = time.monotonic() + self.send_timeout
+        while data:
+            try:
+                data = data[connection.send(data) :]
+            except BlockingIOError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([], [connection], [], remaining)[1]:
+                    raise TimeoutError(f"Send buffer full for {self.send_timeout}s, {len(data)} bytes not sent")
+
     def _send_message(self, message: Message) -> None:
         if self.is_ready and self.connection_socket is not None:
             try:
-                self.connection_socket.send(message.encode())
+                self._write(self.connection_socket, self.encoder.encode(message))
 
             except OSError as e:
                 console.log(f"Connection failed with error: {str(e)}", style="error")
@@ -142,46 +169,69 @@ class ControllerServer(ControllerDependencies):
         else:
             self._send_message(message)
 
-    def _receive_message(self, timeout: Optional[int] = None) -> Union[ControllerServer.ReceiveStatusCode, Message]:
+    def _send_messages(self, messages: List[Message]) -> None:
+        if self.is_ready and self.connection_socket is not None:
+            try:
+                self._write(self.connection_socket, self.encoder.encode(messages))
+
+            except OSError as e:
+                console.log(f"Connection failed with error: {str(e)}", style="error")
+                self.controller.stop()
+
+    def send_messages(self, messages: List[Message], mutex: bool = False) -> None:
+        """Sends many messages back to back in a single socket write."""
+        if mutex:
+            with self.connection_mutex:
+                self._send_messages(messages)
+        else:
+            self._send_messages(messages)
+
+    def _receive_messages(self, timeout: Optional[int] = None) -> Union[ControllerServer.ReceiveStatusCode, List[Message]]:
         if not self.is_ready or self.connection_socket is None:
             return self.ReceiveStatusCode.NOT_READY
         try:
             if timeout is not None:
                 self.connection_socket.settimeout(timeout)
                 self.connection_socket.setblocking(True)
-
-            header_data = self.connection_socket.recv(Message.LENGTH_HEADERS)
-            if not header_data:
-                return self.ReceiveStatusCode.NO_NEW_DATA
-            _, _, num_args = Message.decode_headers(header_data)
-            data = header_data
-            if num_args > 0:
-                body_data = self.connection_socket.recv(num_args * 4)
-                if not body_data:
-                    return self.ReceiveStatusCode.NO_NEW_DATA
-                data += body_data
-            if timeout is not None:
-                self.connection_socket.setblocking(False)
-                self.connection_socket.settimeout(0)
-            if not data:
+            try:
+                # Drain everything available, a burst of replies usually fits in a single read
+                while self.decoder.recv_into(self.connection_socket) > 0 and timeout is None:
+                    pass
+            except (BlockingIOError, socket.timeout):
+                pass
+            finally:
+                if timeout is not None:
+                    self.connection_socket.setblocking(False)
+                    self.connection_socket.settimeout(0)
+
+            messages = list(self.decoder)
+            if not messages:
                 return self.ReceiveStatusCode.NO_NEW_DATA
-            message = Message.decode(data)
-            return message
-        except BlockingIOError:
-            return self.ReceiveStatusCode.NO_NEW_DATA
-        except OSError as e:
+            return messages
+        except (OSError, ValueError) as e:
             console.log(f"Connection failed with error: {str(e)}", style="error")
             self.controller.stop()
             return self.ReceiveStatusCode.ERROR
 
-    def receive_message(
+    def receive_messages(
         self, mutex: bool = False, timeout: Optional[int] = None
-    ) -> Union[ControllerServer.ReceiveStatusCode, Message]:
+    ) -> Union[ControllerServer.ReceiveStatusCode, List[Message]]:
+        """Every complete message received since the last call, read from the socket in as few calls as possible."""
         if mutex:
             with self.connection_mutex:
-                return self._receive_message(timeout=timeout)
+                return self._receive_messages(timeout=timeout)
         else:
-            return self._receive_message(timeout=timeout)
+            return self._receive_messages(timeout=timeout)
+
+    def receive_message(
+        self, mutex: bool = False, timeout: Optional[int] = None
+    ) -> Union[ControllerServer.ReceiveStatusCode, Message]:
+        if not self.received:
+            messages = self.receive_messages(mutex=mutex, timeout=timeout)
+            if not isinstance(messages, list):
+                return messages
+            self.received.extend(messages)
+        return self.received.popleft()
 
     @property
     def is_ready(self) -> bool:
@@ -196,11 +246,12 @@ class ControllerServer(ControllerDependencies):
                 break
 
             with self.connection_mutex:
-                msg = self.receive_message()
+                messages = self.receive_messages()
 
-            if isinstance(msg, Message):
-                handler = self.controller.message_op_handlers[msg.op]
-                handler(msg)
+            if isinstance(messages, list):
+                for msg in messages:
+                    handler = self.controller.message_op_handlers[msg.op]
+                    handler(msg)
 
             self.stop_event.wait(0.05)
 
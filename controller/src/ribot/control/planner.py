@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import os
+import types
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from ribot.control.arm_kinematics import ArmKinematics, ArmParameters
+from ribot.control.trajectory import blend_corners, time_optimal_parameterization
+
+"""
+    ----------------------------------------
+                    Candidates
+    ----------------------------------------
+"""
+
+
+@dataclasses.dataclass
+class PlanCandidate:
+    """A way of getting somewhere: joint waypoints, or poses solved with IK from the start angles."""
+
+    path: np.ndarray  # NxJ joint waypoints or Nx6 poses, the start angles excluded
+    cartesian: bool = False
+    blend_radius: float = 0.0
+
+
+@dataclasses.dataclass
+class PlanResult:
+    """Outcome of a candidate, move along it with `ArmController.move_joints_through(angles, blend_radius)`."""
+
+    index: int  # position of the candidate in the evaluated sequence
+    valid: bool
+    duration: float  # time optimal duration in seconds, inf when not valid
+    angles: Optional[np.ndarray] = None  # joint waypoints of the candidate
+    blend_radius: float = 0.0
+    reason: str = ""
+
+
+# (index, offset, rows, columns, cartesian, blend radius) of a candidate packed in shared memory
+_Layout = Tuple[int, int, int, int, bool, float]
+
+
+def evaluate_candidate(
+    kinematics: ArmKinematics,
+    index: int,
+    candidate: PlanCandidate,
+    start_angles: np.ndarray,
+    max_velocities: np.ndarray,
+    max_accelerations: np.ndarray,
+    max_joint_step: float,
+) -> PlanResult:
+    """Checks a candidate and times it with the time optimal parameterization of its (blended) joint path."""
+    if candidate.cartesian:
+        angles, reachable = kinematics.pose_to_angles_batch(candidate.path, start_angles, enforce_limits=True)
+        if not reachable.all():
+            return PlanResult(index, False, math.inf, reason=f"Not reachable at sample {int(np.argmin(reachable))}")
+    else:
+        angles = np.array(candidate.path, dtype=float)
+        model = kinematics.model
+        if np.any(angles < model.lower) or np.any(angles > model.upper):
+            return PlanResult(index, False, math.inf, reason="Outside the joint limits")
+
+    path = np.vstack([start_angles, angles])
+    joint_steps = np.abs(np.diff(path, axis=0))
+    if len(joint_steps) > 0 and joint_steps.max() > max_joint_step:
+        return PlanResult(index, False, math.inf, reason=f"Jumps at sample {int(joint_steps.max(axis=1).argmax())}")
+
+    trajectory = time_optimal_parameterization(blend_corners(path, candidate.blend_radius), max_velocities, max_accelerations)
+    return PlanResult(index, True, trajectory.duration, angles, candidate.blend_radius)
+
+
+"""
+    ----------------------------------------
+                    Workers
+    ----------------------------------------
+"""
+
+
+@dataclasses.dataclass
+class _WorkerState:
+    kinematics: ArmKinematics
+    max_velocities: np.ndarray
+    max_accelerations: np.ndarray
+    max_joint_step: float
+
+
+_worker: Optional[_WorkerState] = None
+
+
+def _init_worker(
+    arm_params: ArmParameters, max_velocities: np.ndarray, max_accelerations: np.ndarray, max_joint_step: float
+) -> None:
+    global _worker
+    kinematics = ArmKinematics(arm_params)
+    kinematics.model  # compile the kinematic model once per worker
+    _worker = _WorkerState(kinematics, max_velocities, max_accelerations, max_joint_step)
+
+
+def _evaluate_chunk(shared_name: str, layouts: List[_Layout], start_angles: np.ndarray) -> List[PlanResult]:
+    assert _worker is not None, "Planner worker was not initialized"
+    shared = shared_memory.SharedMemory(name=shared_name)
+    try:
+        results = []
+        for index, offset, rows, columns, cartesian, blend_radius in layouts:
+            path = np.ndarray((rows, columns), dtype=np.float64, buffer=shared.buf, offset=offset)
+            candidate = PlanCandidate(path, cartesian, blend_radius)
+            results.append(
+                evaluate_candidate(
+                    _worker.kinematics,
+                    index,
+                    candidate,
+                    start_angles,
+                    _worker.max_velocities,
+                    _worker.max_accelerations,
+                    _worker.max_joint_step,
+                )
+            )
+            del path, candidate
+        return results
+    finally:
+        shared.close()
+
+
+"""
+    ----------------------------------------
+                    PathPlanner
+    ----------------------------------------
+"""
+
+
+class PathPlanner:
+    """Evaluates many candidate paths in parallel and picks the fastest valid one.
+
+    Every worker process compiles the kinematic model of the arm parameters once when the pool
+    starts. Candidate paths are packed into a single shared memory block per call, workers only
+    receive their offsets, so nothing but the small results is pickled. Candidates are split in
+    `chunks_per_worker` chunks per worker to balance uneven candidates.
+
+    The arm parameters and limits are captured when the planner is created, create a new one
+    after changing them. With `max_workers=0` candidates are evaluated in the calling process.
+    """
+
+    def __init__(
+        self,
+        arm_params: ArmParameters,
+        max_velocities: ArrayLike,
+        max_accelerations: ArrayLike,
+        max_workers: Optional[int] = None,
+        max_joint_step: float = math.radians(30),
+        chunks_per_worker: int = 4,
+    ) -> None:
+        self.max_velocities: np.ndarray = np.asarray(max_velocities, dtype=float)
+        self.max_accelerations: np.ndarray = np.asarray(max_accelerations, dtype=float)
+        self.max_joint_step: float = max_joint_step
+        self.num_workers: int = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.chunks_per_worker: int = chunks_per_worker
+        self.kinematics: ArmKinematics = ArmKinematics(arm_params)
+
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if self.num_workers > 0:
+            self.executor = ProcessPoolExecutor(
+                self.num_workers,
+                initializer=_init_worker,
+                initargs=(arm_params, self.max_velocities, self.max_accelerations, max_joint_step),
+            )
+
+    def evaluate(self, candidates: Sequence[PlanCandidate], start_angles: ArrayLike) -> List[PlanResult]:
+        """Evaluates every candidate from `start_angles`, results are in the order of the candidates."""
+        start = np.asarray(start_angles, dtype=float)
+        if self.executor is None:
+            return [
+                evaluate_candidate(
+                    self.kinematics, index, candidate, start, self.max_velocities, self.max_accelerations, self.max_joint_step
+                )
+                for index, candidate in enumerate(candidates)
+            ]
+        if len(candidates) == 0:
+            return []
+
+        paths = [np.ascontiguousarray(candidate.path, dtype=np.float64) for candidate in candidates]
+        sizes = [path.nbytes for path in paths]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(int)
+        shared = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes)))
+        packed = np.ndarray((sum(sizes),), dtype=np.uint8, buffer=shared.buf)
+        try:
+            layouts: List[_Layout] = []
+            for index, (candidate, path, offset) in enumerate(zip(candidates, paths, offsets)):
+                packed[offset : offset + path.nbytes] = path.reshape(-1).view(np.uint8)
+                layouts.append((index, int(offset), path.shape[0], path.shape[1], candidate.cartesian, candidate.blend_radius))
+
+            chunk_size = max(1, math.ceil(len(layouts) / (self.num_workers * self.chunks_per_worker)))
+            futures = [
+                self.executor.submit(_evaluate_chunk, shared.name, layouts[start_idx : start_idx + chunk_size], start)
+                for start_idx in range(0, len(layouts), chunk_size)
+            ]
+            return [result for future in futures for result in future.result()]
+        finally:
+            del packed
+            shared.close()
+            shared.unlink()
+
+    def best(self, candidates: Sequence[PlanCandidate], start_angles: ArrayLike) -> Optional[PlanResult]:
+        """Fastest valid candidate, None when no candidate is valid."""
+        valid = [result for result in self.evaluate(candidates, start_angles) if result.valid]
+        return min(valid, key=lambda result: result.duration) if valid else None
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self) -> PathPlanner:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[types.TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+"""
+    ----------------------------------------
+                    Firmware Model
+    ----------------------------------------
+"""
+
+
+@dataclasses.dataclass
+class FirmwareParameters:
+    """Joint settings the firmware times moves with, each of shape (..., J) so variants can be batched."""
+
+    speeds: np.ndarray  # SPEED_RAD_PER_S
+    steps_per_rev_motor_axis: np.ndarray  # STEPS_PER_REV_MOTOR_AXIS
+    conversion_rates: np.ndarray  # CONVERSION_RATE_AXIS_JOINTS
+    loop_period: float = 0.01  # period of the firmware message loop in seconds
+
+    @property
+    def steps_per_revolution(self) -> np.ndarray:
+        """Steps per joint revolution, truncated like the uint32 of the movement driver."""
+        return np.trunc(np.asarray(self.steps_per_rev_motor_axis, dtype=float) * np.asarray(self.conversion_rates, dtype=float))
+
+    @property
+    def step_intervals(self) -> np.ndarray:
+        """Microseconds between steps at the configured speed, as computed by `MovementDriver::update_speed`."""
+        steps_per_second = np.maximum(1, np.trunc(np.abs(self.speeds) / (2 * np.pi) * self.steps_per_revolution))
+        return np.trunc(1e6 / steps_per_second)
+
+
+@dataclasses.dataclass
+class SimulationResult:
+    """Timing of simulated programs, every array has the batch shape of the inputs followed by the moves."""
+
+    motion_times: np.ndarray  # (..., M) time until every joint reached the target of the move
+    move_times: np.ndarray  # (..., M) time each move stays at the head of the firmware move queue
+
+    @property
+    def start_times(self) -> np.ndarray:
+        return self.end_times - self.move_times
+
+    @property
+    def end_times(self) -> np.ndarray:
+        return np.cumsum(self.move_times, axis=-1)
+
+    @property
+    def cycle_times(self) -> np.ndarray:
+        """Total time (...) of each program."""
+        return self.move_times.sum(axis=-1)
+
+
+def _angle_to_steps(angles: np.ndarray, steps_per_revolution: np.ndarray) -> np.ndarray:
+    return np.trunc(angles / (2 * np.pi) * steps_per_revolution)
+
+
+def simulate_program(
+    program: ArrayLike,
+    start_angles: ArrayLike,
+    parameters: FirmwareParameters,
+    durations: Optional[ArrayLike] = None,
+) -> SimulationResult:
+    """Simulates how long the firmware takes to run a program of queued joint moves.
+
+    Follows the firmware model: the move queue is a FIFO whose head message sets the joint targets
+    on one iteration of the message loop and is popped on the first later iteration that finds every
+    joint within two steps of its target, the next message starts on the iteration after that. Joints
+    step at a constant rate derived from their speed and steps per revolution, timed moves (MOVE 15)
+    stretch the step interval to last their duration. Joints are assumed to end each move at its
+    target, the firmware leaves them within two steps of it.
+
+    Everything is vectorized: batch dimensions of the program, start angles, durations and
+    parameters broadcast together, so many programs or parameter variants run in a single call.
+
+    Args:
+        program (ArrayLike): Joint targets of every move, shape (..., M, J).
+        start_angles (ArrayLike): Joint angles before the first move, shape (..., J).
+        parameters (FirmwareParameters): Joint settings, each of shape (..., J).
+        durations (Optional[ArrayLike]): Duration of every move (..., M), moves with a duration of zero or
+            less (or all of them when None) run at the configured speeds.
+
+    Returns:
+        SimulationResult: Motion and queue time of every move.
+    """
+    targets = np.asarray(program, dtype=float)
+    start = np.asarray(start_angles, dtype=float)[..., None, :]
+    steps_per_revolution = parameters.steps_per_revolution[..., None, :]
+    batch_shape = np.broadcast_shapes(start.shape[:-2], targets.shape[:-2])
+    targets = np.broadcast_to(targets, batch_shape + targets.shape[-2:])
+    previous = np.concatenate([np.broadcast_to(start, batch_shape + start.shape[-2:]), targets[..., :-1, :]], axis=-2)
+
+    num_steps = np.abs(_angle_to_steps(targets, steps_per_revolution) - _angle_to_steps(previous, steps_per_revolution))
+    intervals = parameters.step_intervals[..., None, :]
+    if durations is not None:
+        durations = np.asarray(durations, dtype=float)[..., None]
+        timed_intervals = np.trunc(durations * 1e6 / np.maximum(1, num_steps))
+        intervals = np.where(durations > 0, np.maximum(intervals, timed_intervals), intervals)
+
+    # A joint is at its target once less than two steps away, so the last step is never waited for
+    motion_times = (np.maximum(0, num_steps - 1) * intervals).max(axis=-1) / 1e6
+    loop = parameters.loop_period
+    polls = np.maximum(1, np.ceil(motion_times / loop - 1e-9))
+    return SimulationResult(motion_times, (polls + 1) * loop)
@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+from enum import Enum
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+"""
+    ----------------------------------------
+                    Timed Trajectories
+    ----------------------------------------
+"""
+
+
+@dataclasses.dataclass
+class TimedTrajectory:
+    """Joint positions and velocities at increasing instants, starting at t = 0."""
+
+    times: np.ndarray  # N
+    positions: np.ndarray  # NxJ
+    velocities: np.ndarray  # NxJ
+    tool_values: Optional[np.ndarray] = None  # N, tool target commanded when leaving each position, NaN keeps the tool
+
+    @property
+    def duration(self) -> float:
+        return float(self.times[-1]) if len(self.times) > 0 else 0.0
+
+    @property
+    def segment_durations(self) -> np.ndarray:
+        """Time (N-1) between each position and the next one."""
+        return np.diff(self.times)
+
+
+def _segment_lengths(path: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(np.diff(path, axis=0), axis=1)
+
+
+def _subdivide(path: np.ndarray, resolution: float) -> np.ndarray:
+    """Drops repeated waypoints and splits every segment in pieces no longer than `resolution`."""
+    lengths = _segment_lengths(path)
+    keep = np.concatenate([[True], lengths > 1e-12])
+    path = path[keep]
+    if len(path) < 2:
+        return path
+
+    lengths = _segment_lengths(path)
+    pieces = np.maximum(1, np.ceil(lengths / resolution).astype(int))
+    starts = np.repeat(path[:-1], pieces, axis=0)
+    steps = np.repeat(np.diff(path, axis=0) / pieces[:, None], pieces, axis=0)
+    fractions = np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    return np.vstack([starts + steps * fractions[:, None], path[-1:]])
+
+
+def _max_path_acceleration(residual: np.ndarray, direction: np.ndarray) -> float:
+    """Largest path acceleration u such that |direction_j * u| <= residual_j for every joint."""
+    moving = np.abs(direction) > 1e-12
+    if not moving.any():
+        return np.inf
+    return float(np.min(residual[moving] / np.abs(direction[moving])))
+
+
+def _max_next_speed(
+    x_from: float, length: float, a_max: np.ndarray, direction: np.ndarray, curvature_from: np.ndarray, curvature_to: np.ndarray
+) -> float:
+    """Largest x = ṡ² at the end of a segment reachable from `x_from` with a constant path acceleration.
+
+    The acceleration must fit the budget left by the curvature at both ends of the segment:
+    |direction_j| u + |curvature_j| x <= a_j, with u = (x_to - x_from) / (2 length).
+    """
+    tangent = np.abs(direction)
+    moving = tangent > 1e-12
+    if not moving.any():
+        return np.inf
+    tangent, a_max = tangent[moving], a_max[moving]
+    at_start = x_from + 2 * length * (a_max - np.abs(curvature_from[moving]) * x_from) / tangent
+    at_end = (x_from + 2 * length * a_max / tangent) / (1 + 2 * length * np.abs(curvature_to[moving]) / tangent)
+    return float(min(at_start.min(), at_end.min()))
+
+
+def time_optimal_parameterization(
+    path: np.ndarray,
+    max_velocities: ArrayLike,
+    max_accelerations: ArrayLike,
+    resolution: float = 0.01,
+    curvature_share: float = 0.5,
+) -> TimedTrajectory:
+    """Fastest timing of a joint path that starts and ends at rest within per joint limits.
+
+    The path is resampled every `resolution` (joint space distance) and parameterized by its arc
+    length s. With x = ṡ², joint velocities are q'(s) ṡ and accelerations q''(s) x + q'(s) s̈. Every grid
+    point gets a velocity cap from the joint speeds and from the path curvature, which may use up to
+    `curvature_share` of each joint acceleration. A forward pass then accelerates as much as the rest
+    of the acceleration budget allows and a backward pass brakes in time for every cap, the classic
+    bang-bang profile of time optimal path parameterization.
+
+    Args:
+        path (np.ndarray): NxJ joint waypoints in radians, followed in order along straight segments.
+        max_velocities (ArrayLike): Speed limit of each joint in rad/s.
+        max_accelerations (ArrayLike): Acceleration limit of each joint in rad/s².
+        resolution (float): Max joint space distance between consecutive points of the result.
+        curvature_share (float): Share of the acceleration limits reserved for turning at corners.
+
+    Returns:
+        TimedTrajectory: The resampled path with the time and joint velocities of each point.
+
+    Raises:
+        ValueError: If the path is not a NxJ array or a limit is not positive.
+    """
+    path = np.asarray(path, dtype=float)
+    v_max = np.asarray(max_velocities, dtype=float)
+    a_max = np.asarray(max_accelerations, dtype=float)
+    if path.ndim != 2 or path.shape[1] != len(v_max) or len(v_max) != len(a_max):
+        raise ValueError("path must be a NxJ array with one velocity and acceleration limit per joint")
+    if np.any(v_max <= 0) or np.any(a_max <= 0):
+        raise ValueError("Velocity and acceleration limits must be positive")
+
+    path = _subdivide(path, resolution)
+    num_points, num_joints = path.shape
+    if num_points < 2:
+        return TimedTrajectory(np.zeros(num_points), path, np.zeros_like(path))
+
+    lengths = _segment_lengths(path)
+    directions = np.diff(path, axis=0) / lengths[:, None]  # q'(s) along each segment
+    incoming = np.vstack([directions[:1], directions])
+    outgoing = np.vstack([directions, directions[-1:]])
+    curvature = np.zeros_like(path)  # q''(s)
+    curvature[1:-1] = (directions[1:] - directions[:-1]) / ((lengths[1:] + lengths[:-1]) / 2)[:, None]
+
+    with np.errstate(divide="ignore"):
+        x_cap = np.min((v_max / np.maximum(np.abs(incoming), np.abs(outgoing))) ** 2, axis=1)
+        x_cap = np.minimum(x_cap, np.min(curvature_share * a_max / np.abs(curvature), axis=1))
+    x_cap[[0, -1]] = 0
+
+    x = x_cap.copy()
+    for i in range(num_points - 1):
+        x[i + 1] = min(x[i + 1], _max_next_speed(x[i], lengths[i], a_max, directions[i], curvature[i], curvature[i + 1]))
+    # Braking is accelerating along the reversed path
+    for i in range(num_points - 1, 0, -1):
+        x[i - 1] = min(x[i - 1], _max_next_speed(x[i], lengths[i - 1], a_max, directions[i - 1], curvature[i], curvature[i - 1]))
+
+    speeds = np.sqrt(np.maximum(x, 0))
+    denominators = speeds[:-1] + speeds[1:]
+    durations = np.empty(num_points - 1)
+    moving = denominators > 0
+    durations[moving] = 2 * lengths[moving] / denominators[moving]
+    # Only a single short segment can start and end at rest, it takes a triangular profile
+    for segment in np.flatnonzero(~moving):
+        durations[segment] = 2 * np.sqrt(lengths[segment] / _max_path_acceleration(a_max, directions[segment]))
+
+    times = np.concatenate([[0.0], np.cumsum(durations)])
+    velocities = outgoing * speeds[:, None]
+    return TimedTrajectory(times, path, velocities)
+
+
+def point_to_point_segment_durations(path: np.ndarray, max_velocities: ArrayLike, max_accelerations: ArrayLike) -> np.ndarray:
+    """Time of each move of a joint path (N-1), every move from rest to rest with a synchronized trapezoidal profile."""
+    path = np.asarray(path, dtype=float)
+    v_max = np.asarray(max_velocities, dtype=float)
+    a_max = np.asarray(max_accelerations, dtype=float)
+    distances = np.abs(np.diff(path, axis=0))
+    # Trapezoidal when the joint reaches its top speed, triangular otherwise
+    cruising = distances >= v_max**2 / a_max
+    times = np.where(cruising, distances / v_max + v_max / a_max, 2 * np.sqrt(distances / a_max))
+    return times.max(axis=1) if len(times) > 0 else np.zeros(0)
+
+
+def point_to_point_duration(path: np.ndarray, max_velocities: ArrayLike, max_accelerations: ArrayLike) -> float:
+    """Time to follow a joint path stopping at every waypoint, each move with a synchronized trapezoidal profile.
+
+    This is how a queue of independent moves runs, the reference `time_optimal_parameterization` improves on.
+    """
+    return float(point_to_point_segment_durations(path, max_velocities, max_accelerations).sum())
+
+
+"""
+    ----------------------------------------
+                    Corner Blending
+    ----------------------------------------
+"""
+
+
+def blend_corners(path: np.ndarray, blend_radius: ArrayLike, resolution: float = 0.01) -> np.ndarray:
+    """Replaces the corner at every interior waypoint with a parabolic blend, so the arm passes near it without stopping.
+
+    The blend leaves the incoming segment `blend_radius` (joint space distance) before the waypoint
+    and joins the outgoing one as far after it, following the quadratic Bézier curve with the waypoint
+    as control point. Radii are capped to half of each adjacent segment so blends never overlap.
+
+    Args:
+        path (np.ndarray): NxJ joint waypoints in radians.
+        blend_radius (ArrayLike): Radius shared by every corner, or one per waypoint. A zero radius keeps
+            the waypoint exact, as needed at pick and place poses. The first and last waypoints are never blended.
+        resolution (float): Max joint space distance between consecutive points of a blend.
+
+    Returns:
+        np.ndarray: The path with every blended corner replaced by its sampled blend.
+
+    Raises:
+        ValueError: If a radius is negative or there is not one per waypoint.
+    """
+    path = np.asarray(path, dtype=float)
+    radii = np.broadcast_to(np.asarray(blend_radius, dtype=float), (len(path),))
+    if np.any(radii < 0):
+        raise ValueError("blend_radius must not be negative")
+    if len(path) < 3:
+        return path
+
+    lengths = _segment_lengths(path)
+    blended = [path[:1]]
+    for i in range(1, len(path) - 1):
+        radius = min(radii[i], lengths[i - 1] / 2, lengths[i] / 2)
+        if radius <= 1e-12:
+            blended.append(path[i : i + 1])
+            continue
+        entry_point = path[i] - radius * (path[i] - path[i - 1]) / lengths[i - 1]
+        exit_point = path[i] + radius * (path[i + 1] - path[i]) / lengths[i]
+        u = np.linspace(0, 1, max(3, math.ceil(2 * radius / resolution) + 1))[:, None]
+        blended.append((1 - u) ** 2 * entry_point + 2 * u * (1 - u) * path[i] + u**2 * exit_point)
+    blended.append(path[-1:])
+    return np.vstack(blended)
+
+
+"""
+    ----------------------------------------
+                    Tool Targets
+    ----------------------------------------
+"""
+
+
+def attach_tool_targets(
+    trajectory: TimedTrajectory, waypoints: np.ndarray, tool_targets: ArrayLike, blend_radius: ArrayLike = 0.0
+) -> TimedTrajectory:
+    """Schedules tool targets at the waypoints a trajectory goes through, so the tool moves while the arm does.
+
+    The target of a waypoint is commanded together with the move that leaves the closest point of
+    the trajectory to it (the middle of the blend at a blended corner), the tool then reaches it
+    during the following moves. Waypoints are matched in order, so paths that come back to a
+    previous waypoint are matched to the right pass.
+
+    Args:
+        trajectory (TimedTrajectory): Trajectory through the waypoints, e.g. planned from them.
+        waypoints (np.ndarray): MxJ joint waypoints the trajectory goes through, in order.
+        tool_targets (ArrayLike): M tool values, NaN at waypoints that leave the tool as it is.
+        blend_radius (ArrayLike): Blend radius used at the waypoints (shared or one per waypoint), how far
+            from a waypoint the trajectory may pass.
+
+    Returns:
+        TimedTrajectory: The trajectory with its `tool_values` set.
+
+    Raises:
+        ValueError: If there is not one tool target per waypoint or a waypoint is not on the trajectory.
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    targets = np.asarray(tool_targets, dtype=float)
+    if targets.shape != (len(waypoints),):
+        raise ValueError("There must be one tool target per waypoint")
+    radii = np.broadcast_to(np.asarray(blend_radius, dtype=float), (len(waypoints),))
+
+    positions = trajectory.positions
+    spacing = float(_segment_lengths(positions).max()) if len(positions) > 1 else 0.0
+    tool_values = np.full(len(positions), np.nan)
+    start = 0
+    for waypoint, target, radius in zip(waypoints, targets, radii):
+        distances = np.linalg.norm(positions[start:] - waypoint, axis=1)
+        near = np.flatnonzero(distances <= radius + spacing + 1e-9)
+        if len(near) == 0:
+            raise ValueError(f"Waypoint {waypoint} is not on the trajectory")
+        # Closest point of the first pass near the waypoint
+        index = near[0]
+        while index + 1 < len(distances) and distances[index + 1] < distances[index]:
+            index += 1
+        start += int(index)
+        if not np.isnan(target):
+            tool_values[start] = target
+    return dataclasses.replace(trajectory, tool_values=tool_values)
+
+
+"""
+    ----------------------------------------
+                    Splines
+    ----------------------------------------
+"""
+
+
+class SplineKind(Enum):
+    CUBIC = 3  # continuous velocity and acceleration, at rest at both ends
+    QUINTIC = 5  # continuous acceleration, zero velocity and acceleration at both ends
+
+
+def _clamped_cubic_velocities(points: np.ndarray, h: np.ndarray) -> np.ndarray:
+    """Knot velocities of the C2 cubic spline through `points` that starts and ends at rest.
+
+    Solves the tridiagonal system of the interior knots with the Thomas algorithm, for every column at once.
+    """
+    num_knots = len(points)
+    velocities = np.zeros_like(points)
+    if num_knots < 3:
+        return velocities
+
+    slopes = np.diff(points, axis=0) / h[:, None]
+    # Row i holds knot i + 1: lower[i] v[i] + diagonal[i] v[i + 1] + upper[i] v[i + 2] = rhs[i]
+    lower = h[1:]
+    diagonal = 2 * (h[:-1] + h[1:])
+    upper = h[:-1]
+    rhs = 3 * (h[1:, None] * slopes[:-1] + h[:-1, None] * slopes[1:])
+
+    # Forward sweep then back substitution, the end velocities are zero
+    size = num_knots - 2
+    c = np.zeros(size)
+    d = np.zeros_like(rhs)
+    for i in range(size):
+        denominator = diagonal[i] - (lower[i] * c[i - 1] if i > 0 else 0)
+        c[i] = upper[i] / denominator
+        d[i] = (rhs[i] - (lower[i] * d[i - 1] if i > 0 else 0)) / denominator
+    for i in range(size - 2, -1, -1):
+        d[i] -= c[i] * d[i + 1]
+    velocities[1:-1] = d
+    return velocities
+
+
+class SplineTrajectory:
+    """Piecewise polynomial trajectory through timed waypoints.
+
+    Coefficients are stored per segment as a (segments, order + 1, dimensions) array, lowest power
+    first and relative to the start time of the segment. Waypoints may be joint angles or poses,
+    the spline only sees columns.
+    """
+
+    def __init__(self, knots: np.ndarray, coefficients: np.ndarray) -> None:
+        self.knots: np.ndarray = np.asarray(knots, dtype=float)
+        self.coefficients: np.ndarray = np.asarray(coefficients, dtype=float)
+
+    @property
+    def duration(self) -> float:
+        return float(self.knots[-1] - self.knots[0])
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.coefficients.shape[2])
+
+    @classmethod
+    def fit(cls, waypoints: np.ndarray, times: ArrayLike, kind: SplineKind = SplineKind.CUBIC) -> "SplineTrajectory":
+        """Fits a spline through `waypoints` reached at `times`, at rest at the first and last waypoint.
+
+        Args:
+            waypoints (np.ndarray): NxD waypoints, N >= 2.
+            times (ArrayLike): N strictly increasing times in seconds.
+            kind (SplineKind): Cubic splines have the smallest overall acceleration, quintic ones also
+                start and end with zero acceleration.
+
+        Raises:
+            ValueError: If the shapes do not match or the times are not strictly increasing.
+        """
+        points = np.asarray(waypoints, dtype=float)
+        knots = np.asarray(times, dtype=float)
+        if points.ndim != 2 or len(points) < 2 or knots.shape != (len(points),):
+            raise ValueError("waypoints must be a NxD array with N >= 2 and one time per waypoint")
+        h = np.diff(knots)
+        if np.any(h <= 0):
+            raise ValueError("times must be strictly increasing")
+
+        delta = np.diff(points, axis=0)
+        h_col = h[:, None]
+        if kind == SplineKind.CUBIC:
+            v = _clamped_cubic_velocities(points, h)
+            v0, v1 = v[:-1], v[1:]
+            coefficients = np.stack(
+                [points[:-1], v0, (3 * delta / h_col - 2 * v0 - v1) / h_col, (v0 + v1 - 2 * delta / h_col) / h_col**2], axis=1
+            )
+            return cls(knots, coefficients)
+
+        # Quintic: knot velocities average the neighbouring slopes unless the motion reverses there
+        slopes = delta / h_col
+        v = np.zeros_like(points)
+        same_direction = np.sign(slopes[:-1]) == np.sign(slopes[1:])
+        v[1:-1] = np.where(same_direction, (slopes[:-1] + slopes[1:]) / 2, 0)
+        a = np.zeros_like(points)
+        a[1:-1] = (v[2:] - v[:-2]) / (h[:-1] + h[1:])[:, None]
+        v0, v1, a0, a1 = v[:-1], v[1:], a[:-1], a[1:]
+        coefficients = np.stack(
+            [
+                points[:-1],
+                v0,
+                a0 / 2,
+                (20 * delta - (8 * v1 + 12 * v0) * h_col - (3 * a0 - a1) * h_col**2) / (2 * h_col**3),
+                (-30 * delta + (14 * v1 + 16 * v0) * h_col + (3 * a0 - 2 * a1) * h_col**2) / (2 * h_col**4),
+                (12 * delta - 6 * (v1 + v0) * h_col - (a0 - a1) * h_col**2) / (2 * h_col**5),
+            ],
+            axis=1,
+        )
+        return cls(knots, coefficients)
+
+    @classmethod
+    def fit_within_limits(
+        cls,
+        waypoints: np.ndarray,
+        max_velocities: ArrayLike,
+        max_accelerations: ArrayLike,
+        kind: SplineKind = SplineKind.CUBIC,
+        check_rate: float = 200.0,
+    ) -> "SplineTrajectory":
+        """Fits a joint spline timed by the point to point move times, slowed down until it meets every limit.
+
+        Limits are checked every 1 / `check_rate` seconds, scaling time by k divides velocities by k
+        and accelerations by k².
+        """
+        points = np.asarray(waypoints, dtype=float)
+        durations = np.maximum(point_to_point_segment_durations(points, max_velocities, max_accelerations), 1e-6)
+        spline = cls.fit(points, np.concatenate([[0.0], np.cumsum(durations)]), kind)
+
+        t = np.linspace(0, spline.duration, max(2, int(spline.duration * check_rate) + 1))
+        velocity_ratio = np.max(np.abs(spline.evaluate(t, 1)) / np.asarray(max_velocities, dtype=float))
+        acceleration_ratio = np.max(np.abs(spline.evaluate(t, 2)) / np.asarray(max_accelerations, dtype=float))
+        scale = max(1.0, float(velocity_ratio), float(np.sqrt(acceleration_ratio)))
+        if scale > 1:
+            spline = cls.fit(points, spline.knots * scale, kind)
+        return spline
+
+    def evaluate(self, t: ArrayLike, derivative: int = 0) -> np.ndarray:
+        """Positions (or their `derivative`) at the times `t`, clamped to the spline duration.
+
+        Returns:
+            np.ndarray: Array of shape t.shape + (D,).
+        """
+        times = np.clip(np.asarray(t, dtype=float), self.knots[0], self.knots[-1])
+        segments = np.clip(np.searchsorted(self.knots, times, side="right") - 1, 0, len(self.knots) - 2)
+        tau = (times - self.knots[segments])[..., None]
+
+        coefficients = self.coefficients[segments]
+        order = coefficients.shape[-2] - 1
+        result = np.zeros(times.shape + (self.dimensions,))
+        # Horner over the derivative of the polynomial, highest power first
+        for power in range(order, derivative - 1, -1):
+            factor = math.prod(range(power - derivative + 1, power + 1))
+            result = result * tau + factor * coefficients[..., power, :]
+        return result
+
+    def sample_chunks(self, rate_hz: float, chunk_size: int = 256) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Lazily samples the spline every 1 / `rate_hz` seconds, always ending at the last waypoint.
+
+        Yields:
+            Tuple[np.ndarray, np.ndarray]: Up to `chunk_size` sample times and the Mx D positions at them.
+        """
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        num_samples = int(math.floor(self.duration * rate_hz + 1e-9)) + 1
+        last_on_grid = (num_samples - 1) / rate_hz >= self.duration - 1e-9
+        # An end off the grid is one more sample, placed at the last waypoint
+        total = num_samples if last_on_grid else num_samples + 1
+        for start in range(0, total, chunk_size):
+            times = self.knots[0] + np.arange(start, min(start + chunk_size, total)) / rate_hz
+            if start + chunk_size >= total:
+                times[-1] = self.knots[-1]
+            yield times, self.evaluate(times)
+
+    def sample(self, rate_hz: float) -> Iterator[Tuple[float, np.ndarray]]:
+        """Lazily yields every (time, position) sample of `sample_chunks`."""
+        for times, positions in self.sample_chunks(rate_hz):
+            yield from zip(times.tolist(), positions)
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmKinematics, ArmPose, KinematicModel
+from ribot.utils.algebra import create_rotation_matrices_from_euler_angles
+from ribot.utils.prints import console
+
+"""
+    ----------------------------------------
+                    Helper Functions
+    ----------------------------------------
+"""
+
+
+def model_fingerprint(model: KinematicModel) -> str:
+    """Digest of the link offsets and joint bounds of a kinematic model.
+
+    Unlike `KinematicModel.revision` it is stable across processes, so it identifies the arm
+    an index persisted to disk was built for.
+    """
+    digest = hashlib.sha1()
+    for array in (model.offsets, model.lower, model.upper):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def model_reach(model: KinematicModel) -> float:
+    """Sum of the link lengths, no configuration takes the TCP further from the base. 0 for unset arm parameters."""
+    return float(np.linalg.norm(model.offsets, axis=1).sum())
+
+
+def _dilate(grid: np.ndarray, margin: int, wrapped_axes: Tuple[int, ...] = ()) -> np.ndarray:
+    """Grows the True cells of a boolean grid by `margin` cells along every axis."""
+    for _ in range(margin):
+        grown = grid.copy()
+        for axis in range(grid.ndim):
+            if grid.shape[axis] < 2:
+                continue
+            if axis in wrapped_axes:
+                grown |= np.roll(grid, 1, axis=axis) | np.roll(grid, -1, axis=axis)
+                continue
+            head = [slice(None)] * grid.ndim
+            tail = [slice(None)] * grid.ndim
+            head[axis], tail[axis] = slice(1, None), slice(None, -1)
+            grown[tuple(head)] |= grid[tuple(tail)]
+            grown[tuple(tail)] |= grid[tuple(head)]
+        grid = grown
+    return grid
+
+
+"""
+    ----------------------------------------
+                    ReachabilityIndex
+    ----------------------------------------
+"""
+
+
+class ReachabilityIndex:
+    """Voxel grid of the positions (and optionally tool directions) the arm can reach.
+
+    Built from a forward kinematics sweep of joint configurations sampled within the joint bounds.
+    Every cell holding a sample is marked reachable and then grown by `margin` cells. Sampling can
+    miss reachable cells, so an empty cell is only likely unreachable: poses are rejected without IK
+    by `beyond_reach`, the conservative bound of the grid, never by the cells alone.
+
+    Orientation is binned by the direction of the tool x axis (azimuth and elevation), the roll
+    about that axis is not indexed. Cells are stored as a packed bit array, which is persisted
+    after a small JSON header and memory mapped when loaded.
+    """
+
+    MAGIC = b"RIBOTWS1"
+
+    def __init__(
+        self,
+        bits: np.ndarray,
+        origin: np.ndarray,
+        voxel_size: float,
+        shape: Tuple[int, ...],
+        fingerprint: str,
+    ) -> None:
+        self.bits: np.ndarray = bits
+        self.origin: np.ndarray = np.asarray(origin, dtype=float)
+        self.voxel_size: float = float(voxel_size)
+        # (nx, ny, nz, azimuth bins, elevation bins)
+        self.shape: Tuple[int, ...] = tuple(int(size) for size in shape)
+        self.fingerprint: str = fingerprint
+        self.strides: np.ndarray = np.array([int(np.prod(self.shape[i + 1 :])) for i in range(len(self.shape))])
+        self._revision: Optional[Tuple[int, int]] = None
+
+    @property
+    def num_cells(self) -> int:
+        return int(np.prod(self.shape))
+
+    @classmethod
+    def build(
+        cls,
+        kinematics: ArmKinematics,
+        voxels_per_axis: int = 64,
+        orientation_bins: Tuple[int, int] = (1, 1),
+        num_samples: int = 1_000_000,
+        margin: int = 1,
+        chunk_size: int = 100_000,
+        seed: Optional[int] = None,
+    ) -> "ReachabilityIndex":
+        """Sweeps the joint space of an arm and indexes the reached cells.
+
+        Args:
+            kinematics (ArmKinematics): Kinematics of the arm, the index follows its current parameters.
+            voxels_per_axis (int): Number of voxels along each axis of the cube enclosing the workspace.
+            orientation_bins (Tuple[int, int]): Number of azimuth and elevation bins of the tool direction.
+            num_samples (int): Number of joint configurations to sample.
+            margin (int): Number of cells every reached cell is grown by, orientation bins spread the
+                samples thinner and need a larger margin (or more samples) to avoid false rejections.
+            chunk_size (int): Number of configurations per forward kinematics batch.
+            seed (Optional[int]): Seed of the joint configuration sampler.
+        """
+        model = kinematics.model
+        reach = model_reach(model)
+        voxel_size = 2 * reach / voxels_per_axis if reach > 0 else 1.0
+        origin = np.full(3, -reach)
+        shape = (voxels_per_axis, voxels_per_axis, voxels_per_axis, *orientation_bins)
+
+        index = cls(np.zeros(0, dtype=np.uint8), origin, voxel_size, shape, model_fingerprint(model))
+        grid = np.zeros(index.num_cells, dtype=bool)
+        rng = np.random.default_rng(seed)
+        for start in range(0, num_samples, chunk_size):
+            count = min(chunk_size, num_samples - start)
+            angles = rng.uniform(model.lower, model.upper, (count, model.num_joints))
+            frames = kinematics.angles_to_frames_batch(angles)
+            cells, inside = index._cells(frames[:, :3, 3], frames[:, :3, 0])
+            grid[cells[inside]] = True
+
+        grid = _dilate(grid.reshape(shape), margin, wrapped_axes=(3,))
+        index.bits = np.packbits(grid.reshape(-1))
+        index._revision = model.revision
+        return index
+
+    def _cells(self, positions: np.ndarray, directions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Flat cell index of each position and tool direction, and whether it lies within the grid."""
+        voxels = np.floor((positions - self.origin) / self.voxel_size).astype(np.int64)
+        inside = np.all((voxels >= 0) & (voxels < np.array(self.shape[:3])), axis=1)
+        azimuth_bins, elevation_bins = self.shape[3:]
+        azimuth = np.arctan2(directions[:, 1], directions[:, 0])
+        elevation = np.arcsin(np.clip(directions[:, 2], -1, 1))
+        azimuth_bin = np.floor((azimuth + np.pi) / (2 * np.pi) * azimuth_bins).astype(np.int64) % azimuth_bins
+        elevation_bin = np.clip(
+            np.floor((elevation + np.pi / 2) / np.pi * elevation_bins).astype(np.int64), 0, elevation_bins - 1
+        )
+        cells = np.column_stack([voxels, azimuth_bin, elevation_bin]) @ self.strides
+        return np.where(inside, cells, 0), inside
+
+    def maybe_reachable_batch(self, poses: np.ndarray) -> np.ndarray:
+        """Looks up many poses at once.
+
+        Args:
+            poses (np.ndarray): Nx6 array of poses as (x, y, z, roll, pitch, yaw) rows.
+
+        Returns:
+            np.ndarray: Boolean mask of size N, False for the poses in cells no sampled configuration came near.
+        """
+        poses = np.asarray(poses, dtype=float)
+        if poses.ndim != 2 or poses.shape[1] != 6:
+            raise ValueError("poses must be a Nx6 array")
+        R = create_rotation_matrices_from_euler_angles(poses[:, 3], poses[:, 4], poses[:, 5])
+        cells, inside = self._cells(poses[:, :3], R[:, :, 0])
+        marked = (self.bits[cells >> 3] >> (7 - (cells & 7))) & 1
+        return inside & (marked == 1)
+
+    def maybe_reachable(self, pose: ArmPose) -> bool:
+        """Single pose version of `maybe_reachable_batch`."""
+        return bool(self.maybe_reachable_batch(np.array([pose.as_tuple]))[0])
+
+    @property
+    def reach(self) -> float:
+        """Sum of the link lengths the grid was sized for, no pose further from the base is reachable."""
+        return -float(self.origin[0])
+
+    def beyond_reach_batch(self, poses: np.ndarray) -> np.ndarray:
+        """Mask of the poses (Nx6) further from the base than `reach`, the only poses that are definitely unreachable."""
+        poses = np.asarray(poses, dtype=float)
+        if poses.ndim != 2 or poses.shape[1] != 6:
+            raise ValueError("poses must be a Nx6 array")
+        return np.linalg.norm(poses[:, :3], axis=1) > self.reach
+
+    def beyond_reach(self, pose: ArmPose) -> bool:
+        """Single pose version of `beyond_reach_batch`."""
+        return bool(self.beyond_reach_batch(np.array([pose.as_tuple]))[0])
+
+    def reachable_region(self) -> np.ndarray:
+        """Centers (Nx3) of the voxels that are possibly reachable with any tool direction."""
+        grid = np.unpackbits(self.bits, count=self.num_cells).reshape(self.shape)
+        voxels = np.argwhere(grid.any(axis=(3, 4)))
+        return self.origin + (voxels + 0.5) * self.voxel_size
+
+    def matches(self, kinematics: ArmKinematics) -> bool:
+        """Whether the index was built for the current parameters of `kinematics`."""
+        model = kinematics.model
+        if self._revision == model.revision:
+            return True
+        if model_fingerprint(model) != self.fingerprint:
+            return False
+        self._revision = model.revision
+        return True
+
+    """
+    ----------------------------------------
+                    Persistence
+    ----------------------------------------
+    """
+
+    def header(self) -> Dict[str, Any]:
+        return {
+            "origin": self.origin.tolist(),
+            "voxel_size": self.voxel_size,
+            "shape": list(self.shape),
+            "fingerprint": self.fingerprint,
+        }
+
+    def save(self, file: Union[str, Path]) -> None:
+        """Writes the index to a temporary file next to `file` and then replaces `file` with it.
+
+        `file` is never truncated in place: a loaded index may still memory map it, and a failed write
+        leaves the previous index intact.
+        """
+        file = Path(file)
+        header = json.dumps(self.header()).encode()
+        descriptor, temporary = tempfile.mkstemp(prefix=f".{file.name}.", dir=file.parent)
+        try:
+            with os.fdopen(descriptor, "wb") as stream:
+                stream.write(self.MAGIC)
+                stream.write(len(header).to_bytes(4, "little"))
+                stream.write(header)
+                stream.write(self.bits.tobytes())
+            os.replace(temporary, file)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, file: Union[str, Path]) -> "ReachabilityIndex":
+        """Loads an index saved with `save`, the bit array is memory mapped read only.
+
+        Raises:
+            ValueError: If the file is not a reachability index.
+        """
+        with open(file, "rb") as stream:
+            if stream.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{file} is not a reachability index")
+            header_size = int.from_bytes(stream.read(4), "little")
+            header = json.loads(stream.read(header_size))
+        offset = len(cls.MAGIC) + 4 + header_size
+        shape = tuple(header["shape"])
+        num_bytes = (int(np.prod(shape)) + 7) // 8
+        bits = np.memmap(file, dtype=np.uint8, mode="r", offset=offset, shape=(num_bytes,))
+        return cls(bits, np.array(header["origin"]), header["voxel_size"], shape, header["fingerprint"])
+
+    @classmethod
+    def load_or_build(cls, kinematics: ArmKinematics, file: Union[str, Path], **build_kwargs: Any) -> "ReachabilityIndex":
+        """Loads the index persisted in `file`, rebuilding and saving it when it belongs to other arm parameters.
+
+        An index of an arm without links (unset parameters) is returned but never saved.
+        """
+        file = Path(file)
+        if file.exists():
+            try:
+                index = cls.load(file)
+                if index.matches(kinematics):
+                    return index
+            except (ValueError, OSError, KeyError) as exception:
+                console.log(f"Could not load reachability index {file}: {exception}", style="error")
+
+        index = cls.build(kinematics, **build_kwargs)
+        if index.reach > 0:
+            index.save(file)
+        return index
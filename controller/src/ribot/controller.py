@@ -1,19 +1,65 @@
 import dataclasses
+import itertools
+import math
 import threading
 import time
 from enum import Enum
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
 
 import numpy as np
 import toml  # type: ignore
-
-from ribot.control.arm_kinematics import ArmKinematics, ArmParameters, ArmPose
+from numpy.typing import ArrayLike
+
+from ribot.control.arm_kinematics import (
+    ArmKinematics,
+    ArmParameters,
+    ArmPose,
+    travel_time_cost,
+)
+from ribot.control.cartesian import arc_path, linear_path
 from ribot.control.controller_servers import ControllerServer, WebsocketServer
+from ribot.control.planner import PathPlanner
+from ribot.control.simulator import (
+    FirmwareParameters,
+    SimulationResult,
+    simulate_program,
+)
+from ribot.control.trajectory import (
+    SplineTrajectory,
+    TimedTrajectory,
+    attach_tool_targets,
+    blend_corners,
+    time_optimal_parameterization,
+)
+from ribot.control.workspace import ReachabilityIndex, model_reach
 from ribot.utils.algebra import allclose
+from ribot.utils.command_ledger import (
+    ACK_STRUCT,
+    COMMAND_DONE_CODE,
+    COMMAND_QUEUED_CODE,
+    SEQUENCE_MARK_CODE,
+    SEQUENCE_STRUCT,
+    Command,
+    CommandLedger,
+)
 from ribot.utils.fifo_lock import FIFOLock
-from ribot.utils.messages import Message, MessageOp
+from ribot.utils.messages import (
+    MOVE_BATCH_CODE,
+    Message,
+    MessageOp,
+    PayloadMessage,
+    move_batch_messages,
+)
 from ribot.utils.prints import console
+from ribot.utils.waypoint_codec import (
+    COMPACT_BATCH_CODE,
+    HEADER,
+    LINK_FEATURES_REQUEST_CODE,
+    LINK_FEATURES_RESPONSE_CODE,
+    LinkFeature,
+    compact_batch_messages,
+)
 
 
 class Settings(Enum):
@@ -23,6 +69,7 @@ class Settings(Enum):
     CONVERSION_RATE_AXIS_JOINTS = 13
     HOMING_OFFSET_RADS = 17
     DIR_INVERTED = 31
+    ACCELERATION_RAD_PER_S2 = 37
 
 
 @dataclasses.dataclass
@@ -33,6 +80,26 @@ class Setting:
     last_updated: float = -1
 
 
+@dataclasses.dataclass
+class StreamStats:
+    """Counters of the last `ArmController.stream` call."""
+
+    sent: int = 0
+    refills: int = 0
+    underruns: int = 0  # times the firmware move queue ran empty while setpoints were pending
+    started_at: float = 0
+    finished_at: float = 0
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Setpoints sent per second."""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+
 class ControllerStatus(Enum):
     NOT_STARTED = 0
     WAITING_CONNECTION = 1
@@ -61,16 +128,31 @@ class ArmController:
         self.arm_params = arm_parameters
         self.num_joints: int = len(self._current_angles)
         self.kinematics: ArmKinematics = ArmKinematics(self.arm_params)
+        self.reachability_file: Optional[Path] = None
+        self._reachability: Optional[ReachabilityIndex] = None
+        self._reachability_thread: Optional[threading.Thread] = None
 
         self.joint_settings: List[Dict[Settings, Setting]] = []
         self.joint_settings_response_code: List[Dict[int, Setting]] = []
 
         self.last_status_time: float = 0
+        self.status_count: int = 0
+        self.status_condition: threading.Condition = threading.Condition()
+        self.stream_stats: StreamStats = StreamStats()
 
         self.status: ControllerStatus = ControllerStatus.NOT_STARTED
 
         self.print_status = False
         self.print_idx = 0
+        # Send timed moves batched in MOVE 19 frames, disable for firmware without them
+        self.batch_moves: bool = True
+        # Fixed point batches (MOVE 21) when the firmware reports them, see `request_link_features`
+        self.compact_moves: bool = True
+        self.compact_max_error: float = 1e-4
+        self.link_features: LinkFeature = LinkFeature(0)
+        # Move commands in flight, only with firmware reporting sequenced commands, see `send_moves`
+        self.commands: CommandLedger = CommandLedger()
+        self.last_command: Optional[Command] = None
 
         self.stop_event: threading.Event = threading.Event()
 
@@ -93,6 +175,7 @@ class ArmController:
                 Settings.CONVERSION_RATE_AXIS_JOINTS: Setting(value=1, code_set=13, code_get=15),
                 Settings.HOMING_OFFSET_RADS: Setting(value=np.pi / 4, code_set=17, code_get=19),
                 Settings.DIR_INVERTED: Setting(value=0, code_set=31, code_get=33),
+                Settings.ACCELERATION_RAD_PER_S2: Setting(value=1, code_set=37, code_get=39),
             }
             self.joint_settings.append(current_joint_settings)
             self.joint_settings_response_code.append(
@@ -139,6 +222,9 @@ class ArmController:
         console.log("Stopping controller...", style="setup", end="\n")
         self.stop_event.set()
         self.status = ControllerStatus.STOPPED
+        with self.status_condition:
+            self.status_condition.notify_all()
+        self.commands.cancel_all()
 
         if self.websocket_server is not None:
             self.websocket_server.stop()
@@ -167,6 +253,36 @@ class ArmController:
         with self.current_angles_lock:
             self._current_angles = angles
 
+    @property
+    def joint_speeds(self) -> List[float]:
+        return [settings[Settings.SPEED_RAD_PER_S].value for settings in self.joint_settings]
+
+    @property
+    def joint_accelerations(self) -> List[float]:
+        return [settings[Settings.ACCELERATION_RAD_PER_S2].value for settings in self.joint_settings]
+
+    def firmware_parameters(self) -> FirmwareParameters:
+        """Joint settings of the arm as used by the firmware to time moves, see `simulate_program`."""
+        return FirmwareParameters(
+            speeds=np.array(self.joint_speeds),
+            steps_per_rev_motor_axis=np.array(
+                [settings[Settings.STEPS_PER_REV_MOTOR_AXIS].value for settings in self.joint_settings]
+            ),
+            conversion_rates=np.array([settings[Settings.CONVERSION_RATE_AXIS_JOINTS].value for settings in self.joint_settings]),
+        )
+
+    def estimate_cycle_time(self, program: np.ndarray, durations: Optional[np.ndarray] = None) -> SimulationResult:
+        """Simulates queued joint moves (..., M, J) from the current angles without running them on the arm."""
+        return simulate_program(program, self.current_angles, self.firmware_parameters(), durations)
+
+    def create_planner(self, max_workers: Optional[int] = None) -> PathPlanner:
+        """Parallel planner for the current arm parameters and joint limits, close it when done."""
+        return PathPlanner(self.arm_params, self.joint_speeds, self.joint_accelerations, max_workers)
+
+    def use_fastest_ik_branch(self, enabled: bool = True) -> None:
+        """Makes pose moves pick the IK branch with the shortest move time at the current joint speeds."""
+        self.kinematics.branch_cost = travel_time_cost(self.joint_speeds) if enabled else None
+
     @property
     def is_ready(self) -> bool:
         if self.websocket_server is None:
@@ -181,8 +297,11 @@ class ArmController:
         self.config_file = file
 
     def configure(self) -> None:
+        self.request_link_features()
         if self.config_file is not None:
             self.configure_from_file(self.config_file)
+        # Starts loading the reachability index of the configured arm, without holding up the connection
+        self.reachability
 
     def configure_from_file(self, file: Path, reload: bool = True) -> None:
         contents = toml.load(file)
@@ -208,6 +327,7 @@ class ArmController:
         default_min_angle_rad = joint_configuration["min_angle_rad"]
         default_max_angle_rad = joint_configuration["max_angle_rad"]
         default_dir_inverted = joint_configuration["dir_inverted"]
+        default_acceleration = joint_configuration.get("acceleration_rad_per_s2", 1.0)
 
         for i, joint in enumerate(joints):
             if "speed_rad_per_s" not in joint.keys():
@@ -234,6 +354,9 @@ class ArmController:
             if "dir_inverted" not in joint.keys():
                 joint["dir_inverted"] = default_dir_inverted
 
+            if "acceleration_rad_per_s2" not in joint.keys():
+                joint["acceleration_rad_per_s2"] = default_acceleration
+
             speed = joint["speed_rad_per_s"]
             homing_direction = joint["homing_direction"]
             steps_per_rev_motor_axis = joint["steps_per_rev_motor_axis"]
@@ -242,6 +365,7 @@ class ArmController:
             min_angle_rad = joint["min_angle_rad"]
             max_angle_rad = joint["max_angle_rad"]
             dir_inverted = joint["dir_inverted"]
+            acceleration = joint["acceleration_rad_per_s2"]
 
             driver = joint["driver"]
             if driver["type"] == "stepper":
@@ -267,6 +391,7 @@ class ArmController:
             self.set_setting_joint(Settings.CONVERSION_RATE_AXIS_JOINTS, conversion_rate_axis_joint, i)
             self.set_setting_joint(Settings.HOMING_OFFSET_RADS, homing_offset_rads, i)
             self.set_setting_joint(Settings.DIR_INVERTED, dir_inverted, i)
+            self.set_setting_joint(Settings.ACCELERATION_RAD_PER_S2, acceleration, i)
 
             self.arm_params.joints[i].set_bounds(min_angle_rad, max_angle_rad)
 
@@ -293,8 +418,15 @@ class ArmController:
     ----------------------------------------
     """
 
-    def handle_move_message(self, _: Message) -> None:
-        pass
+    def handle_move_message(self, message: Message) -> None:
+        code = message.code
+        if code not in (COMMAND_QUEUED_CODE, COMMAND_DONE_CODE) or not isinstance(message, PayloadMessage):
+            return
+        sequence, value = ACK_STRUCT.unpack_from(message.payload)
+        if code == COMMAND_QUEUED_CODE:
+            self.commands.acknowledge(sequence, value)
+        else:
+            self.commands.complete(sequence, value == 1)
 
     def check_last_status(self) -> None:
         current_time = time.time()
@@ -318,9 +450,15 @@ class ArmController:
                     self.print_idx = 0
                 self.print_idx += 1
             self.last_status_time = time.time()
+            with self.status_condition:
+                self.status_count += 1
+                self.status_condition.notify_all()
 
     def handle_config_message(self, message: Message) -> None:
         code = message.code
+        if code == LINK_FEATURES_RESPONSE_CODE:
+            self.link_features = LinkFeature(int(message.args[0]))
+            return
         joint_idx = int(message.args[0])
         if code in self.joint_settings_response_code[joint_idx].keys():
             setting = self.joint_settings_response_code[joint_idx][code]
@@ -333,29 +471,319 @@ class ArmController:
     ----------------------------------------
     """
 
+    def send_moves(self, messages: List[Message], name: str) -> Optional[Command]:
+        """Sends the messages of a move command in a single write and counts its moves in `move_queue_size`.
+
+        With firmware reporting sequenced commands the messages are followed by a sequence mark
+        and the command is tracked in `commands`: the firmware acks it once queued and once its last
+        move completes. The command (None without sequenced commands) is also kept in `last_command`.
+        """
+        num_moves = self.count_moves(messages)
+        command = None
+        if messages and LinkFeature.SEQUENCED_COMMANDS in self.link_features:
+            command = self.commands.issue(name, num_moves)
+            messages = messages + [PayloadMessage(MessageOp.MOVE, SEQUENCE_MARK_CODE, SEQUENCE_STRUCT.pack(command.sequence))]
+        self.controller_server.send_messages(messages, mutex=True)
+        self.move_queue_size += num_moves
+        self.last_command = command
+        return command
+
     def move_joints_to(self, angles: List[float]) -> bool:
         if not self.is_homed:
             console.log("Arm is not homed", style="error")
             return False
-        message = Message(MessageOp.MOVE, 1, angles)
-        self.controller_server.send_message(message, mutex=True)
-        self.move_queue_size += 1
+        self.send_moves([Message(MessageOp.MOVE, 1, angles)], "move_joints_to")
 
         if self.print_status:
             console.log(f"Moving to angles: {angles}", style="move_angles")
         return True
 
+    def plan_joint_path(
+        self, waypoints: np.ndarray, blend_radius: ArrayLike = 0.0, tool_targets: Optional[ArrayLike] = None
+    ) -> TimedTrajectory:
+        """Time optimal trajectory from the current angles through `waypoints` within the joint speeds and accelerations.
+
+        A positive `blend_radius` (rad, shared or one per waypoint) rounds the corners at the waypoints,
+        see `blend_corners`, so the arm keeps moving past them instead of almost stopping. With
+        `tool_targets` (one per waypoint, NaN keeps the tool) the tool heads to the target of a waypoint
+        as the arm leaves it, see `attach_tool_targets`.
+        """
+        waypoints = np.asarray(waypoints, dtype=float)
+        path = np.vstack([self.current_angles, waypoints])
+        # The current angles are the start of the path and are never blended
+        radii = np.broadcast_to(np.asarray(blend_radius, dtype=float), (len(path) - 1,))
+        path = blend_corners(path, np.concatenate([[0.0], radii]))
+        trajectory = time_optimal_parameterization(path, self.joint_speeds, self.joint_accelerations)
+        if tool_targets is not None:
+            trajectory = attach_tool_targets(trajectory, waypoints, tool_targets, radii)
+        return trajectory
+
+    def timed_move_messages(self, setpoints: np.ndarray) -> List[Message]:
+        """Timed moves to rows of joint angles followed by the duration and optionally a tool value (NaN keeps the tool).
+
+        With `batch_moves` the rows are packed in as few MOVE 19 frames as fit, or fixed point MOVE 21
+        frames when `compact_moves` is set and the firmware supports them. Otherwise every row is its
+        own MOVE 15, or MOVE 17 when it has a tool value.
+        """
+        rows = np.asarray(setpoints, dtype=float)
+        if self.batch_moves and self.compact_moves and LinkFeature.COMPACT_MOVE_BATCH in self.link_features:
+            return compact_batch_messages(rows, self.num_joints, max_error=self.compact_max_error)
+        if self.batch_moves:
+            return move_batch_messages(rows)
+        messages = []
+        for row in rows:
+            if len(row) == self.num_joints + 2 and np.isnan(row[-1]):
+                row = row[:-1]
+            messages.append(self.setpoint_message(row.tolist()))
+        return messages
+
+    @staticmethod
+    def count_moves(messages: List[Message]) -> int:
+        """Number of moves the firmware queues for the messages, batched frames count every waypoint."""
+        count = 0
+        for message in messages:
+            if isinstance(message, PayloadMessage) and message.code == COMPACT_BATCH_CODE:
+                count += HEADER.unpack_from(message.payload)[0]
+            else:
+                count += int(message.args[0]) if message.code == MOVE_BATCH_CODE else 1
+        return count
+
+    def trajectory_messages(self, trajectory: TimedTrajectory) -> List[Message]:
+        """Timed moves to every point of a trajectory after the first, see `timed_move_messages`.
+
+        Moves leaving a point with a tool target carry it (MOVE 17), the firmware does not wait for the
+        tool so it moves while the arm does. A tool target at the last point is a regular tool move.
+        """
+        columns = [trajectory.positions[1:], trajectory.segment_durations[:, None]]
+        tool_values = trajectory.tool_values
+        with_tool = tool_values is not None and not np.isnan(tool_values[:-1]).all()
+        if tool_values is not None and with_tool:
+            columns.append(tool_values[:-1, None])
+        messages = self.timed_move_messages(np.hstack(columns))
+        if tool_values is not None and len(tool_values) > 0 and not np.isnan(tool_values[-1]):
+            messages.append(Message(MessageOp.MOVE, 7, [float(tool_values[-1])]))
+        return messages
+
+    def execute_trajectory(self, trajectory: TimedTrajectory) -> bool:
+        """Streams a timed trajectory, every point is a timed move reached when the previous one ends."""
+        if not self.is_homed:
+            console.log("Arm is not homed", style="error")
+            return False
+
+        messages = self.trajectory_messages(trajectory)
+        num_moves = self.count_moves(messages)
+        self.send_moves(messages, "trajectory")
+
+        if self.print_status:
+            console.log(f"Executing trajectory of {trajectory.duration:.2f}s in {num_moves} moves", style="move_angles")
+        return True
+
+    def execute_spline(self, spline: SplineTrajectory, rate_hz: float = 50.0, cartesian: bool = False) -> bool:
+        """Streams a spline as evenly timed setpoints, sampled lazily `rate_hz` times per second.
+
+        Joint splines are sent as they are sampled. Cartesian splines (poses, with unwrapped euler
+        angles) are solved chunk by chunk with batch IK seeded by the last solution, streaming stops
+        at the first chunk holding an unreachable sample.
+        """
+        if not self.is_homed:
+            console.log("Arm is not homed", style="error")
+            return False
+
+        last_time = 0.0
+        last_angles = np.array(self.current_angles)
+        num_messages = 0
+        for times, positions in spline.sample_chunks(rate_hz):
+            if cartesian:
+                angles, reachable = self.kinematics.pose_to_angles_batch(positions, last_angles, enforce_limits=True)
+                if not reachable.all():
+                    console.log(f"Spline not reachable at t={times[int(np.argmin(reachable))]:.2f}s", style="error")
+                    return False
+            else:
+                angles = positions
+            durations = np.diff(times, prepend=last_time)
+            self.send_moves(self.timed_move_messages(np.hstack([angles, durations[:, None]])), "spline")
+            num_messages += len(durations)
+            last_time, last_angles = float(times[-1]), angles[-1]
+
+        if self.print_status:
+            console.log(f"Streamed spline of {spline.duration:.2f}s in {num_messages} setpoints", style="move_angles")
+        return True
+
+    def move_joints_through(
+        self, waypoints: np.ndarray, blend_radius: ArrayLike = 0.0, tool_targets: Optional[ArrayLike] = None
+    ) -> bool:
+        """Moves through every waypoint as a single trajectory, see `plan_joint_path`."""
+        return self.execute_trajectory(self.plan_joint_path(waypoints, blend_radius, tool_targets))
+
+    def _wait_for_queue_below(self, max_size: int, min_status_count: int, timeout: float) -> bool:
+        """Waits for a status numbered `min_status_count` or later reporting at most `max_size` queued moves.
+
+        Returns False when stopped or when no status arrives for `timeout` seconds.
+        """
+        with self.status_condition:
+            while self.status_count < min_status_count or self.move_queue_size > max_size:
+                if self.stop_event.is_set() or not self.status_condition.wait(timeout):
+                    return False
+        return not self.stop_event.is_set()
+
+    def setpoint_message(self, setpoint: Sequence[float]) -> Message:
+        """Absolute move to a setpoint of joint angles, or a timed move when followed by the duration.
+
+        A tool value after the duration is commanded with the move without waiting for the tool.
+        """
+        if len(setpoint) == self.num_joints:
+            return Message(MessageOp.MOVE, 1, [float(value) for value in setpoint])
+        if len(setpoint) == self.num_joints + 1:
+            return Message(MessageOp.MOVE, 15, [float(value) for value in setpoint])
+        if len(setpoint) == self.num_joints + 2:
+            return Message(MessageOp.MOVE, 17, [float(value) for value in setpoint])
+        raise ValueError(f"Setpoints must have {self.num_joints} angles, optionally a duration and a tool value")
+
+    def stream(
+        self, setpoints: Iterable[Sequence[float]], high_water: int = 32, low_water: int = 8, timeout: float = 5.0
+    ) -> bool:
+        """Streams setpoints from an iterable, keeping the firmware move queue between two watermarks.
+
+        Setpoints are consumed lazily: whenever a status message reports `low_water` moves or fewer,
+        the queue is topped up to `high_water` with a single write. A refill is only decided on a status
+        requested after the previous one was sent, so moves in flight are never counted twice. Counters
+        are kept in `stream_stats`.
+
+        Args:
+            setpoints (Iterable[Sequence[float]]): Joint angles, optionally followed by a move duration, see `setpoint_message`.
+            high_water (int): Number of queued moves after a refill.
+            low_water (int): Number of queued moves that triggers a refill.
+            timeout (float): Max seconds to wait for a status message.
+
+        Returns:
+            bool: Whether every setpoint was sent.
+
+        Raises:
+            ValueError: If the watermarks are not 0 <= low_water < high_water.
+        """
+        if not 0 <= low_water < high_water:
+            raise ValueError("Watermarks must satisfy 0 <= low_water < high_water")
+        if not self.is_homed:
+            console.log("Arm is not homed", style="error")
+            return False
+
+        stats = StreamStats(started_at=time.time())
+        self.stream_stats = stats
+        iterator = iter(setpoints)
+        trusted_from = 0
+        while True:
+            if not self._wait_for_queue_below(low_water, trusted_from, timeout):
+                console.log("Streaming stopped", style="error")
+                return False
+
+            queue_size = self.move_queue_size
+            messages = [self.setpoint_message(setpoint) for setpoint in itertools.islice(iterator, high_water - queue_size)]
+            if not messages:
+                break
+            if queue_size == 0 and stats.sent > 0:
+                stats.underruns += 1
+
+            self.send_moves(messages, "stream")
+            stats.sent += len(messages)
+            stats.refills += 1
+            # The next status may have been requested before the firmware received this batch
+            trusted_from = self.status_count + 2
+
+        stats.finished_at = time.time()
+        if self.print_status:
+            console.log(
+                f"Streamed {stats.sent} setpoints at {stats.throughput:.1f}/s, {stats.underruns} underruns", style="move_angles"
+            )
+        return True
+
     def move_to(
         self,
         pose: ArmPose,
     ) -> bool:
         self.target_pose = pose
-        target_angles = self.kinematics.pose_to_angles(pose, self.current_angles)
+        target_angles = self.kinematics.pose_to_angles(pose, self.current_angles, enforce_limits=True)
         if target_angles is None:
             console.log("Target pose is not reachable", style="error")
             return False
         return self.move_joints_to(target_angles)
 
+    def move_linear(
+        self,
+        pose: ArmPose,
+        step_mm: float = 5.0,
+        step_rad: float = math.radians(2),
+        max_joint_step: float = math.radians(30),
+    ) -> bool:
+        """Moves the TCP along a straight line to `pose`, slerping its orientation.
+
+        The segment is sampled every `step_mm` / `step_rad`, then solved and sent by `_move_through_poses`.
+        """
+        if not self.is_homed:
+            console.log("Arm is not homed", style="error")
+            return False
+
+        start_pose = self.target_pose if self.target_pose is not None else self.current_pose
+        poses = linear_path(start_pose, pose, step_mm, step_rad)
+        return self._move_through_poses(poses, pose, max_joint_step, "Linear move")
+
+    def move_arc(
+        self,
+        via_pose: ArmPose,
+        end_pose: ArmPose,
+        max_chord_error: float = 0.1,
+        step_rad: float = math.radians(2),
+        max_joint_step: float = math.radians(30),
+        full_circle: bool = False,
+    ) -> bool:
+        """Moves the TCP along the circular arc from the current pose through `via_pose` to `end_pose`.
+
+        With `full_circle` the TCP goes on around the circle back to where it started. The arc is
+        sampled so no chord strays more than `max_chord_error` mm from it, then checked and sent like
+        in `move_linear`: nothing moves unless the whole arc is reachable.
+        """
+        if not self.is_homed:
+            console.log("Arm is not homed", style="error")
+            return False
+
+        start_pose = self.target_pose if self.target_pose is not None else self.current_pose
+        try:
+            poses = arc_path(start_pose, via_pose, end_pose, max_chord_error, step_rad, full_circle)
+        except ValueError as error:
+            console.log(f"Invalid arc: {error}", style="error")
+            return False
+        return self._move_through_poses(poses, start_pose if full_circle else end_pose, max_joint_step, "Arc move")
+
+    def move_circle(self, via_pose: ArmPose, other_pose: ArmPose, max_chord_error: float = 0.1) -> bool:
+        """Moves the TCP around the full circle through the current pose, `via_pose` and `other_pose`."""
+        return self.move_arc(via_pose, other_pose, max_chord_error, full_circle=True)
+
+    def _move_through_poses(self, poses: np.ndarray, end_pose: ArmPose, max_joint_step: float, name: str) -> bool:
+        """Solves every pose with path level IK (one branch sequence for the whole path) and sends them as consecutive moves.
+
+        Nothing is sent unless every pose is reachable within the joint limits and no joint jumps
+        more than `max_joint_step` between poses (a branch flip or a singularity on the way).
+        """
+        current_angles = np.array(self.current_angles)
+        if self.kinematics.model.is_analytic:
+            angles, reachable = self.kinematics.pose_to_angles_path(poses, current_angles)
+        else:
+            angles, reachable = self.kinematics.pose_to_angles_batch(poses, current_angles, enforce_limits=True)
+        if not reachable.all():
+            console.log(f"{name} not reachable at sample {int(np.argmin(reachable))} of {len(poses)}", style="error")
+            return False
+        joint_steps = np.abs(np.diff(angles, axis=0))
+        if len(joint_steps) > 0 and joint_steps.max() > max_joint_step:
+            console.log(f"{name} jumps at sample {int(joint_steps.max(axis=1).argmax())} of {len(poses)}", style="error")
+            return False
+
+        self.target_pose = end_pose
+        messages = [Message(MessageOp.MOVE, 1, [float(angle) for angle in waypoint]) for waypoint in angles]
+        self.send_moves(messages, name)
+
+        if self.print_status:
+            console.log(f"{name} through {len(messages)} waypoints", style="move_angles")
+        return True
+
     def move_to_relative(
         self,
         pose: ArmPose,
@@ -370,8 +798,7 @@ class ArmController:
         if self.print_status:
             console.log("Homing arm...", style="homing")
 
-        message = Message(MessageOp.MOVE, 3)
-        self.controller_server.send_message(message, mutex=True)
+        self.send_moves([Message(MessageOp.MOVE, 3)], "home")
         start_time = time.time()
         self.is_homed = False
         time.sleep(1)
@@ -391,41 +818,31 @@ class ArmController:
             console.log("Arm homed!", style="homing")
 
     def move_joint_to(self, joint_idx: int, angle: float) -> bool:
-        message = Message(MessageOp.MOVE, 9, [joint_idx, angle])
-        self.controller_server.send_message(message, mutex=True)
+        self.send_moves([Message(MessageOp.MOVE, 9, [joint_idx, angle])], "move_joint_to")
         self.target_pose = None
-        self.move_queue_size += 1
         if self.print_status:
             console.log(f"Moving joint {joint_idx} to angle: {angle}", style="move_joints")
         return True
 
     def home_joint(self, joint_idx: int) -> None:
-        message = Message(MessageOp.MOVE, 5, [joint_idx])
-
-        self.controller_server.send_message(message, mutex=True)
+        self.send_moves([Message(MessageOp.MOVE, 5, [joint_idx])], "home_joint")
 
     def move_joint_to_relative(self, joint_idx: int, angle: float) -> bool:
-        message = Message(MessageOp.MOVE, 11, [joint_idx, angle])
-        self.controller_server.send_message(message, mutex=True)
+        self.send_moves([Message(MessageOp.MOVE, 11, [joint_idx, angle])], "move_joint_to_relative")
         self.target_pose = None
-        self.move_queue_size += 1
         if self.print_status:
             console.log(f"Moving joint {joint_idx} relative angle: {angle}", style="move_joints")
         return True
 
     def move_joints_to_relative(self, angles: List[float]) -> bool:
-        message = Message(MessageOp.MOVE, 13, angles)
-        self.controller_server.send_message(message, mutex=True)
+        self.send_moves([Message(MessageOp.MOVE, 13, angles)], "move_joints_to_relative")
         self.target_pose = None
-        self.move_queue_size += 1
         if self.print_status:
             console.log(f"Moving joints relative angles: {angles}", style="move_joints")
         return True
 
     def set_tool_value(self, angle: float) -> None:
-        message = Message(MessageOp.MOVE, 7, [angle])
-        self.controller_server.send_message(message, mutex=True)
-        self.move_queue_size += 1
+        self.send_moves([Message(MessageOp.MOVE, 7, [angle])], "set_tool_value")
         if self.print_status:
             console.log(f"Setting tool value to: {angle}", style="set_tool")
 
@@ -437,16 +854,61 @@ class ArmController:
         while not allclose(self.current_angles, target_angles, atol=epsilon) and not self.stop_event.is_set():
             time.sleep(0.2)
 
-    def wait_done_moving(self) -> None:
+    def wait_done_moving(self, ack_timeout: float = 10.0) -> None:
+        """Waits for every sent move to end, on the firmware ack of the last command when commands are sequenced.
+
+        Without sequenced commands, or when the ack does not come within `ack_timeout` seconds, the
+        queue size of the status messages is polled.
+        """
         if self.print_status:
             console.log(f"Waiting for arm to finish moving qsize: {self.move_queue_size}", style="waiting")
-        while self.move_queue_size > 0 and not self.stop_event.is_set():
+        command = self.last_command
+        if command is not None:
+            try:
+                command.wait(ack_timeout)  # also ends when stopped, `stop` cancels pending commands
+            except TimeoutError:
+                command = None
+        while command is None and self.move_queue_size > 0 and not self.stop_event.is_set():
             time.sleep(0.2)
         if self.print_status:
             console.log(f"Arm finished moving qsize: {self.move_queue_size}", style="waiting")
 
+    def use_reachability_index(self, file: Path) -> None:
+        """Uses a reachability index persisted in `file`, loaded (or built and saved) once the arm parameters are set.
+
+        That is right away when they already are, else when `configure` applies the config file. When
+        the arm parameters change the index is rebuilt in the background, see `reachability`.
+        """
+        self.reachability_file = file
+        if model_reach(self.kinematics.model) > 0:
+            self._reachability = ReachabilityIndex.load_or_build(self.kinematics, file)
+
+    def _load_reachability_index(self) -> None:
+        file = self.reachability_file
+        if file is not None:
+            self._reachability = ReachabilityIndex.load_or_build(self.kinematics, file)
+
+    @property
+    def reachability(self) -> Optional[ReachabilityIndex]:
+        """The index matching the current arm parameters, None while one is being rebuilt so callers never wait for a build."""
+        if self.reachability_file is None:
+            return None
+        index = self._reachability
+        if index is not None and index.matches(self.kinematics):
+            return index
+        if model_reach(self.kinematics.model) <= 0:
+            return None  # arm parameters not configured yet
+        if self._reachability_thread is None or not self._reachability_thread.is_alive():
+            self._reachability_thread = threading.Thread(target=self._load_reachability_index, daemon=True)
+            self._reachability_thread.start()
+        return None
+
     def valid_pose(self, pose: ArmPose) -> bool:
-        target_angles = self.kinematics.pose_to_angles(pose, self.current_angles)
+        index = self.reachability
+        # Cells missed by the sampling are no proof, only poses beyond the reach of the arm skip IK
+        if index is not None and index.beyond_reach(pose):
+            return False
+        target_angles = self.kinematics.pose_to_angles(pose, self.current_angles, enforce_limits=True)
         if target_angles is None:
             return False
         return True
@@ -475,6 +937,16 @@ class ArmController:
     ----------------------------------------
     """
 
+    def request_link_features(self) -> None:
+        """Asks the firmware for the protocol extensions it supports, done once per connection.
+
+        Until the reply arrives (or forever with firmware that does not know the request) no optional
+        feature is used.
+        """
+        self.link_features = LinkFeature(0)
+        message = Message(MessageOp.CONFIG, LINK_FEATURES_REQUEST_CODE)
+        self.controller_server.send_message(message, mutex=True)
+
     def set_setting_joint(self, setting_key: Settings, value: float, joint_idx: int) -> None:
         if setting_key not in self.joint_settings[joint_idx].keys():
             raise ValueError(f"Invalid setting key for joint setting: {setting_key}")
@@ -482,6 +954,7 @@ class ArmController:
         code = setting.code_set
         message = Message(MessageOp.CONFIG, code, [float(joint_idx), value])
         self.controller_server.send_message(message, mutex=True)
+        setting.value = value
         setting.last_updated = -1
 
         if self.print_status:
@@ -0,0 +1,22 @@
+import os
+from typing import List
+
+import numpy as np
+
+from ribot.utils.messages import Message, MessageOp
+
+# Wall clock speedups depend on the load of the machine, they are only asserted on request (`pdm run benchmark`)
+BENCHMARKS = os.environ.get("RIBOT_BENCHMARKS", "") not in ("", "0")
+
+
+def expand_move_batch(message: Message, num_joints: int = 6) -> List[Message]:
+    """The timed moves a batched frame (MOVE 19) is expanded into, as the firmware queues them."""
+    num_waypoints, stride = int(message.args[0]), int(message.args[1])
+    moves = []
+    for start in range(2, 2 + num_waypoints * stride, stride):
+        waypoint = message.args[start : start + stride]
+        if stride == num_joints + 2 and not np.isnan(waypoint[-1]):
+            moves.append(Message(MessageOp.MOVE, 17, waypoint))
+        else:
+            moves.append(Message(MessageOp.MOVE, 15, waypoint[: num_joints + 1]))
+    return moves
@@ -0,0 +1,219 @@
+import threading
+import time
+import unittest
+from collections import deque
+from typing import Deque, List, Optional
+from unittest import mock
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters
+from ribot.controller import ArmController
+from ribot.utils.command_ledger import (
+    ACK_STRUCT,
+    COMMAND_DONE_CODE,
+    COMMAND_QUEUED_CODE,
+    MAX_SEQUENCE,
+    SEQUENCE_MARK_CODE,
+    SEQUENCE_STRUCT,
+    CommandLedger,
+)
+from ribot.utils.messages import Message, MessageOp, PayloadMessage
+from ribot.utils.prints import console
+from ribot.utils.waypoint_codec import LinkFeature
+
+
+class AckingFirmware:
+    """Runs queued moves one per `move_period` and acks sequence marks like the firmware does."""
+
+    def __init__(self, controller: ArmController, move_period: float) -> None:
+        self.controller = controller
+        self.move_period = move_period
+        self.queue: Deque[List[Optional[int]]] = deque()  # [code, sequence of the command it ends]
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def reply(self, code: int, sequence: int, value: int) -> None:
+        self.controller.handle_move_message(PayloadMessage(MessageOp.MOVE, code, ACK_STRUCT.pack(sequence, value)))
+
+    def send_messages(self, messages: List[Message], mutex: bool = False) -> None:
+        with self.lock:
+            for message in messages:
+                if not isinstance(message, PayloadMessage) or message.code != SEQUENCE_MARK_CODE:
+                    self.queue.append([message.code, None])
+                    continue
+                (sequence,) = SEQUENCE_STRUCT.unpack(message.payload)
+                self.reply(COMMAND_QUEUED_CODE, sequence, len(self.queue))
+                if self.queue:
+                    self.queue[-1][1] = sequence
+                else:
+                    self.reply(COMMAND_DONE_CODE, sequence, 1)
+
+    def stop_moves(self) -> None:
+        with self.lock:
+            while self.queue:
+                _, sequence = self.queue.popleft()
+                if sequence is not None:
+                    self.reply(COMMAND_DONE_CODE, sequence, 0)
+
+    def run(self) -> None:
+        while not self.done.is_set():
+            time.sleep(self.move_period)
+            with self.lock:
+                if self.queue:
+                    _, sequence = self.queue.popleft()
+                    if sequence is not None:
+                        self.reply(COMMAND_DONE_CODE, sequence, 1)
+
+
+class TestCommands(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = ArmController(arm_parameters=ArmParameters())
+        self.controller.is_homed = True
+        self.controller.link_features = LinkFeature.MOVE_BATCH | LinkFeature.SEQUENCED_COMMANDS
+
+    def start_firmware(self, move_period: float = 0.01) -> AckingFirmware:
+        firmware = AckingFirmware(self.controller, move_period)
+        patcher = mock.patch.object(self.controller.controller_server, "send_messages", side_effect=firmware.send_messages)
+        patcher.start()
+        firmware.thread.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(firmware.thread.join)
+        self.addCleanup(firmware.done.set)
+        return firmware
+
+    def test_ledger(self) -> None:
+        ledger = CommandLedger(history_size=2)
+        first, second, third = (ledger.issue(f"move {idx}", 1) for idx in range(3))
+        self.assertEqual([first.sequence, second.sequence, third.sequence], [0, 1, 2])
+
+        ledger.acknowledge(second.sequence, 4)
+        self.assertEqual(second.queued.result(0), 4)
+        self.assertFalse(first.queued.done())
+        ledger.complete(second.sequence)
+        self.assertTrue(second.wait(0))
+        self.assertFalse(first.done.done())  # completions are matched by sequence number only
+        self.assertGreaterEqual(second.latency or -1, second.queue_latency or -1)
+        ledger.complete(second.sequence, completed=False)  # duplicated acks are ignored
+        self.assertTrue(second.completed)
+
+        ledger.cancel_all()
+        self.assertFalse(first.wait(0))
+        self.assertTrue(first.queued.cancelled())
+        self.assertFalse(third.completed)
+        self.assertEqual(list(ledger.history), [first, third])
+        self.assertEqual(ledger.latency_stats(), {"count": 0})
+        self.assertEqual(ledger.pending, {})
+
+        ledger.next_sequence = MAX_SEQUENCE - 1
+        self.assertEqual(ledger.issue("last", 1).sequence, MAX_SEQUENCE - 1)
+        self.assertEqual(ledger.issue("wrapped", 1).sequence, 0)
+
+    def test_sequence_payloads(self) -> None:
+        # Sequence numbers float arguments would round (above 2**24) reach the ledger exactly
+        self.controller.commands.next_sequence = (1 << 24) + 1
+        sent: List[Message] = []
+        with mock.patch.object(
+            self.controller.controller_server, "send_messages", side_effect=lambda messages, mutex: sent.extend(messages)
+        ):
+            self.controller.move_joints_to([0.1] * 6)
+        command = self.controller.last_command
+        assert command is not None
+        self.assertEqual(SEQUENCE_STRUCT.unpack(sent[-1].encode()[Message.LENGTH_HEADERS :]), (command.sequence,))
+
+        decoder = self.controller.controller_server.decoder
+        for code, value in ((COMMAND_QUEUED_CODE, 1), (COMMAND_DONE_CODE, 1)):
+            decoder.feed(PayloadMessage(MessageOp.MOVE, code, ACK_STRUCT.pack(command.sequence, value)).encode())
+        decoder.feed(Message(MessageOp.MOVE, 1, [0.5]).encode())
+        replies = list(decoder)
+        self.assertEqual([type(reply) for reply in replies], [PayloadMessage, PayloadMessage, Message])
+        for reply in replies:
+            self.controller.handle_move_message(reply)
+        self.assertEqual(command.queued.result(0), 1)
+        self.assertTrue(command.wait(0))
+
+    def test_await_command(self) -> None:
+        firmware = self.start_firmware(move_period=0.05)
+        commands = []
+        for idx in range(5):
+            self.assertTrue(self.controller.move_joints_through(np.array([[0.01 * (idx + 1)] * 6, [0.01 * idx] * 6])))
+            commands.append(self.controller.last_command)
+        self.assertTrue(all(command is not None for command in commands))
+        self.assertEqual([command.sequence for command in commands if command], list(range(5)))
+
+        # Waiting for the second command returns as soon as its last move ends, not when the queue drains
+        second = commands[1]
+        assert second is not None
+        self.assertTrue(second.wait(timeout=5))
+        self.assertFalse(all(command.done.done() for command in commands if command))
+        self.assertGreater(len(firmware.queue), 0)
+
+        self.controller.wait_done_moving()
+        self.assertTrue(all(command.completed for command in commands if command))
+        self.assertEqual(len(firmware.queue), 0)
+        self.assertEqual(self.controller.commands.pending, {})
+
+        stats = self.controller.commands.latency_stats()
+        self.assertEqual(stats["count"], 5)
+        self.assertLessEqual(stats["queue_latency_max"], stats["latency_p50"])
+        console.log(
+            f"Command latency p50 {stats['latency_p50'] * 1000:.1f}ms, queued after {stats['queue_latency_p50'] * 1000:.2f}ms",
+            style="info",
+        )
+
+    def test_wait_done_moving(self) -> None:
+        self.start_firmware(move_period=0.005)
+        self.controller.move_joints_to([0.1] * 6)
+        command = self.controller.last_command
+        assert command is not None
+        self.controller.wait_done_moving()
+        # Returns on the completion ack instead of the next 200ms poll of the queue size
+        self.assertTrue(command.completed)
+        self.assertLess(time.time() - (command.done_at or 0), 0.1)
+
+        # Homing is tracked like any move, waiting does not return on an earlier completed command
+        with mock.patch("time.sleep"):
+            self.controller.home(wait=False)
+        homing = self.controller.last_command
+        assert homing is not None
+        self.assertEqual(homing.name, "home")
+        self.controller.wait_done_moving()
+        self.assertTrue(homing.completed)
+        self.controller.is_homed = True
+
+        # Without the ack the queue size of the status messages is polled
+        self.controller.last_command = self.controller.commands.issue("lost", 1)
+        self.controller.move_queue_size = 0
+        start_time = time.perf_counter()
+        self.controller.wait_done_moving(ack_timeout=0.05)
+        self.assertLess(time.perf_counter() - start_time, 1)
+
+        # Without sequenced commands nothing is tracked
+        self.controller.link_features = LinkFeature(0)
+        self.controller.move_joints_to([0.2] * 6)
+        self.assertIsNone(self.controller.last_command)
+
+    def test_stopped_commands(self) -> None:
+        firmware = AckingFirmware(self.controller, 1.0)
+        with mock.patch.object(self.controller.controller_server, "send_messages", side_effect=firmware.send_messages):
+            self.controller.move_joints_to([0.1] * 6)
+            moving = self.controller.last_command
+            self.controller.set_tool_value(0.5)
+            tool = self.controller.last_command
+            assert moving is not None and tool is not None
+            self.assertEqual((moving.queued.result(0), tool.queued.result(0)), (1, 2))
+
+            firmware.stop_moves()
+            self.assertEqual((moving.wait(0), tool.wait(0)), (False, False))
+
+            self.controller.move_joint_to(0, 0.3)
+            pending = self.controller.last_command
+            assert pending is not None
+            with (
+                mock.patch.object(self.controller.controller_server, "stop"),
+                mock.patch.object(self.controller, "websocket_server", None),
+                self.assertRaises(SystemExit),
+            ):
+                self.controller.stop()
+            self.assertFalse(pending.wait(0))
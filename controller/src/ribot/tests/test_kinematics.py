@@ -1,17 +1,31 @@
+import time
 import unittest
 from typing import List
+from unittest import mock
 
 import numpy as np
 
-from ribot.control.arm_kinematics import ArmParameters, ArmPose
+from ribot.control.arm_kinematics import (
+    ArmKinematics,
+    ArmParameters,
+    ArmPose,
+    IKCache,
+    KinematicsEngine,
+    joint_travel_cost,
+    travel_time_cost,
+)
+from ribot.control.cartesian import arc_path, circle_through, linear_path
 from ribot.controller import ArmController
+from ribot.tests import BENCHMARKS
 from ribot.utils.algebra import (
     allclose,
+    create_rotation_matrices_from_euler_angles,
     create_rotation_matrix_from_euler_angles,
     degree2rad,
     extract_euler_angles,
+    rotation_vectors_from_matrices,
 )
-from ribot.utils.prints import disable_console
+from ribot.utils.prints import console, disable_console
 
 
 class TestArmKinematics(unittest.TestCase):
@@ -121,3 +135,506 @@ class TestArmKinematics(unittest.TestCase):
                 pose2 = self.controller.kinematics.angles_to_pose(angles)
                 all_close = allclose(pose.as_list, pose2.as_list, rtol=self.EPSILON)
                 self.assertTrue(all_close, f"expected: {pose.as_list} actual: {pose2.as_list}")
+
+    def random_angles(self, num_samples: int) -> np.ndarray:
+        lower = np.array([joint.min_val for joint in self.controller.arm_params.joints])
+        upper = np.array([joint.max_val for joint in self.controller.arm_params.joints])
+        return np.random.uniform(lower, upper, size=(num_samples, len(lower)))
+
+    def test_angles_to_pose_batch(self) -> None:
+        angles = self.random_angles(500)
+        poses = self.controller.kinematics.angles_to_pose_batch(angles)
+        self.assertEqual(poses.shape, (500, 6))
+        for row, pose in zip(angles, poses):
+            expected = self.controller.kinematics.angles_to_pose(list(row)).as_list
+            self.assertTrue(np.allclose(pose, expected, atol=1e-6), f"expected: {expected} actual: {pose}")
+
+        frames = self.controller.kinematics.angles_to_frames_batch(angles)
+        self.assertEqual(frames.shape, (500, 4, 4))
+        self.assertTrue(np.allclose(frames[:, :3, 3], poses[:, :3]))
+
+    def test_angles_to_pose_batch_benchmark(self) -> None:
+        num_samples = 2000
+        angles = self.random_angles(num_samples)
+
+        start_time = time.perf_counter()
+        for row in angles:
+            self.controller.kinematics.angles_to_pose(list(row))
+        scalar_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        self.controller.kinematics.angles_to_pose_batch(angles)
+        batch_time = time.perf_counter() - start_time
+
+        console.log(
+            f"angles_to_pose: {num_samples / scalar_time:.0f} poses/s, "
+            f"angles_to_pose_batch: {num_samples / batch_time:.0f} poses/s ({scalar_time / batch_time:.1f}x)",
+            style="info",
+        )
+        if BENCHMARKS:
+            self.assertLess(batch_time, scalar_time)
+
+    def test_pose_to_angles_batch(self) -> None:
+        kinematics = self.controller.kinematics
+        poses = kinematics.angles_to_pose_batch(self.random_angles(500))
+        seeds = self.random_angles(500)
+        unreachable = np.array([[5000, 0, 0, 0, 0, 0], [0, 0, 100000, 0, 0, 0]], dtype=float)
+        poses = np.vstack([poses, unreachable])
+        seeds = np.vstack([seeds, np.zeros((2, 6))])
+
+        angles, reachable = kinematics.pose_to_angles_batch(poses, seeds)
+        self.assertEqual(angles.shape, (502, 6))
+        self.assertFalse(reachable[-2:].any())
+        self.assertTrue(np.array_equal(angles[-2:], seeds[-2:]))
+
+        for pose, seed, row, row_reachable in zip(poses[:-2], seeds, angles, reachable):
+            expected = kinematics.pose_to_angles(ArmPose(*pose), list(seed))
+            self.assertTrue(row_reachable)
+            if expected is None:
+                self.fail("expected is None")
+            self.assertTrue(np.allclose(row, expected, atol=1e-6), f"expected: {expected} actual: {row}")
+
+        shared_seed_angles, _ = kinematics.pose_to_angles_batch(poses[:10], np.zeros(6))
+        single_angles, _ = kinematics.pose_to_angles_batch(poses[:10])
+        self.assertTrue(np.allclose(shared_seed_angles, single_angles))
+
+    def test_pose_to_angles_batch_benchmark(self) -> None:
+        num_samples = 2000
+        kinematics = self.controller.kinematics
+        poses = kinematics.angles_to_pose_batch(self.random_angles(num_samples))
+        seed = [0.0] * 6
+
+        start_time = time.perf_counter()
+        for pose in poses:
+            kinematics.pose_to_angles(ArmPose(*pose), seed)
+        scalar_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        kinematics.pose_to_angles_batch(poses, np.array(seed))
+        batch_time = time.perf_counter() - start_time
+
+        console.log(
+            f"pose_to_angles: {num_samples / scalar_time:.0f} poses/s, "
+            f"pose_to_angles_batch: {num_samples / batch_time:.0f} poses/s ({scalar_time / batch_time:.1f}x)",
+            style="info",
+        )
+        if BENCHMARKS:
+            self.assertLess(batch_time, scalar_time)
+
+    def test_kinematic_model_revision(self) -> None:
+        arm_params = ArmParameters()
+        arm_params.a2z = 100.0
+        arm_params.a3z = 100.0
+        arm_params.a4x = 50.0
+        arm_params.a6x = 20.0
+        kinematics = ArmKinematics(arm_params)
+
+        model = kinematics.model
+        self.assertIs(model, kinematics.model)
+        pose = kinematics.angles_to_pose([0, 0, 0, 0, 0, 0])
+        self.assertTrue(allclose(pose.as_list, [70, 0, 200, 0, 0, 0]))
+
+        revision = arm_params.revision
+        arm_params.a6x = 30.0
+        self.assertGreater(arm_params.revision, revision)
+        self.assertIsNot(model, kinematics.model)
+        pose = kinematics.angles_to_pose([0, 0, 0, 0, 0, 0])
+        self.assertTrue(allclose(pose.as_list, [80, 0, 200, 0, 0, 0]))
+        poses = kinematics.angles_to_pose_batch(np.zeros((1, 6)))
+        self.assertTrue(allclose(list(poses[0]), [80, 0, 200, 0, 0, 0]))
+
+    def test_scalar_engine(self) -> None:
+        kinematics = self.controller.kinematics
+        scalar_kinematics = ArmKinematics(kinematics.arm_params, engine=KinematicsEngine.SCALAR)
+        seeds = self.random_angles(500)
+        for angles, seed in zip(self.random_angles(500), seeds):
+            pose = kinematics.angles_to_pose(list(angles))
+            scalar_pose = scalar_kinematics.angles_to_pose(list(angles))
+            self.assertTrue(np.allclose(pose.as_list, scalar_pose.as_list, atol=1e-6))
+
+            expected = kinematics.pose_to_angles(pose, list(seed))
+            found = scalar_kinematics.pose_to_angles(pose, list(seed))
+            if expected is None or found is None:
+                self.fail("pose_to_angles returned None")
+            self.assertTrue(np.allclose(expected, found, atol=1e-6), f"expected: {expected} actual: {found}")
+
+        with self.assertRaises(ArmKinematics.NotReachableError):
+            scalar_kinematics._pose_to_angles(ArmPose(5000, 0, 0, 0, 0, 0))
+
+    def test_scalar_engine_benchmark(self) -> None:
+        num_samples = 1000
+        kinematics = self.controller.kinematics
+        scalar_kinematics = ArmKinematics(kinematics.arm_params, engine=KinematicsEngine.SCALAR)
+        angles = [list(row) for row in self.random_angles(num_samples)]
+        poses = [kinematics.angles_to_pose(row) for row in angles]
+        seed = [0.0] * 6
+
+        latencies = {}
+        for engine in (kinematics, scalar_kinematics):
+            start_time = time.perf_counter()
+            for row in angles:
+                engine.angles_to_pose(row)
+            fk_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            for pose in poses:
+                engine.pose_to_angles(pose, seed)
+            ik_time = time.perf_counter() - start_time
+            latencies[engine.engine] = (fk_time / num_samples, ik_time / num_samples)
+
+        numpy_fk, numpy_ik = latencies[KinematicsEngine.NUMPY]
+        scalar_fk, scalar_ik = latencies[KinematicsEngine.SCALAR]
+        console.log(
+            f"angles_to_pose: numpy {numpy_fk * 1e6:.1f}us scalar {scalar_fk * 1e6:.1f}us ({numpy_fk / scalar_fk:.1f}x), "
+            f"pose_to_angles: numpy {numpy_ik * 1e6:.1f}us scalar {scalar_ik * 1e6:.1f}us ({numpy_ik / scalar_ik:.1f}x)",
+            style="info",
+        )
+        if BENCHMARKS:
+            self.assertLess(scalar_fk * 10, numpy_fk)
+            # About 7-8x: the scalar solve is ~25 math calls in the interpreter, its floor is close to 10% of numpy IK
+            self.assertLess(scalar_ik * 5, numpy_ik)
+
+    def test_ik_cache(self) -> None:
+        kinematics = self.controller.kinematics
+        cached_kinematics = ArmKinematics(kinematics.arm_params, ik_cache=IKCache(max_size=8))
+        ik_cache = cached_kinematics.ik_cache
+        if ik_cache is None:
+            self.fail("ik_cache is None")
+
+        poses = [kinematics.angles_to_pose(list(row)) for row in self.random_angles(10)]
+        seeds = self.random_angles(3) * 4  # wide seeds exercise the 2π windings
+        for pose in poses[:4]:
+            for seed in seeds:
+                expected = kinematics._pose_to_angles(pose, list(seed))
+                found = cached_kinematics._pose_to_angles(pose, list(seed))
+                self.assertTrue(np.allclose(expected, found, atol=1e-6), f"expected: {expected} actual: {found}")
+        self.assertEqual(ik_cache.misses, 4)
+        self.assertEqual(ik_cache.hits, 8)
+
+        unreachable = ArmPose(5000, 0, 0, 0, 0, 0)
+        for _ in range(2):
+            with self.assertRaises(ArmKinematics.NotReachableError):
+                cached_kinematics._pose_to_angles(unreachable)
+        self.assertEqual(ik_cache.misses, 5)
+        self.assertEqual(ik_cache.hits, 9)
+
+        for pose in poses:
+            cached_kinematics._pose_to_angles(pose)
+        self.assertEqual(len(ik_cache), 8)
+
+        kinematics.arm_params.j1.set_bounds(kinematics.arm_params.j1.min_val, kinematics.arm_params.j1.max_val)
+        cached_kinematics._pose_to_angles(poses[-1])
+        self.assertEqual(len(ik_cache), 1)
+
+    def test_pose_to_angles_all_branches(self) -> None:
+        kinematics = self.controller.kinematics
+        angles = self.random_angles(300)
+        poses = kinematics.angles_to_pose_batch(angles)
+
+        candidates, valid = kinematics.pose_to_angles_all_branches(poses, angles)
+        self.assertEqual(candidates.shape, (300, 8, 6))
+        self.assertTrue(valid.any(axis=1).all())
+        frames = kinematics.angles_to_frames_batch(angles)
+        for branch in range(8):
+            branch_valid = valid[:, branch]
+            branch_frames = kinematics.angles_to_frames_batch(candidates[branch_valid, branch])
+            self.assertTrue(np.allclose(branch_frames, frames[branch_valid], atol=1e-6))
+            for joint in kinematics.arm_params.joints:
+                joint_angles = candidates[branch_valid, branch, kinematics.arm_params.joints.index(joint)]
+                self.assertTrue(np.all((joint_angles >= joint.min_val) & (joint_angles <= joint.max_val)))
+
+        best, reachable = kinematics.pose_to_angles_best_batch(poses, angles)
+        self.assertTrue(reachable.all())
+        self.assertTrue(np.allclose(best, angles, atol=1e-6))
+
+    def test_pose_to_angles_best_branch_cost(self) -> None:
+        arm_params = ArmParameters()
+        for attribute, value in vars(self.controller.arm_params).items():
+            if attribute.startswith("a"):
+                setattr(arm_params, attribute, value)
+        for joint in arm_params.joints:
+            joint.set_bounds(-2 * np.pi, 2 * np.pi)
+        kinematics = ArmKinematics(arm_params)
+
+        seeds = self.random_angles(200)
+        poses = kinematics.angles_to_pose_batch(self.random_angles(200))
+        candidates, valid = kinematics.pose_to_angles_all_branches(poses, seeds)
+
+        speeds = [0.2, 0.1, 0.1, 0.3, 0.4, 0.4]
+        for cost in (joint_travel_cost([1, 2, 2, 1, 1, 1]), travel_time_cost(speeds)):
+            best, reachable = kinematics.pose_to_angles_best_batch(poses, seeds, cost)
+            self.assertTrue(reachable.all())
+            costs = np.where(valid, cost(candidates, seeds), np.inf)
+            self.assertTrue(np.allclose(cost(best[:, None, :], seeds)[:, 0], costs.min(axis=1)))
+            default_angles, _ = kinematics.pose_to_angles_batch(poses, seeds)
+            self.assertTrue(np.all(cost(best[:, None, :], seeds) <= cost(default_angles[:, None, :], seeds) + 1e-9))
+
+        kinematics.branch_cost = travel_time_cost(speeds)
+        found = kinematics._pose_to_angles(ArmPose(*poses[0]), list(seeds[0]))
+        best, _ = kinematics.pose_to_angles_best_batch(poses[:1], seeds[:1], kinematics.branch_cost)
+        self.assertTrue(np.allclose(found, best[0]))
+
+    def test_joint_limits(self) -> None:
+        arm_params = ArmParameters()
+        for attribute, value in vars(self.controller.arm_params).items():
+            if attribute.startswith("a"):
+                setattr(arm_params, attribute, value)
+        for joint in arm_params.joints[1:]:
+            joint.set_bounds(-np.pi, np.pi)
+        kinematics = ArmKinematics(arm_params)
+        scalar_kinematics = ArmKinematics(arm_params, engine=KinematicsEngine.SCALAR)
+
+        pose = ArmPose(-500, 1000, 2000, 50, 50, 50, degree=True)  # J1 at 124.3 degrees
+        for engine in (kinematics, scalar_kinematics):
+            self.assertIsNotNone(engine._pose_to_angles(pose))
+            with self.assertRaises(ArmKinematics.JointLimitError) as context:
+                engine._pose_to_angles(pose, enforce_limits=True)
+            self.assertEqual(context.exception.joint_idx, 0)
+        _, reachable = kinematics.pose_to_angles_batch(np.array([pose.as_tuple]), enforce_limits=True)
+        self.assertFalse(reachable[0])
+
+        arm_params.j1.set_bounds(-np.pi, np.pi)
+        for engine in (kinematics, scalar_kinematics):
+            angles = engine._pose_to_angles(pose, enforce_limits=True)
+            self.assertTrue(allclose(angles[0], degree2rad(124.3)))
+
+        # Out of bounds windings of the seed are wrapped back into the joint bounds
+        seed = [2 * np.pi, 0, 0, 0, 0, 0]
+        self.assertGreater(kinematics._pose_to_angles(pose, seed)[0], np.pi)
+        angles = kinematics._pose_to_angles(pose, seed, enforce_limits=True)
+        self.assertTrue(allclose(angles[0], degree2rad(124.3)))
+        batch_angles, reachable = kinematics.pose_to_angles_batch(np.array([pose.as_tuple]), np.array(seed), True)
+        self.assertTrue(reachable[0])
+        self.assertTrue(np.allclose(batch_angles[0], angles))
+
+        arm_params.j1.set_bounds(-1, 1)
+        wrapped, within = kinematics.wrap_into_limits_batch(np.array([[0, 4.0, 0, 0, 0, 0], [2.0, 0, 0, 0, 0, 0]]))
+        self.assertTrue(np.allclose(wrapped[0, 1], 4.0 - 2 * np.pi))
+        self.assertTrue(within[0].all())
+        self.assertFalse(within[1, 0])
+
+    def test_jacobian(self) -> None:
+        kinematics = self.controller.kinematics
+        angles = self.random_angles(50)
+        jacobians = kinematics.jacobian_batch(angles)
+        self.assertEqual(jacobians.shape, (50, 6, 6))
+
+        step = 1e-6
+        frames = kinematics.angles_to_frames_batch(angles)
+        for joint_idx in range(6):
+            moved = angles.copy()
+            moved[:, joint_idx] += step
+            moved_frames = kinematics.angles_to_frames_batch(moved)
+            linear = (moved_frames[:, :3, 3] - frames[:, :3, 3]) / step
+            self.assertTrue(np.allclose(jacobians[:, :3, joint_idx], linear, atol=1e-2))
+            # dR @ R.T is the skew matrix of the angular velocity
+            skew = (moved_frames[:, :3, :3] - frames[:, :3, :3]) @ np.swapaxes(frames[:, :3, :3], 1, 2) / step
+            angular = np.stack([skew[:, 2, 1], skew[:, 0, 2], skew[:, 1, 0]], axis=1)
+            self.assertTrue(np.allclose(jacobians[:, 3:, joint_idx], angular, atol=1e-4))
+
+        self.assertTrue(np.allclose(kinematics.jacobian(list(angles[0])), jacobians[0]))
+
+        singular = np.array([[0.3, 0.2, 0.1, 0.4, 0.0, 0.2]])  # J4 and J6 aligned
+        self.assertTrue(np.allclose(kinematics.manipulability_batch(singular), 0, atol=1e-6))
+        self.assertGreater(kinematics.condition_number_batch(singular)[0], 1e10)
+        manipulability = kinematics.manipulability_batch(angles)
+        self.assertEqual(manipulability.shape, (50,))
+        self.assertTrue(np.all(manipulability >= 0))
+
+    def test_numeric_ik(self) -> None:
+        kinematics = self.controller.kinematics
+        angles = self.random_angles(200)
+        poses = kinematics.angles_to_pose_batch(angles)
+
+        # Warm started from the closed form solution of an analytic arm
+        found, converged, iterations = kinematics.pose_to_angles_numeric_batch(poses, angles)
+        self.assertTrue(converged.all())
+        self.assertLessEqual(iterations.max(), 2)
+        self.assertTrue(np.allclose(kinematics.angles_to_pose_batch(found), poses, atol=1e-6))
+
+        # Cold started from a perturbed seed
+        seeds = angles + np.random.uniform(-0.1, 0.1, angles.shape)
+        found, converged, _ = kinematics.pose_to_angles_numeric_batch(poses, angles, seeds)
+        self.assertTrue(converged.all())
+        self.assertTrue(np.allclose(kinematics.angles_to_pose_batch(found), poses, atol=1e-6))
+
+        # Arm with the offsets the closed form ignores
+        arm_params = ArmParameters()
+        for attribute, value in vars(self.controller.arm_params).items():
+            if attribute.startswith("a"):
+                setattr(arm_params, attribute, value)
+        for attribute, value in dict(a1x=20, a1y=-15, a3x=12, a4y=25, a5z=-18, a6y=10, a6z=8).items():
+            setattr(arm_params, attribute, value)
+        for joint, (lower, upper) in zip(arm_params.joints, kinematics.model.bounds_float):
+            joint.set_bounds(lower, upper)
+        general = ArmKinematics(arm_params)
+        self.assertFalse(general.model.is_analytic)
+
+        poses = general.angles_to_pose_batch(angles)
+        closed_form, _ = general._pose_to_angles_closed_form_batch(poses, angles)
+        self.assertFalse(np.allclose(general.angles_to_pose_batch(closed_form), poses, atol=1e-3))
+
+        found, reachable = general.pose_to_angles_batch(poses, angles)
+        self.assertGreater(reachable.mean(), 0.95)
+        self.assertTrue(np.allclose(general.angles_to_pose_batch(found[reachable]), poses[reachable], atol=1e-6))
+
+        pose = ArmPose(*poses[0])
+        single = general._pose_to_angles(pose, list(angles[0]))
+        self.assertTrue(np.allclose(general.angles_to_pose_batch(np.array([single]))[0], poses[0], atol=1e-6))
+
+        numeric = ArmKinematics(self.controller.arm_params, engine=KinematicsEngine.NUMERIC)
+        pose = kinematics.angles_to_pose(list(angles[1]))
+        single = numeric._pose_to_angles(pose, list(angles[1]))
+        frames = kinematics.angles_to_frames_batch(np.array([single, angles[1]]))
+        self.assertTrue(np.allclose(frames[0], frames[1], atol=1e-6))
+
+    def test_linear_path(self) -> None:
+        start = ArmPose(1500, -200, 1800, 10, 20, 30, degree=True)
+        end = ArmPose(1700, 300, 1500, -20, 40, 60, degree=True)
+        poses = linear_path(start, end, step_mm=10, step_rad=degree2rad(1))
+        distance = np.linalg.norm(np.array(end.as_tuple[:3]) - np.array(start.as_tuple[:3]))
+        self.assertEqual(len(poses), int(np.ceil(distance / 10)))
+        self.assertTrue(np.allclose(poses[-1], end.as_tuple))
+
+        # Positions on the segment, evenly spaced
+        direction = (np.array(end.as_tuple[:3]) - np.array(start.as_tuple[:3])) / distance
+        offsets = poses[:, :3] - np.array(start.as_tuple[:3])
+        self.assertTrue(np.allclose(np.cross(offsets, direction), 0, atol=1e-6))
+        self.assertTrue(np.allclose(np.diff(np.linalg.norm(offsets, axis=1)), distance / len(poses)))
+
+        # Orientation rotates about a fixed axis at a constant rate
+        rotations = create_rotation_matrices_from_euler_angles(*poses[:, 3:].T)
+        steps = rotation_vectors_from_matrices(rotations[1:] @ np.swapaxes(rotations[:-1], 1, 2))
+        self.assertTrue(np.allclose(steps, steps[0], atol=1e-9))
+
+        only_rotation = linear_path(start, ArmPose(1500, -200, 1800, 10, 20, 50, degree=True), step_rad=degree2rad(2))
+        self.assertEqual(len(only_rotation), 10)
+        self.assertEqual(len(linear_path(start, start)), 1)
+
+    def test_path_ik(self) -> None:
+        arm_params = ArmParameters()
+        for attribute, value in vars(self.controller.arm_params).items():
+            if attribute.startswith("a"):
+                setattr(arm_params, attribute, value)
+        for joint in (arm_params.j1, arm_params.j2, arm_params.j3, arm_params.j5):
+            joint.set_bounds(-np.pi, np.pi)
+        # Wrist rolls spanning two turns, every pose has several windings
+        arm_params.j4.set_bounds(-2 * np.pi, 2 * np.pi)
+        arm_params.j6.set_bounds(-2 * np.pi, 2 * np.pi)
+        kinematics = ArmKinematics(arm_params)
+
+        # Joint path crossing the wrist singularity (J5 = 0) with large wrist rolls
+        start = np.array([0.1, 0.2, 0.1, 0.3, 0.4, 0.2])
+        end = np.array([1.2, 0.5, -0.3, 2.5, -0.6, 3.0])
+        path = start + np.linspace(0, 1, 300)[:, None] * (end - start)
+        poses = kinematics.angles_to_pose_batch(path)
+        self.assertLess(kinematics.dexterity_batch(path).min(), 1e-3)
+        self.assertGreater(kinematics.dexterity_batch(start[None, :])[0], 1e-2)
+
+        start_time = time.perf_counter()
+        angles, reachable = kinematics.pose_to_angles_path(poses, start)
+        elapsed = time.perf_counter() - start_time
+        self.assertTrue(reachable.all())
+        self.assertTrue(np.allclose(kinematics.angles_to_pose_batch(angles), poses, atol=1e-6))
+
+        # No flips: as short as the joint path the poses came from
+        travel = np.abs(np.diff(np.vstack([start, angles]), axis=0))
+        self.assertAlmostEqual(travel.sum(), np.abs(end - start).sum(), places=6)
+        self.assertLess(travel.max(), 0.05)
+        # Choosing the best branch of each pose on its own flips the wrist
+        independent, _ = kinematics.pose_to_angles_best_batch(poses, start)
+        independent_travel = np.abs(np.diff(np.vstack([start, independent]), axis=0))
+        console.log(
+            f"Path IK of {len(poses)} poses in {elapsed * 1000:.0f}ms, joint travel {travel.sum():.2f} rad,"
+            f" {independent_travel.sum():.2f} rad solving each pose independently",
+            style="info",
+        )
+        self.assertGreater(independent_travel.max(), 1.0)
+
+        # Unreachable samples are flagged and keep the previous angles
+        poses[100] = [10_000, 0, 0, 0, 0, 0]
+        angles, reachable = kinematics.pose_to_angles_path(poses, start)
+        self.assertEqual(np.flatnonzero(~reachable).tolist(), [100])
+        self.assertTrue(np.array_equal(angles[100], angles[99]))
+
+    def test_arc_path(self) -> None:
+        start = ArmPose(1500, 0, 1500, 0, 20, 0, degree=True)
+        via = ArmPose(1600, 100, 1500, 0, 30, 0, degree=True)
+        end = ArmPose(1700, 0, 1500, 0, 40, 10, degree=True)
+        center, radius, normal = circle_through(*(np.array(pose.as_tuple[:3]) for pose in (start, via, end)))
+        self.assertTrue(np.allclose(center, [1600, 0, 1500]))
+        self.assertAlmostEqual(radius, 100)
+        self.assertTrue(np.allclose(np.abs(normal), [0, 0, 1]))
+
+        for max_chord_error in (0.5, 0.01):
+            poses = arc_path(start, via, end, max_chord_error=max_chord_error, step_rad=1)
+            self.assertTrue(np.allclose(poses[-1], end.as_tuple))
+            self.assertTrue(np.allclose(np.linalg.norm(poses[:, :3] - center, axis=1), radius))
+            # Half a circle through the via point, chords within the error
+            positions = np.vstack([start.as_tuple[:3], poses[:, :3]])
+            self.assertTrue(np.all(positions[:, 1] >= -1e-9))
+            self.assertTrue(np.isclose(positions, via.as_tuple[:3]).all(axis=1).any())
+            midpoints = (positions[1:] + positions[:-1]) / 2
+            self.assertLessEqual(radius - np.linalg.norm(midpoints - center, axis=1).min(), max_chord_error)
+        self.assertGreater(
+            len(arc_path(start, via, end, max_chord_error=0.01)), len(arc_path(start, via, end, max_chord_error=0.5))
+        )
+
+        circle = arc_path(start, via, end, max_chord_error=0.1, full_circle=True)
+        self.assertTrue(np.allclose(circle[-1], start.as_tuple))
+        self.assertLess(circle[:, 1].min(), -99)
+        with self.assertRaises(ValueError):
+            arc_path(start, ArmPose(1600, 0, 1500, 0, 0, 0), end)
+
+    def test_move_arc(self) -> None:
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = [0.1, 0.2, 0.1, 0.1, 0.3, 0.1]
+        controller.is_homed = True
+        start = controller.current_pose
+        via = ArmPose(start.x + 50, start.y + 50, start.z, start.roll, start.pitch, start.yaw)
+        end = ArmPose(start.x + 100, start.y, start.z, start.roll, start.pitch, start.yaw)
+
+        with mock.patch.object(controller.controller_server, "send_messages") as send_messages:
+            self.assertTrue(controller.move_arc(via, end))
+            messages = send_messages.call_args.args[0]
+            positions = controller.kinematics.angles_to_pose_batch(np.array([message.args for message in messages]))[:, :3]
+            self.assertTrue(np.allclose(positions[-1], end.as_tuple[:3]))
+            center = np.array([start.x + 50, start.y, start.z])
+            self.assertTrue(np.allclose(np.linalg.norm(positions - center, axis=1), 50, atol=1e-6))
+            self.assertEqual(controller.target_pose, end)
+
+            controller.target_pose = None
+            send_messages.reset_mock()
+            self.assertTrue(controller.move_circle(via, end))
+            messages = send_messages.call_args.args[0]
+            self.assertTrue(np.allclose(messages[-1].args, controller.current_angles, atol=1e-6))
+
+            # Nothing is sent when part of the circle is out of reach or the points are collinear
+            send_messages.reset_mock()
+            self.assertFalse(controller.move_circle(via, ArmPose(start.x + 10_000, start.y, start.z, 0, 0, 0)))
+            self.assertFalse(controller.move_arc(end, ArmPose(start.x + 200, start.y, start.z, 0, 0, 0)))
+            send_messages.assert_not_called()
+
+    def test_move_linear(self) -> None:
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = [0.1, 0.2, 0.1, 0.1, 0.3, 0.1]
+        controller.is_homed = True
+        start = controller.current_pose
+        end = ArmPose(start.x + 100, start.y - 50, start.z + 80, start.roll, start.pitch + 0.2, start.yaw)
+
+        with mock.patch.object(controller.controller_server, "send_messages") as send_messages:
+            self.assertTrue(controller.move_linear(end, step_mm=5))
+            send_messages.assert_called_once()
+            messages = send_messages.call_args.args[0]
+            self.assertEqual(controller.move_queue_size, len(messages))
+            self.assertGreaterEqual(len(messages), 28)
+            waypoints = np.array([message.args for message in messages])
+            positions = controller.kinematics.angles_to_pose_batch(waypoints)[:, :3]
+            self.assertTrue(np.allclose(positions[-1], end.as_tuple[:3]))
+            direction = (np.array(end.as_tuple[:3]) - np.array(start.as_tuple[:3])) / 150
+            self.assertTrue(np.allclose(np.cross(positions - np.array(start.as_tuple[:3]), direction), 0, atol=1e-6))
+
+            # Nothing is sent when a sample is out of reach
+            send_messages.reset_mock()
+            self.assertFalse(controller.move_linear(ArmPose(10_000, 0, 0, 0, 0, 0)))
+            send_messages.assert_not_called()
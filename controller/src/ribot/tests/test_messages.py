@@ -0,0 +1,311 @@
+import random
+import socket
+import struct
+import threading
+import time
+import timeit
+import unittest
+from typing import Callable, List
+from unittest import mock
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters
+from ribot.controller import ArmController
+from ribot.tests import BENCHMARKS, expand_move_batch
+from ribot.utils.messages import (
+    MAX_FRAME_ARGS,
+    MOVE_BATCH_CODE,
+    Message,
+    MessageDecoder,
+    MessageEncoder,
+    MessageOp,
+    move_batch_messages,
+)
+from ribot.utils.prints import console
+
+
+def legacy_encode(message: Message) -> bytes:
+    """Encoding before the precompiled codecs, a format string built and parsed on every call."""
+    return struct.pack("<cii" + "f" * len(message.args), message.op.value.encode(), message.code, message.num_args, *message.args)
+
+
+def legacy_decode(data: bytes) -> Message:
+    op, code, num_args = struct.unpack_from("<cii", data, offset=0)
+    args = struct.unpack_from("<" + "f" * num_args, data, offset=9)
+    return Message(MessageOp(op.decode()), code, list(args))
+
+
+class TestMessages(unittest.TestCase):
+    STATUS = Message(MessageOp.STATUS, 1, [0.5, -1.25, 2.0, 0.0, 0.75, -0.5, 1.0, 3.0, 1.0])
+
+    def test_round_trip(self) -> None:
+        for message in [self.STATUS, Message(MessageOp.STATUS, 0), Message(MessageOp.CONFIG, 40, [2.0, 1.5])]:
+            data = message.encode()
+            self.assertEqual(data, legacy_encode(message))
+            self.assertEqual(len(data), message.encoded_size)
+            decoded = Message.decode(memoryview(data))
+            self.assertEqual((decoded.op, decoded.code, decoded.num_args), (message.op, message.code, message.num_args))
+            self.assertEqual(decoded.args, message.args)
+            self.assertEqual(Message.decode_headers(data), (message.op, message.code, message.num_args))
+
+    def test_buffers(self) -> None:
+        moves = [Message(MessageOp.MOVE, 15, [float(idx)] * 7) for idx in range(3)]
+        buffer = bytearray(200)
+        offset = 0
+        for message in moves:
+            offset = message.encode_into(buffer, offset)
+        self.assertEqual(bytes(buffer[:offset]), b"".join(legacy_encode(message) for message in moves))
+        self.assertEqual(Message.decode(buffer, moves[0].encoded_size).args, moves[1].args)
+
+        encoder = MessageEncoder(capacity=16)
+        self.assertEqual(bytes(encoder.encode(moves[0])), moves[0].encode())
+        held = encoder.encode(moves)  # grows past the capacity while a view is alive
+        self.assertEqual(bytes(held), b"".join(message.encode() for message in moves))
+        self.assertEqual(bytes(encoder.encode(moves[:1])), moves[0].encode())
+
+    def test_codec_benchmark(self) -> None:
+        repeats = 2000
+        status = self.STATUS
+        data = status.encode()
+
+        def timed(function: Callable[[], object]) -> float:
+            """Best of a few rounds, in microseconds per call."""
+            return min(timeit.repeat(function, number=repeats, repeat=5)) / repeats * 1e6
+
+        moves = [Message(MessageOp.MOVE, 15, [0.1 * idx] * 7) for idx in range(64)]
+        encoder = MessageEncoder()
+        wide = Message(MessageOp.MOVE, 15, [0.5] * 512).encode()
+
+        legacy_encode_us = timed(lambda: legacy_encode(status))
+        encode_us = timed(status.encode)
+        legacy_batch_us = timed(lambda: b"".join(legacy_encode(message) for message in moves))
+        batch_us = timed(lambda: encoder.encode(moves))
+        legacy_decode_us = timed(lambda: legacy_decode(data))
+        decode_us = timed(lambda: Message.decode(data))
+        wide_decode_us = timed(lambda: Message.decode(wide))
+        console.log(
+            f"Status message: encode {legacy_encode_us:.2f}us -> {encode_us:.2f}us, decode {legacy_decode_us:.2f}us"
+            f" -> {decode_us:.2f}us. {len(moves)} moves in one buffer: {legacy_batch_us:.1f}us -> {batch_us:.1f}us."
+            f" 512 arguments: decode {wide_decode_us:.2f}us",
+            style="info",
+        )
+        if BENCHMARKS:
+            self.assertLess(decode_us, legacy_decode_us)
+
+    def random_messages(self, count: int, seed: int = 0) -> List[Message]:
+        rng = random.Random(seed)
+        ops = list(MessageOp)
+        return [
+            Message(rng.choice(ops), rng.randrange(0, 40), [rng.uniform(-10, 10) for _ in range(rng.randrange(0, 12))])
+            for _ in range(count)
+        ]
+
+    def assert_same_messages(self, decoded: List[Message], messages: List[Message]) -> None:
+        self.assertEqual(len(decoded), len(messages))
+        for received, sent in zip(decoded, messages):
+            self.assertEqual((received.op, received.code), (sent.op, sent.code))
+            self.assertTrue(np.allclose(received.args, sent.args, atol=1e-5))
+
+    def fragments(self, data: bytes, max_size: int, seed: int = 0) -> List[bytes]:
+        rng = random.Random(seed)
+        pieces = []
+        offset = 0
+        while offset < len(data):
+            size = rng.randint(1, max_size)
+            pieces.append(data[offset : offset + size])
+            offset += size
+        return pieces
+
+    def test_decoder_fragmentation(self) -> None:
+        messages = self.random_messages(2000)
+        data = b"".join(message.encode() for message in messages)
+        for seed, max_size in enumerate([1, 7, 64, 1500]):
+            decoder = MessageDecoder(capacity=128)
+            decoded: List[Message] = []
+            for piece in self.fragments(data, max_size, seed):
+                decoder.feed(piece)
+                decoded.extend(decoder)
+            self.assert_same_messages(decoded, messages)
+            self.assertEqual(decoder.pending, 0)
+
+        # A message larger than the buffer grows it
+        decoder = MessageDecoder(capacity=16)
+        decoder.feed(Message(MessageOp.MOVE, 15, [1.0] * 100).encode())
+        self.assertEqual(list(decoder)[0].args, [1.0] * 100)
+
+        decoder.feed(b"X" + bytes(8))
+        with self.assertRaises(ValueError):
+            list(decoder)
+        decoder = MessageDecoder(max_args=10)
+        decoder.feed(Message(MessageOp.MOVE, 15, [1.0] * 11).encode())
+        with self.assertRaises(ValueError):
+            list(decoder)
+
+    def test_decoder_socket(self) -> None:
+        messages = self.random_messages(5000, seed=1)
+        data = b"".join(message.encode() for message in messages)
+        sender, receiver = socket.socketpair()
+        self.addCleanup(sender.close)
+        self.addCleanup(receiver.close)
+
+        def send_fragmented() -> None:
+            for piece in self.fragments(data, 300, seed=2):
+                sender.sendall(piece)
+                if random.random() < 0.05:
+                    time.sleep(0.0005)
+            sender.shutdown(socket.SHUT_WR)
+
+        thread = threading.Thread(target=send_fragmented)
+        start = time.perf_counter()
+        thread.start()
+        decoder = MessageDecoder()
+        decoded: List[Message] = []
+        reads = 0
+        while decoder.recv_into(receiver) > 0:
+            reads += 1
+            decoded.extend(decoder)
+        elapsed = time.perf_counter() - start
+        thread.join()
+        console.log(
+            f"Decoded {len(decoded)} messages ({len(data) / 1e3:.0f} kB) in {reads} reads,"
+            f" {len(decoded) / elapsed:.0f} messages/s",
+            style="info",
+        )
+        self.assert_same_messages(decoded, messages)
+        self.assertLess(reads, len(messages))
+
+    def test_server_burst(self) -> None:
+        controller = ArmController(arm_parameters=ArmParameters())
+        server = controller.controller_server
+        host, firmware = socket.socketpair()
+        self.addCleanup(host.close)
+        self.addCleanup(firmware.close)
+        host.setblocking(False)
+        server.connection_socket = host
+        server.thread = threading.current_thread()
+
+        status = Message(MessageOp.STATUS, 1, [0.1] * 6 + [0.5, 3.0, 1.0])
+        replies = [status] * 20 + [Message(MessageOp.CONFIG, 8, [float(idx), 0.25]) for idx in range(6)]
+        self.assertEqual(server.receive_messages(), server.ReceiveStatusCode.NO_NEW_DATA)
+        data = b"".join(message.encode() for message in replies)
+        # A burst split mid message: the partial message waits for the rest
+        firmware.sendall(data[:-3])
+        received = server.receive_messages()
+        assert isinstance(received, list)
+        self.assertEqual(len(received), len(replies) - 1)
+        self.assertEqual(server.receive_messages(), server.ReceiveStatusCode.NO_NEW_DATA)
+        firmware.sendall(data[-3:])
+        last = server.receive_message()
+        assert isinstance(last, Message)
+        self.assertEqual((last.op, last.code, last.args[0]), (MessageOp.CONFIG, 8, 5.0))
+
+    def test_server_large_send(self) -> None:
+        controller = ArmController(arm_parameters=ArmParameters())
+        server = controller.controller_server
+        host, firmware = socket.socketpair()
+        self.addCleanup(host.close)
+        self.addCleanup(firmware.close)
+        host.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        host.setblocking(False)
+        firmware.settimeout(5)  # a partial frame fails the test instead of hanging it
+        server.connection_socket = host
+        server.thread = threading.current_thread()
+
+        # Far more than the send buffer holds while the firmware is not reading yet
+        setpoints = np.hstack([np.linspace(0, 1, 20000)[:, None] * np.ones(6), np.full((20000, 1), 0.02)])
+        frames = move_batch_messages(setpoints)
+        decoder = MessageDecoder()
+        received: List[Message] = []
+
+        def receive() -> None:
+            time.sleep(0.1)
+            while len(received) < len(frames) and decoder.recv_into(firmware) > 0:
+                received.extend(decoder)
+
+        reader = threading.Thread(target=receive)
+        reader.start()
+        with mock.patch.object(controller, "stop") as stop:
+            server.send_messages(frames)
+            reader.join()
+            stop.assert_not_called()
+        self.assert_same_messages(received, frames)
+
+        # A firmware that stops reading ends the connection once the send timeout runs out
+        server.send_timeout = 0.05
+        with mock.patch.object(controller, "stop") as stop:
+            server.send_messages(frames)
+            stop.assert_called_once()
+
+    def test_move_batch(self) -> None:
+        rng = np.random.default_rng(0)
+        setpoints = np.hstack([rng.uniform(-3, 3, (100, 6)), rng.uniform(0.01, 0.1, (100, 1)), np.full((100, 1), np.nan)])
+        setpoints[[3, 50], -1] = [0.5, 1.0]
+        frames = move_batch_messages(setpoints)
+        self.assertEqual(len(frames), 4)
+        self.assertTrue(all(frame.code == MOVE_BATCH_CODE and frame.num_args <= MAX_FRAME_ARGS for frame in frames))
+        moves = [move for frame in frames for move in expand_move_batch(Message.decode(frame.encode()))]
+        self.assertEqual([move.code for move in moves], [17 if idx in (3, 50) else 15 for idx in range(100)])
+        self.assertTrue(np.allclose([move.args[:7] for move in moves], setpoints[:, :7]))
+        self.assertEqual([moves[3].args[-1], moves[50].args[-1]], [0.5, 1.0])
+
+        self.assertEqual(move_batch_messages(np.zeros((0, 7))), [])
+        with self.assertRaises(ValueError):
+            move_batch_messages(np.zeros(7))
+        with self.assertRaises(ValueError):
+            move_batch_messages(np.zeros((1, 7)), max_args=8)
+
+    def test_batch_benchmark(self) -> None:
+        controller = ArmController(arm_parameters=ArmParameters())
+        server = controller.controller_server
+        host, firmware = socket.socketpair()
+        self.addCleanup(host.close)
+        self.addCleanup(firmware.close)
+        server.connection_socket = host
+        server.thread = threading.current_thread()
+
+        num_waypoints = 3000
+        setpoints = np.hstack([np.linspace(0, 1, num_waypoints)[:, None] * np.ones(6), np.full((num_waypoints, 1), 0.02)])
+
+        def link_rate(send: Callable[[], None]) -> tuple:
+            """Waypoints per second from the first send until the firmware side decoded the last one, and frames."""
+            decoder = MessageDecoder()
+            counts = [0, 0]
+
+            def receive() -> None:
+                while counts[0] < num_waypoints and decoder.recv_into(firmware) > 0:
+                    for message in decoder:
+                        counts[0] += int(message.args[0]) if message.code == MOVE_BATCH_CODE else 1
+                        counts[1] += 1
+
+            reader = threading.Thread(target=receive)
+            reader.start()
+            start = time.perf_counter()
+            send()
+            reader.join()
+            self.assertEqual(counts[0], num_waypoints)
+            return num_waypoints / (time.perf_counter() - start), counts[1]
+
+        def per_waypoint() -> None:
+            for row in setpoints:
+                server.send_message(Message(MessageOp.MOVE, 15, row.tolist()), mutex=True)
+
+        def batched() -> None:
+            server.send_messages(move_batch_messages(setpoints), mutex=True)
+
+        single_rate, single_frames = link_rate(per_waypoint)
+        batch_rate, batch_frames = link_rate(batched)
+        # The firmware takes a single frame from the socket per iteration of its 10ms message loop
+        console.log(
+            f"Link throughput: one frame per waypoint {single_rate:.0f} waypoints/s, batched {batch_rate:.0f} waypoints/s"
+            f" ({batch_rate / single_rate:.1f}x). Frames {single_frames} -> {batch_frames}, firmware intake at 100 frames/s:"
+            f" {100:.0f} -> {100 * num_waypoints / batch_frames:.0f} waypoints/s",
+            style="info",
+        )
+        if BENCHMARKS:
+            self.assertGreater(batch_rate, single_rate)
+        self.assertLessEqual(batch_frames * 30, single_frames)
+
+
+if __name__ == "__main__":
+    unittest.main()
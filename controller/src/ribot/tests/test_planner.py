@@ -0,0 +1,89 @@
+import math
+import time
+import unittest
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters, ArmPose
+from ribot.control.cartesian import linear_path
+from ribot.control.planner import PlanCandidate
+from ribot.controller import ArmController, Settings
+from ribot.utils.prints import console, disable_console
+
+
+class TestPlanner(unittest.TestCase):
+    controller: ArmController
+    START_ANGLES = np.array([0.1, 0.2, 0.1, 0.1, 0.3, 0.1])
+
+    @classmethod
+    @disable_console
+    def setUpClass(cls) -> None:
+        arm_params = ArmParameters()
+        arm_params.a1z = 650.0
+        arm_params.a2x = 400.0
+        arm_params.a2z = 680.0
+        arm_params.a3z = 1100.0
+        arm_params.a4z = 230.0
+        arm_params.a4x = 766.0
+        arm_params.a5x = 345.0
+        arm_params.a6x = 244.0
+        cls.controller = ArmController(arm_parameters=arm_params)
+        for settings in cls.controller.joint_settings:
+            settings[Settings.SPEED_RAD_PER_S].value = 0.5
+            settings[Settings.ACCELERATION_RAD_PER_S2].value = 1.0
+
+    def approach_candidates(self) -> list:
+        """Approaches to a target through via poses at several heights and sides, with and without blending."""
+        kinematics = self.controller.kinematics
+        start = kinematics.angles_to_pose(self.START_ANGLES.tolist())
+        target = ArmPose(start.x + 200, start.y - 300, start.z - 100, start.roll, start.pitch, start.yaw)
+        candidates = []
+        for height in (0, 100, 200, 300):
+            for side in (-200, 0, 200):
+                via = ArmPose(start.x + 100, start.y - 150 + side, start.z + height, start.roll, start.pitch, start.yaw)
+                poses = np.vstack([linear_path(start, via, step_mm=20), linear_path(via, target, step_mm=20)])
+                for blend_radius in (0.0, 0.1):
+                    candidates.append(PlanCandidate(poses, cartesian=True, blend_radius=blend_radius))
+        # An unreachable detour and a joint candidate beyond the joint limits
+        far = ArmPose(10_000, 0, 0, 0, 0, 0)
+        candidates.append(PlanCandidate(np.vstack([linear_path(start, far), linear_path(far, target)]), cartesian=True))
+        candidates.append(PlanCandidate(np.array([[10.0, 0, 0, 0, 0, 0]])))
+        return candidates
+
+    def test_best_candidate(self) -> None:
+        candidates = self.approach_candidates()
+        with self.controller.create_planner(max_workers=0) as serial:
+            start_time = time.perf_counter()
+            expected = serial.evaluate(candidates, self.START_ANGLES)
+            serial_time = time.perf_counter() - start_time
+
+        self.assertFalse(expected[-2].valid)
+        self.assertFalse(expected[-1].valid)
+        self.assertEqual(expected[-1].reason, "Outside the joint limits")
+        self.assertTrue(math.isinf(expected[-1].duration))
+        self.assertGreater(sum(result.valid for result in expected), len(candidates) // 2)
+
+        with self.controller.create_planner(max_workers=2) as planner:
+            start_time = time.perf_counter()
+            results = planner.evaluate(candidates, self.START_ANGLES)
+            parallel_time = time.perf_counter() - start_time
+            best = planner.best(candidates, self.START_ANGLES)
+            self.assertIsNone(planner.best(candidates[-2:], self.START_ANGLES))
+            self.assertEqual(planner.evaluate([], self.START_ANGLES), [])
+
+        console.log(
+            f"Evaluated {len(candidates)} candidates in {serial_time * 1000:.0f}ms serially,"
+            f" {parallel_time * 1000:.0f}ms with 2 workers",
+            style="info",
+        )
+        self.assertEqual([result.index for result in results], list(range(len(candidates))))
+        for result, reference in zip(results, expected):
+            self.assertEqual(result.valid, reference.valid)
+            self.assertAlmostEqual(result.duration, reference.duration)
+
+        assert best is not None
+        self.assertEqual(best.duration, min(result.duration for result in expected))
+        self.assertGreater(best.blend_radius, 0)
+        assert best.angles is not None
+        end_pose = self.controller.kinematics.angles_to_pose(best.angles[-1].tolist())
+        self.assertTrue(np.allclose(end_pose.as_tuple, candidates[best.index].path[-1]))
@@ -0,0 +1,73 @@
+import time
+import unittest
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters
+from ribot.control.simulator import FirmwareParameters, simulate_program
+from ribot.controller import ArmController, Settings
+from ribot.tests import BENCHMARKS
+from ribot.utils.prints import console
+
+
+class TestSimulator(unittest.TestCase):
+    def parameters(self, speed: float = 1.0, steps_per_rev: float = 200.0, conversion: float = 1.0) -> FirmwareParameters:
+        return FirmwareParameters(np.full(6, speed), np.full(6, steps_per_rev), np.full(6, conversion))
+
+    def test_single_move(self) -> None:
+        # 1 rad/s at 200 steps per rev is 31 steps/s (32258us per step), 1 rad is 31 steps
+        # of which the last one is never waited for: 30 * 32258us, polled every 10ms plus the tick starting the next move
+        program = np.zeros((1, 6))
+        program[0, 2] = 1.0
+        result = simulate_program(program, np.zeros(6), self.parameters())
+        self.assertAlmostEqual(result.motion_times[0], 30 * 32258e-6)
+        self.assertAlmostEqual(result.move_times[0], 0.98)
+        self.assertAlmostEqual(result.cycle_times, 0.98)
+
+        # Timed moves stretch the step interval but never go faster than the configured speed
+        timed = simulate_program(program, np.zeros(6), self.parameters(), durations=[2.0])
+        self.assertAlmostEqual(timed.motion_times[0], 30 * 64516e-6)
+        fast = simulate_program(program, np.zeros(6), self.parameters(), durations=[0.1])
+        self.assertAlmostEqual(fast.motion_times[0], result.motion_times[0])
+
+        # A move to the current angles still takes two iterations of the message loop
+        self.assertAlmostEqual(simulate_program(np.zeros((1, 6)), np.zeros(6), self.parameters()).cycle_times, 0.02)
+
+    def test_queue(self) -> None:
+        program = np.array([[0.5, 0, 0, 0, 0, 0], [0.5, -0.5, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0]])
+        result = simulate_program(program, np.zeros(6), self.parameters(conversion=10))
+        self.assertTrue(np.allclose(result.end_times, np.cumsum(result.move_times)))
+        self.assertTrue(np.allclose(result.start_times[1:], result.end_times[:-1]))
+        # The last move brings back two joints at once, the slowest one decides
+        self.assertAlmostEqual(result.motion_times[2], result.motion_times[0])
+
+    def test_batched(self) -> None:
+        rng = np.random.default_rng(0)
+        programs = rng.uniform(-np.pi, np.pi, (1000, 50, 6))
+        start = np.zeros(6)
+        # Every program under 4 speed variants at once
+        speeds = np.array([0.25, 0.5, 1.0, 2.0])[:, None, None] * np.ones((1, 1, 6))
+        parameters = FirmwareParameters(speeds, np.full(6, 200.0), np.full(6, 10.0))
+
+        start_time = time.perf_counter()
+        result = simulate_program(programs, start, parameters)
+        elapsed = time.perf_counter() - start_time
+        console.log(f"Simulated {result.cycle_times.size} programs of 50 moves in {elapsed * 1000:.1f}ms", style="info")
+
+        self.assertEqual(result.move_times.shape, (4, 1000, 50))
+        if BENCHMARKS:
+            self.assertLess(elapsed, 1.0)
+        single = simulate_program(programs[7], start, FirmwareParameters(speeds[2, 0], np.full(6, 200.0), np.full(6, 10.0)))
+        self.assertTrue(np.allclose(result.move_times[2, 7], single.move_times))
+        # Faster joints always finish sooner
+        self.assertTrue(np.all(np.diff(result.cycle_times, axis=0) < 0))
+
+    def test_estimate_cycle_time(self) -> None:
+        controller = ArmController(arm_parameters=ArmParameters())
+        for settings in controller.joint_settings:
+            settings[Settings.SPEED_RAD_PER_S].value = 1.0
+            settings[Settings.STEPS_PER_REV_MOTOR_AXIS].value = 200
+            settings[Settings.CONVERSION_RATE_AXIS_JOINTS].value = 1
+        program = np.zeros((1, 6))
+        program[0, 2] = 1.0
+        self.assertAlmostEqual(controller.estimate_cycle_time(program).cycle_times, 0.98)
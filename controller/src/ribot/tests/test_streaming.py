@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+from collections import deque
+from typing import Deque, Iterator, List
+from unittest import mock
+
+from ribot.control.arm_kinematics import ArmParameters
+from ribot.controller import ArmController
+from ribot.utils.messages import Message, MessageOp
+from ribot.utils.prints import console
+
+
+class FakeFirmware:
+    """Consumes queued moves at a fixed rate and reports the queue size like the status stream does."""
+
+    def __init__(self, controller: ArmController, move_period: float, status_period: float) -> None:
+        self.controller = controller
+        self.move_period = move_period
+        self.status_period = status_period
+        self.queue: Deque[Message] = deque()
+        self.received: List[Message] = []
+        self.max_queue_size = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def send_messages(self, messages: List[Message], mutex: bool = False) -> None:
+        with self.lock:
+            self.queue.extend(messages)
+            self.received.extend(messages)
+            self.max_queue_size = max(self.max_queue_size, len(self.queue))
+
+    def status(self) -> None:
+        with self.lock:
+            queue_size = len(self.queue)
+        self.controller.handle_status_message(Message(MessageOp.STATUS, 1, [0.0] * 7 + [float(queue_size), 1.0]))
+
+    def run(self) -> None:
+        next_move = next_status = time.perf_counter()
+        while not self.done.is_set():
+            now = time.perf_counter()
+            if now >= next_move:
+                with self.lock:
+                    if self.queue:
+                        self.queue.popleft()
+                next_move += self.move_period
+            if now >= next_status:
+                self.status()
+                next_status += self.status_period
+            time.sleep(self.move_period / 4)
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self) -> None:
+        self.controller = ArmController(arm_parameters=ArmParameters())
+        self.controller.is_homed = True
+
+    def start_firmware(self, move_period: float = 0.001, status_period: float = 0.004) -> FakeFirmware:
+        firmware = FakeFirmware(self.controller, move_period, status_period)
+        patcher = mock.patch.object(self.controller.controller_server, "send_messages", side_effect=firmware.send_messages)
+        patcher.start()
+        firmware.thread.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(firmware.thread.join)
+        self.addCleanup(firmware.done.set)
+        return firmware
+
+    def test_stream(self) -> None:
+        firmware = self.start_firmware()
+        num_setpoints = 400
+        max_ahead = 0
+
+        def setpoints() -> Iterator[List[float]]:
+            nonlocal max_ahead
+            for idx in range(num_setpoints):
+                max_ahead = max(max_ahead, idx - len(firmware.received))
+                yield [idx / num_setpoints] * 6
+
+        self.assertTrue(self.controller.stream(setpoints(), high_water=16, low_water=4))
+        stats = self.controller.stream_stats
+        console.log(
+            f"Streamed {stats.sent} setpoints in {stats.refills} refills at {stats.throughput:.0f}/s,"
+            f" {stats.underruns} underruns",
+            style="info",
+        )
+        self.assertEqual(stats.sent, num_setpoints)
+        self.assertEqual(
+            [message.args[0] for message in firmware.received], [idx / num_setpoints for idx in range(num_setpoints)]
+        )
+        self.assertTrue(all(message.code == 1 for message in firmware.received))
+        # Bounded memory: the queue and the setpoints pulled ahead of it never exceed the high watermark
+        self.assertLessEqual(firmware.max_queue_size, 16)
+        self.assertLessEqual(max_ahead, 16)
+        self.assertGreater(stats.throughput, 0)
+
+    def test_underruns(self) -> None:
+        self.start_firmware()
+
+        def slow_setpoints() -> Iterator[List[float]]:
+            for idx in range(30):
+                if idx % 10 == 9:
+                    time.sleep(0.05)
+                yield [0.0] * 6 + [0.01]
+
+        self.assertTrue(self.controller.stream(slow_setpoints(), high_water=8, low_water=2))
+        self.assertEqual(self.controller.stream_stats.sent, 30)
+        self.assertGreater(self.controller.stream_stats.underruns, 0)
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            self.controller.stream([], high_water=4, low_water=4)
+        with self.assertRaises(ValueError):
+            self.controller.setpoint_message([0.0] * 3)
+        self.assertEqual(self.controller.setpoint_message([0.0] * 7).code, 15)
+
+        # No status stream
+        with mock.patch.object(self.controller.controller_server, "send_messages"):
+            self.controller.move_queue_size = 10
+            self.assertFalse(self.controller.stream([[0.0] * 6], low_water=2, timeout=0.05))
+        self.controller.is_homed = False
+        self.assertFalse(self.controller.stream([[0.0] * 6]))
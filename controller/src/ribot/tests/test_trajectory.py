@@ -0,0 +1,339 @@
+import time
+import unittest
+from typing import List
+from unittest import mock
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters, ArmPose
+from ribot.control.cartesian import linear_path
+from ribot.control.trajectory import (
+    SplineKind,
+    SplineTrajectory,
+    TimedTrajectory,
+    attach_tool_targets,
+    blend_corners,
+    point_to_point_duration,
+    time_optimal_parameterization,
+)
+from ribot.controller import ArmController, Settings
+from ribot.tests import expand_move_batch
+from ribot.utils.messages import MOVE_BATCH_CODE, Message
+from ribot.utils.prints import console, disable_console
+
+
+def expanded(messages: List[Message]) -> List[Message]:
+    """The moves the firmware queues for the messages, batched frames expanded."""
+    return [
+        move for message in messages for move in (expand_move_batch(message) if message.code == MOVE_BATCH_CODE else [message])
+    ]
+
+
+class TestTrajectory(unittest.TestCase):
+    controller: ArmController
+    SPEEDS = np.array([0.35, 0.2, 0.1, 0.1, 0.3, 0.4])
+    ACCELERATIONS = np.array([1.0, 1.0, 0.5, 0.5, 1.0, 1.0])
+    START_ANGLES = [0.1, 0.2, 0.1, 0.1, 0.3, 0.1]
+
+    @classmethod
+    @disable_console
+    def setUpClass(cls) -> None:
+        arm_params = ArmParameters()
+        arm_params.a1z = 650.0
+        arm_params.a2x = 400.0
+        arm_params.a2z = 680.0
+        arm_params.a3z = 1100.0
+        arm_params.a4z = 230.0
+        arm_params.a4x = 766.0
+        arm_params.a5x = 345.0
+        arm_params.a6x = 244.0
+        cls.controller = ArmController(arm_parameters=arm_params)
+
+    def linear_joint_path(self) -> np.ndarray:
+        kinematics = self.controller.kinematics
+        start = kinematics.angles_to_pose(self.START_ANGLES)
+        end = ArmPose(start.x + 300, start.y - 200, start.z + 150, start.roll, start.pitch + 0.3, start.yaw)
+        angles, reachable = kinematics.pose_to_angles_batch(linear_path(start, end, step_mm=5), np.array(self.START_ANGLES))
+        self.assertTrue(reachable.all())
+        return np.vstack([self.START_ANGLES, angles])
+
+    def assert_within_limits(self, trajectory: TimedTrajectory, tolerance: float = 1e-6) -> None:
+        durations = trajectory.segment_durations
+        self.assertTrue(np.all(durations > 0))
+        velocities = np.diff(trajectory.positions, axis=0) / durations[:, None]
+        accelerations = np.diff(velocities, axis=0) / ((durations[1:] + durations[:-1]) / 2)[:, None]
+        self.assertTrue(np.all(np.abs(velocities) <= self.SPEEDS * (1 + tolerance)))
+        self.assertTrue(np.all(np.abs(accelerations) <= self.ACCELERATIONS * (1 + tolerance)))
+
+    def test_single_segment(self) -> None:
+        # Joint 0 limits the move: 1 rad at 0.35 rad/s and 1 rad/s², trapezoidal profile
+        path = np.array([[0, 0, 0, 0, 0, 0], [1.0, 0.2, 0.05, 0, 0, 0]])
+        expected = 1.0 / 0.35 + 0.35 / 1.0
+        self.assertAlmostEqual(point_to_point_duration(path, self.SPEEDS, self.ACCELERATIONS), expected)
+
+        trajectory = time_optimal_parameterization(path, self.SPEEDS, self.ACCELERATIONS, resolution=0.001)
+        self.assertAlmostEqual(trajectory.duration, expected, delta=0.01)
+        self.assertTrue(np.allclose(trajectory.positions[[0, -1]], path))
+        self.assertTrue(np.allclose(trajectory.velocities[[0, -1]], 0))
+        self.assertLessEqual(np.linalg.norm(np.diff(trajectory.positions, axis=0), axis=1).max(), 0.001 + 1e-12)
+        self.assert_within_limits(trajectory)
+
+        # Repeated and single waypoints
+        repeated = time_optimal_parameterization(path[[0, 0, 1, 1]], self.SPEEDS, self.ACCELERATIONS)
+        self.assertAlmostEqual(repeated.duration, time_optimal_parameterization(path, self.SPEEDS, self.ACCELERATIONS).duration)
+        self.assertEqual(time_optimal_parameterization(path[:1], self.SPEEDS, self.ACCELERATIONS).duration, 0)
+        with self.assertRaises(ValueError):
+            time_optimal_parameterization(path, self.SPEEDS, -self.ACCELERATIONS)
+
+    def test_cycle_time_benchmark(self) -> None:
+        path = self.linear_joint_path()
+
+        start_time = time.perf_counter()
+        trajectory = time_optimal_parameterization(path, self.SPEEDS, self.ACCELERATIONS)
+        planning_time = time.perf_counter() - start_time
+        naive = point_to_point_duration(path, self.SPEEDS, self.ACCELERATIONS)
+
+        console.log(
+            f"Linear move through {len(path)} waypoints: point to point {naive:.2f}s, time optimal"
+            f" {trajectory.duration:.2f}s ({naive / trajectory.duration:.1f}x), planned in {planning_time * 1000:.1f}ms",
+            style="info",
+        )
+        self.assertLess(trajectory.duration * 2, naive)
+        self.assert_within_limits(trajectory)
+
+    def test_execute_trajectory(self) -> None:
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = list(self.START_ANGLES)
+        for joint_idx, (speed, acceleration) in enumerate(zip(self.SPEEDS, self.ACCELERATIONS)):
+            controller.joint_settings[joint_idx][Settings.SPEED_RAD_PER_S].value = speed
+            controller.joint_settings[joint_idx][Settings.ACCELERATION_RAD_PER_S2].value = acceleration
+
+        path = self.linear_joint_path()
+        trajectory = controller.plan_joint_path(path[1:])
+        self.assertTrue(np.allclose(trajectory.positions[-1], path[-1]))
+
+        with mock.patch.object(controller.controller_server, "send_messages") as send_messages:
+            self.assertFalse(controller.execute_trajectory(trajectory))
+            controller.is_homed = True
+            self.assertTrue(controller.move_joints_through(path[1:]))
+            frames = send_messages.call_args.args[0]
+            messages = expanded(frames)
+            self.assertTrue(all(frame.code == MOVE_BATCH_CODE and frame.encoded_size <= 1024 for frame in frames))
+            self.assertLess(len(frames), len(messages))
+            self.assertEqual(len(messages), len(trajectory.times) - 1)
+            self.assertEqual(controller.move_queue_size, len(messages))
+            self.assertTrue(all(message.code == 15 and message.num_args == 7 for message in messages))
+            self.assertAlmostEqual(sum(message.args[-1] for message in messages), trajectory.duration)
+
+            # One frame per move for firmware without batches
+            controller.batch_moves = False
+            self.assertTrue(controller.move_joints_through(path[1:]))
+            unbatched = send_messages.call_args.args[0]
+            self.assertEqual([message.args for message in unbatched], [message.args for message in messages])
+
+    def pick_and_place_program(self) -> tuple:
+        """Joint waypoints of two pick and place cycles and the blend radius of each, zero where the pose must be exact."""
+        pick = np.array([0.6, 0.5, 0.3, 0.0, 0.4, 0.0])
+        place = np.array([-0.5, 0.4, 0.2, 0.1, 0.5, 0.3])
+        lift = np.array([0.0, -0.15, -0.1, 0.0, 0.0, 0.0])
+        via = np.array([0.05, 0.1, 0.0, 0.05, 0.45, 0.15])
+        cycle = [pick + lift, pick, pick + lift, via, place + lift, place, place + lift, via]
+        radii = [0.1, 0.0, 0.1, 0.2, 0.1, 0.0, 0.1, 0.2]
+        return np.array([self.START_ANGLES, *cycle, *cycle]), np.array([0.0, *radii, *radii[:-1], 0.0])
+
+    def test_blend_corners(self) -> None:
+        path = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [2.0, 1.0]])
+        blended = blend_corners(path, [0, 0.2, 0, 0])
+        self.assertTrue(np.allclose(blended[[0, -1]], path[[0, -1]]))
+        self.assertTrue(any(np.allclose(point, path[2]) for point in blended))
+        self.assertFalse(any(np.allclose(point, path[1]) for point in blended))
+        # The blend starts and ends on the original segments and stays close to the corner
+        near_corner = np.linalg.norm(blended - path[1], axis=1) <= 0.2 + 1e-9
+        self.assertTrue(np.allclose(blended[near_corner][[0, -1]], [[0.8, 0.0], [1.0, 0.2]]))
+        self.assertLessEqual(np.linalg.norm(np.diff(blended[near_corner], axis=0), axis=1).max(), 0.01 + 1e-9)
+
+        # Radii are capped to half of the adjacent segments
+        capped = blend_corners(path, 5.0)
+        self.assertTrue(np.allclose(capped[1], [0.5, 0.0]))
+        self.assertTrue(np.array_equal(blend_corners(path, 0), path))
+        with self.assertRaises(ValueError):
+            blend_corners(path, -1)
+
+    def test_blend_benchmark(self) -> None:
+        program, radii = self.pick_and_place_program()
+        stopping = point_to_point_duration(program, self.SPEEDS, self.ACCELERATIONS)
+        sharp = time_optimal_parameterization(program, self.SPEEDS, self.ACCELERATIONS)
+        blended = time_optimal_parameterization(blend_corners(program, radii), self.SPEEDS, self.ACCELERATIONS)
+
+        console.log(
+            f"Pick and place through {len(program)} waypoints: queued moves {stopping:.2f}s, sharp corners"
+            f" {sharp.duration:.2f}s, blended {blended.duration:.2f}s ({stopping / blended.duration:.2f}x)",
+            style="info",
+        )
+        # Only the approach and via corners are blended, the arm still stops at every pick and place
+        self.assertLess(blended.duration, sharp.duration * 0.95)
+        self.assertLess(blended.duration, stopping * 0.9)
+        # Pick and place poses are still hit exactly
+        for exact in program[radii == 0]:
+            self.assertAlmostEqual(np.linalg.norm(blended.positions - exact, axis=1).min(), 0)
+
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = list(self.START_ANGLES)
+        for joint_idx, (speed, acceleration) in enumerate(zip(self.SPEEDS, self.ACCELERATIONS)):
+            controller.joint_settings[joint_idx][Settings.SPEED_RAD_PER_S].value = speed
+            controller.joint_settings[joint_idx][Settings.ACCELERATION_RAD_PER_S2].value = acceleration
+        planned = controller.plan_joint_path(program[1:], radii[1:])
+        self.assertAlmostEqual(planned.duration, blended.duration)
+
+    def limited_controller(self) -> ArmController:
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = list(self.START_ANGLES)
+        for joint_idx, (speed, acceleration) in enumerate(zip(self.SPEEDS, self.ACCELERATIONS)):
+            controller.joint_settings[joint_idx][Settings.SPEED_RAD_PER_S].value = speed
+            controller.joint_settings[joint_idx][Settings.ACCELERATION_RAD_PER_S2].value = acceleration
+        return controller
+
+    def test_tool_targets(self) -> None:
+        path = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 0.0], [1.0, 0.0]])
+        trajectory = time_optimal_parameterization(path, [1.0, 1.0], [2.0, 2.0])
+        # The path comes back to its waypoints, each target goes to its own pass
+        with_tool = attach_tool_targets(trajectory, path[1:], [0.5, np.nan, 1.5])
+        tool_values = with_tool.tool_values
+        assert tool_values is not None
+        scheduled = np.flatnonzero(~np.isnan(tool_values))
+        self.assertEqual(len(scheduled), 2)
+        self.assertTrue(np.allclose(trajectory.positions[scheduled], [[1.0, 0.0], [1.0, 0.0]]))
+        self.assertTrue(np.allclose(tool_values[scheduled], [0.5, 1.5]))
+        self.assertEqual(scheduled[-1], len(tool_values) - 1)
+        self.assertIsNone(trajectory.tool_values)
+        with self.assertRaises(ValueError):
+            attach_tool_targets(trajectory, path[1:], [0.5])
+        with self.assertRaises(ValueError):
+            attach_tool_targets(trajectory, np.array([[5.0, 5.0]]), [0.5])
+
+        controller = self.limited_controller()
+        program, radii = self.pick_and_place_program()
+        tool_targets = np.full(len(program) - 1, np.nan)
+        tool_targets[[1, 5, 9, 13]] = [0.0, 1.0, 0.0, 1.0]
+        planned = controller.plan_joint_path(program[1:], radii[1:], tool_targets)
+        messages = expanded(controller.trajectory_messages(planned))
+        with_tool_messages = [message for message in messages if message.code == 17]
+        self.assertEqual([message.args[-1] for message in with_tool_messages], [0.0, 1.0, 0.0, 1.0])
+        self.assertTrue(all(message.num_args == 8 for message in with_tool_messages))
+        self.assertEqual(len(messages), len(planned.times) - 1)
+        self.assertEqual(controller.setpoint_message([0.0] * 8).code, 17)
+
+        # A target at the last waypoint has no move to ride on
+        ending = controller.plan_joint_path(program[1:3], tool_targets=[np.nan, 0.0])
+        self.assertEqual(controller.trajectory_messages(ending)[-1].code, 7)
+
+    def test_tool_benchmark(self) -> None:
+        controller = self.limited_controller()
+        program, radii = self.pick_and_place_program()
+        tool_speed = 1.0  # rad/s of the gripper
+        tool_indices = np.array([2, 6, 10, 14])  # picks close and places open the gripper
+        tool_values = np.array([0.0, 1.0, 0.0, 1.0])
+        tool_time = np.abs(np.diff(np.concatenate([[1.0], tool_values]))) / tool_speed
+
+        # Queued tool moves: the arm stops at every tool waypoint until the gripper is done
+        separate = 0.0
+        for start, end in zip([0, *tool_indices], [*tool_indices, len(program) - 1]):
+            segment_radii = radii[start : end + 1].copy()
+            segment_radii[[0, -1]] = 0.0
+            path = blend_corners(program[start : end + 1], segment_radii)
+            separate += time_optimal_parameterization(path, self.SPEEDS, self.ACCELERATIONS).duration
+        separate += tool_time.sum()
+
+        # Inline tool targets: the gripper moves while the arm leaves the pick and place poses
+        tool_targets = np.full(len(program) - 1, np.nan)
+        tool_targets[tool_indices - 1] = tool_values
+        inline = controller.plan_joint_path(program[1:], radii[1:], tool_targets)
+        assert inline.tool_values is not None
+        scheduled = inline.times[~np.isnan(inline.tool_values)]
+        # The gripper reaches every target before the next one is commanded
+        self.assertTrue(np.all(np.diff(scheduled) >= tool_time[1:]))
+
+        console.log(
+            f"Pick and place with {len(tool_indices)} gripper actions: queued tool moves {separate:.2f}s,"
+            f" inline tool targets {inline.duration:.2f}s ({separate / inline.duration:.2f}x)",
+            style="info",
+        )
+        self.assertLess(inline.duration, separate - 0.9 * tool_time.sum())
+
+    def test_spline_fit(self) -> None:
+        waypoints = np.array([[0, 0, 0], [0.5, -0.2, 1.0], [0.7, 0.3, 1.5], [0.2, 0.3, 2.0]])
+        times = np.array([0, 1.0, 1.5, 3.0])
+        for kind in SplineKind:
+            spline = SplineTrajectory.fit(waypoints, times, kind)
+            self.assertEqual(spline.coefficients.shape, (3, kind.value + 1, 3))
+            self.assertTrue(np.allclose(spline.evaluate(times), waypoints))
+            self.assertTrue(np.allclose(spline.evaluate([0, 3.0], 1), 0))
+            # Position, velocity and acceleration are continuous at the interior knots
+            for derivative in range(3):
+                before = spline.evaluate(times[1:-1] - 1e-9, derivative)
+                after = spline.evaluate(times[1:-1] + 1e-9, derivative)
+                self.assertTrue(np.allclose(before, after, atol=1e-5))
+
+        quintic = SplineTrajectory.fit(waypoints, times, SplineKind.QUINTIC)
+        self.assertTrue(np.allclose(quintic.evaluate([0, 3.0], 2), 0))
+        with self.assertRaises(ValueError):
+            SplineTrajectory.fit(waypoints, times[::-1])
+
+        path = self.linear_joint_path()[::10]
+        limited = SplineTrajectory.fit_within_limits(path, self.SPEEDS, self.ACCELERATIONS)
+        t = np.linspace(0, limited.duration, 2000)
+        self.assertTrue(np.all(np.abs(limited.evaluate(t, 1)) <= self.SPEEDS * 1.01))
+        self.assertTrue(np.all(np.abs(limited.evaluate(t, 2)) <= self.ACCELERATIONS * 1.01))
+
+    def test_spline_sampling(self) -> None:
+        spline = SplineTrajectory.fit(np.array([[0.0, 1.0], [1.0, 0.0], [2.0, 1.0]]), [0, 0.5, 1.05])
+        samples = spline.sample(20)
+        first_time, first_position = next(samples)
+        self.assertEqual(first_time, 0)
+        self.assertTrue(np.allclose(first_position, [0, 1]))
+        times = [first_time] + [sample_time for sample_time, _ in samples]
+        self.assertTrue(np.allclose(np.diff(times)[:-1], 0.05))
+        self.assertAlmostEqual(times[-1], 1.05)
+
+        chunks = list(spline.sample_chunks(20, chunk_size=7))
+        self.assertTrue(all(len(chunk_times) <= 7 for chunk_times, _ in chunks))
+        self.assertTrue(np.allclose(np.concatenate([chunk_times for chunk_times, _ in chunks]), times))
+        self.assertTrue(np.allclose(chunks[-1][1][-1], [2, 1]))
+
+        # 7.5 sample periods: the grid fills exactly two chunks of 4, the off grid end needs one more sample
+        spline = SplineTrajectory.fit(np.array([[0.0], [1.0]]), [0, 0.75])
+        chunks = list(spline.sample_chunks(10, chunk_size=4))
+        chunk_times = np.concatenate([times for times, _ in chunks])
+        self.assertEqual([len(times) for times, _ in chunks], [4, 4, 1])
+        self.assertTrue(np.all(np.diff(chunk_times) > 0))
+        self.assertAlmostEqual(chunk_times[-1], 0.75)
+
+    def test_execute_spline(self) -> None:
+        controller = ArmController(arm_parameters=self.controller.arm_params)
+        controller.current_angles = list(self.START_ANGLES)
+        path = self.linear_joint_path()[::10]
+        spline = SplineTrajectory.fit_within_limits(path, self.SPEEDS, self.ACCELERATIONS, SplineKind.QUINTIC)
+
+        with mock.patch.object(controller.controller_server, "send_messages") as send_messages:
+            self.assertFalse(controller.execute_spline(spline))
+            controller.is_homed = True
+            self.assertTrue(controller.execute_spline(spline, rate_hz=50))
+            messages = expanded([message for call in send_messages.call_args_list for message in call.args[0]])
+            self.assertEqual(controller.move_queue_size, len(messages))
+            self.assertTrue(all(message.code == 15 and message.num_args == 7 for message in messages))
+            self.assertAlmostEqual(sum(message.args[-1] for message in messages), spline.duration)
+            self.assertTrue(np.allclose(messages[-1].args[:6], path[-1]))
+
+            # Cartesian spline through the poses of the same waypoints
+            send_messages.reset_mock()
+            poses = controller.kinematics.angles_to_pose_batch(path)
+            poses[:, 3:] = np.unwrap(poses[:, 3:], axis=0)
+            cartesian = SplineTrajectory.fit(poses, spline.knots)
+            self.assertTrue(controller.execute_spline(cartesian, rate_hz=50, cartesian=True))
+            messages = expanded([message for call in send_messages.call_args_list for message in call.args[0]])
+            end_pose = controller.kinematics.angles_to_pose(messages[-1].args[:6])
+            self.assertTrue(np.allclose(end_pose.as_tuple[:3], poses[-1, :3], atol=1e-3))
+
+            send_messages.reset_mock()
+            unreachable = SplineTrajectory.fit(np.array([poses[0], [10_000, 0, 0, 0, 0, 0]]), [0, 1.0])
+            self.assertFalse(controller.execute_spline(unreachable, cartesian=True))
@@ -0,0 +1,116 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters
+from ribot.control.trajectory import SplineTrajectory
+from ribot.controller import ArmController
+from ribot.utils.messages import (
+    MAX_FRAME_ARGS,
+    Message,
+    MessageOp,
+    PayloadMessage,
+    move_batch_messages,
+)
+from ribot.utils.prints import console
+from ribot.utils.waypoint_codec import (
+    COMPACT_BATCH_CODE,
+    CONSTANT_DURATION,
+    DELTA,
+    HEADER,
+    WIDTH_MASK,
+    LinkFeature,
+    compact_batch_messages,
+    decode_compact_batch,
+)
+
+
+class TestWaypointCodec(unittest.TestCase):
+    def dense_setpoints(self, num_waypoints: int = 500, rate_hz: float = 100.0) -> np.ndarray:
+        """A smooth joint trajectory sampled at `rate_hz`, the kind of dense stream the compact batches are for."""
+        rng = np.random.default_rng(0)
+        knots = np.linspace(-np.pi / 2, np.pi / 2, 6)[:, None] * rng.uniform(0.3, 1.0, (1, 6))
+        spline = SplineTrajectory.fit(knots, np.linspace(0, num_waypoints / rate_hz, 6))
+        times = np.arange(1, num_waypoints + 1) / rate_hz
+        return np.hstack([spline.evaluate(times), np.full((num_waypoints, 1), 1 / rate_hz)])
+
+    def decode(self, messages: list) -> np.ndarray:
+        self.assertTrue(all(isinstance(message, PayloadMessage) for message in messages))
+        # From the wire bytes, as the firmware reads them after the headers
+        return np.vstack([decode_compact_batch(message.encode()[Message.LENGTH_HEADERS :]) for message in messages])
+
+    def test_round_trip(self) -> None:
+        rng = np.random.default_rng(1)
+        setpoints = self.dense_setpoints()
+        uneven = setpoints.copy()
+        uneven[:, 6] = rng.uniform(0.005, 0.05, len(uneven))
+        with_tool = np.hstack([uneven, np.full((len(uneven), 1), np.nan)])
+        with_tool[[10, 300], 7] = [0.4, -1.5]
+        jumpy = np.hstack([rng.uniform(-3, 3, (50, 6)), np.full((50, 1), 0.1)])
+
+        for rows in [setpoints, uneven, with_tool, jumpy]:
+            for delta in [True, False]:
+                for max_error in [1e-5, 1e-4, 1e-3]:
+                    messages = compact_batch_messages(rows, delta=delta, max_error=max_error)
+                    self.assertTrue(all(message.code == COMPACT_BATCH_CODE for message in messages))
+                    self.assertTrue(all(message.num_args <= MAX_FRAME_ARGS for message in messages))
+                    decoded = self.decode(messages)
+                    self.assertEqual(decoded.shape, rows.shape)
+                    self.assertLessEqual(np.abs(decoded[:, :6] - rows[:, :6]).max(), max_error * (1 + 1e-3) + 1e-6)
+                    self.assertTrue(np.allclose(decoded[:, 6], rows[:, 6], rtol=1e-4, atol=1e-6))
+                    if rows.shape[1] == 8:
+                        self.assertTrue(np.array_equal(np.isnan(decoded[:, 7]), np.isnan(rows[:, 7])))
+                        self.assertTrue(np.allclose(decoded[[10, 300], 7], [0.4, -1.5], atol=1e-4))
+
+        flags = [HEADER.unpack_from(message.encode(), Message.LENGTH_HEADERS)[2] for message in compact_batch_messages(setpoints)]
+        self.assertTrue(all(flag & DELTA and flag & CONSTANT_DURATION for flag in flags))
+        self.assertEqual({flag & WIDTH_MASK for flag in flags}, {0})  # deltas of a dense stream fit in a byte
+        self.assertEqual(compact_batch_messages(np.zeros((0, 7))), [])
+        with self.assertRaises(ValueError):
+            compact_batch_messages(np.zeros((3, 6)))
+
+    def test_link_budget(self) -> None:
+        setpoints = self.dense_setpoints(2000)
+        per_waypoint = len(setpoints) * Message(MessageOp.MOVE, 15, [0.0] * 7).encoded_size
+        batched = sum(message.encoded_size for message in move_batch_messages(setpoints))
+        compact = sum(message.encoded_size for message in compact_batch_messages(setpoints))
+        absolute = sum(message.encoded_size for message in compact_batch_messages(setpoints, delta=False))
+        console.log(
+            f"{len(setpoints)} waypoints at 100Hz: {per_waypoint / len(setpoints):.1f} bytes/waypoint one frame each,"
+            f" {batched / len(setpoints):.1f} float batches, {absolute / len(setpoints):.1f} fixed point,"
+            f" {compact / len(setpoints):.1f} fixed point deltas ({per_waypoint / compact:.1f}x more waypoints per byte)",
+            style="info",
+        )
+        self.assertGreaterEqual(per_waypoint / compact, 5)
+        self.assertGreaterEqual(batched / compact, 4)
+        self.assertLess(compact, absolute)
+
+    def test_negotiation(self) -> None:
+        controller = ArmController(arm_parameters=ArmParameters())
+        controller.is_homed = True
+        setpoints = self.dense_setpoints(300)
+        with mock.patch.object(controller.controller_server, "send_message") as send_message:
+            controller.configure()
+            request = send_message.call_args.args[0]
+            self.assertEqual((request.op, request.code), (MessageOp.CONFIG, 41))
+
+        with mock.patch.object(controller.controller_server, "send_messages") as send_messages:
+            # Float batches until the firmware reports the compact ones
+            controller.execute_spline(SplineTrajectory.fit(setpoints[[0, -1], :6], [0, 1.0]), rate_hz=100)
+            self.assertTrue(all(message.code == 19 for message in send_messages.call_args.args[0]))
+
+            controller.handle_config_message(Message(MessageOp.CONFIG, 42, [3.0]))
+            self.assertEqual(controller.link_features, LinkFeature.MOVE_BATCH | LinkFeature.COMPACT_MOVE_BATCH)
+            controller.move_queue_size = 0
+            messages = controller.timed_move_messages(setpoints)
+            self.assertTrue(all(message.code == COMPACT_BATCH_CODE for message in messages))
+            self.assertEqual(controller.count_moves(messages), len(setpoints))
+            self.assertTrue(controller.execute_spline(SplineTrajectory.fit(setpoints[[0, -1], :6], [0, 1.0]), rate_hz=100))
+            sent = send_messages.call_args.args[0]
+            self.assertTrue(all(message.code == COMPACT_BATCH_CODE for message in sent))
+            self.assertEqual(controller.move_queue_size, controller.count_moves(sent))
+            self.assertGreaterEqual(controller.move_queue_size, 100)
+
+            controller.compact_moves = False
+            self.assertTrue(all(message.code == 19 for message in controller.timed_move_messages(setpoints)))
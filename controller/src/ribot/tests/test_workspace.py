@@ -0,0 +1,132 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from ribot.control.arm_kinematics import ArmParameters, ArmPose
+from ribot.control.workspace import ReachabilityIndex
+from ribot.controller import ArmController
+from ribot.utils.prints import console, disable_console
+
+
+class TestReachabilityIndex(unittest.TestCase):
+    controller: ArmController
+    index: ReachabilityIndex
+
+    @classmethod
+    @disable_console
+    def setUpClass(cls) -> None:
+        arm_params = ArmParameters()
+        arm_params.a1z = 650.0
+        arm_params.a2x = 400.0
+        arm_params.a2z = 680.0
+        arm_params.a3z = 1100.0
+        arm_params.a4z = 230.0
+        arm_params.a4x = 766.0
+        arm_params.a5x = 345.0
+        arm_params.a6x = 244.0
+        cls.controller = ArmController(arm_parameters=arm_params)
+        cls.index = ReachabilityIndex.build(
+            cls.controller.kinematics, voxels_per_axis=32, orientation_bins=(8, 4), num_samples=400_000, margin=2, seed=0
+        )
+
+    def test_reachable_poses(self) -> None:
+        kinematics = self.controller.kinematics
+        model = kinematics.model
+        angles = np.random.uniform(model.lower, model.upper, (2000, model.num_joints))
+        poses = kinematics.angles_to_pose_batch(angles)
+        self.assertTrue(self.index.maybe_reachable_batch(poses).all())
+        self.assertTrue(self.index.maybe_reachable(ArmPose(*poses[0])))
+
+        far = np.array([[10_000, 0, 0, 0, 0, 0], [0, 0, -5_000, 0, 0, 0]], dtype=float)
+        self.assertFalse(self.index.maybe_reachable_batch(far).any())
+
+        # Most random poses inside the enclosing cube are rejected without IK
+        reach = -self.index.origin[0]
+        random_poses = np.column_stack([np.random.uniform(-reach, reach, (2000, 3)), np.random.uniform(-np.pi, np.pi, (2000, 3))])
+        maybe = self.index.maybe_reachable_batch(random_poses)
+        _, reachable = kinematics.pose_to_angles_batch(random_poses, enforce_limits=True)
+        self.assertFalse((reachable & ~maybe).any())
+        self.assertLess(maybe.mean(), 0.5)
+
+        region = self.index.reachable_region()
+        self.assertEqual(region.shape[1], 3)
+        self.assertGreater(len(region), 0)
+
+    def test_persistence(self) -> None:
+        kinematics = self.controller.kinematics
+        with tempfile.TemporaryDirectory() as directory:
+            file = Path(directory) / "reachability.bin"
+            self.index.save(file)
+            loaded = ReachabilityIndex.load(file)
+            self.assertIsInstance(loaded.bits, np.memmap)
+            self.assertTrue(np.array_equal(loaded.bits, self.index.bits))
+            self.assertEqual(loaded.shape, self.index.shape)
+            self.assertTrue(loaded.matches(kinematics))
+
+            poses = kinematics.angles_to_pose_batch(np.random.uniform(-1, 1, (100, 6)))
+            self.assertTrue(np.array_equal(loaded.maybe_reachable_batch(poses), self.index.maybe_reachable_batch(poses)))
+
+            start_time = time.perf_counter()
+            self.assertTrue(ReachabilityIndex.load_or_build(kinematics, file).matches(kinematics))
+            console.log(f"Reachability index loaded in {time.perf_counter() - start_time:.4f}s", style="info")
+
+            # Other arm parameters invalidate the persisted index
+            arm_params = ArmParameters()
+            for attribute, value in vars(self.controller.arm_params).items():
+                if attribute.startswith("a"):
+                    setattr(arm_params, attribute, value)
+            arm_params.a3z = 900.0
+            other = ArmController(arm_parameters=arm_params)
+            self.assertFalse(loaded.matches(other.kinematics))
+            rebuilt = ReachabilityIndex.load_or_build(other.kinematics, file, voxels_per_axis=16, num_samples=10_000)
+            self.assertTrue(rebuilt.matches(other.kinematics))
+            self.assertTrue(ReachabilityIndex.load(file).matches(other.kinematics))
+            # The file is replaced, not truncated under the index still mapping it
+            self.assertTrue(np.array_equal(loaded.bits, self.index.bits))
+            self.assertEqual([path.name for path in Path(directory).iterdir()], ["reachability.bin"])
+
+    def test_valid_pose(self) -> None:
+        controller = self.controller
+        with tempfile.TemporaryDirectory() as directory:
+            controller.use_reachability_index(Path(directory) / "reachability.bin")
+            try:
+                # Built when configured, not inside the first request
+                self.assertIsNotNone(controller._reachability)
+                self.assertFalse(controller.valid_pose(ArmPose(10_000, 0, 0, 0, 0, 0)))
+                pose = controller.kinematics.angles_to_pose([0.1, 0.2, 0.1, 0.1, 0.3, 0.1])
+                self.assertTrue(controller.valid_pose(pose))
+
+                # A reachable pose in a cell the sampling missed is still valid
+                sparse = ReachabilityIndex.build(controller.kinematics, voxels_per_axis=32, num_samples=10, margin=0, seed=0)
+                self.assertFalse(sparse.maybe_reachable(pose))
+                controller._reachability = sparse
+                self.assertTrue(controller.valid_pose(pose))
+                self.assertTrue(sparse.beyond_reach(ArmPose(10_000, 0, 0, 0, 0, 0)))
+            finally:
+                controller.reachability_file = None
+                controller._reachability = None
+
+    def test_unconfigured_arm(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            file = Path(directory) / "reachability.bin"
+            controller = ArmController(arm_parameters=ArmParameters())
+            # Deferred until the arm parameters are configured, an index of an arm without links is useless
+            controller.use_reachability_index(file)
+            self.assertIsNone(controller._reachability)
+            self.assertIsNone(controller.reachability)
+            self.assertIsNone(controller._reachability_thread)
+
+            ReachabilityIndex.load_or_build(controller.kinematics, file, voxels_per_axis=4, num_samples=10)
+            self.assertFalse(file.exists())
+
+            for attribute, value in vars(self.controller.arm_params).items():
+                if attribute.startswith("a"):
+                    setattr(controller.arm_params, attribute, value)
+            self.index.save(file)
+            self.assertIsNone(controller.reachability)  # loading in the background
+            assert controller._reachability_thread is not None
+            controller._reachability_thread.join()
+            self.assertIsNotNone(controller.reachability)
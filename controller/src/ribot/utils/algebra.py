@@ -63,6 +63,80 @@ def z_rotation_matrix(angle: float) -> np.ndarray:
     return r
 
 
+def x_rotation_matrices(angles: np.ndarray) -> np.ndarray:
+    """Creates a stack of rotation matrices about the X axis.
+
+    Args:
+        angles (np.ndarray): 1D array of N angles in radians
+
+    Returns:
+        np.ndarray: Nx3x3 array of rotation matrices
+    """
+    c, s = np.cos(angles), np.sin(angles)
+    r = np.zeros((len(angles), 3, 3))
+    r[:, 0, 0] = 1
+    r[:, 1, 1] = c
+    r[:, 1, 2] = -s
+    r[:, 2, 1] = s
+    r[:, 2, 2] = c
+    return r
+
+
+def y_rotation_matrices(angles: np.ndarray) -> np.ndarray:
+    """Creates a stack of rotation matrices about the Y axis.
+
+    Args:
+        angles (np.ndarray): 1D array of N angles in radians
+
+    Returns:
+        np.ndarray: Nx3x3 array of rotation matrices
+    """
+    c, s = np.cos(angles), np.sin(angles)
+    r = np.zeros((len(angles), 3, 3))
+    r[:, 0, 0] = c
+    r[:, 0, 2] = s
+    r[:, 1, 1] = 1
+    r[:, 2, 0] = -s
+    r[:, 2, 2] = c
+    return r
+
+
+def z_rotation_matrices(angles: np.ndarray) -> np.ndarray:
+    """Creates a stack of rotation matrices about the Z axis.
+
+    Args:
+        angles (np.ndarray): 1D array of N angles in radians
+
+    Returns:
+        np.ndarray: Nx3x3 array of rotation matrices
+    """
+    c, s = np.cos(angles), np.sin(angles)
+    r = np.zeros((len(angles), 3, 3))
+    r[:, 0, 0] = c
+    r[:, 0, 1] = -s
+    r[:, 1, 0] = s
+    r[:, 1, 1] = c
+    r[:, 2, 2] = 1
+    return r
+
+
+def transformation_matrices(R: np.ndarray, D: np.ndarray) -> np.ndarray:
+    """Create a stack of 4x4 homogeneous transformation matrices.
+
+    Args:
+        R (np.ndarray): Nx3x3 array of rotation matrices.
+        D (np.ndarray): Translation shared by every matrix (size 3) or one per matrix (Nx3).
+
+    Returns:
+        np.ndarray: Nx4x4 array of homogeneous transformation matrices.
+    """
+    T = np.zeros((R.shape[0], 4, 4))
+    T[:, :3, :3] = R
+    T[:, :3, 3] = D
+    T[:, 3, 3] = 1
+    return T
+
+
 def transformation_matrix(R: np.ndarray, D: np.ndarray) -> np.ndarray:
     """Create a 4x4 homogeneous transformation matrix from a 3x3 rotation matrix and a 3D
     translation vector.
@@ -120,6 +194,36 @@ def extract_euler_angles(R: np.ndarray) -> list[float]:
         return [float(roll), float(pitch), float(yaw)]
 
 
+def extract_euler_angles_batch(R: np.ndarray) -> np.ndarray:
+    """Vectorized version of `extract_euler_angles` over a stack of rotation matrices.
+
+    Args:
+        R (np.ndarray): Nx3x3 array of rotation matrices.
+
+    Returns:
+        np.ndarray: Nx3 array with the (roll, pitch, yaw) of each matrix in radians.
+
+    Raises:
+        ValueError: If `R` is not a Nx3x3 array.
+    """
+    if R.ndim != 3 or R.shape[1:] != (3, 3):
+        raise ValueError("R must be a Nx3x3 array.")
+
+    r20 = R[:, 2, 0]
+    gimbal_down = r20 == -1
+    gimbal_up = r20 == 1
+
+    roll = np.arctan2(R[:, 2, 1], R[:, 2, 2])
+    pitch = -np.arcsin(np.clip(r20, -1, 1))
+    yaw = np.arctan2(R[:, 1, 0], R[:, 0, 0])
+
+    roll = np.where(gimbal_down, np.arctan2(R[:, 0, 1], R[:, 0, 2]), roll)
+    roll = np.where(gimbal_up, np.arctan2(-R[:, 0, 1], -R[:, 0, 2]), roll)
+    yaw = np.where(gimbal_down | gimbal_up, 0.0, yaw)
+
+    return np.stack([roll, pitch, yaw], axis=1)
+
+
 def create_rotation_matrix_from_euler_angles(roll: float, pitch: float, yaw: float) -> np.ndarray:
     """Create a 3x3 rotation matrix from three Euler angles (roll, pitch, yaw).
 
@@ -134,6 +238,130 @@ def create_rotation_matrix_from_euler_angles(roll: float, pitch: float, yaw: flo
     return z_rotation_matrix(yaw) @ y_rotation_matrix(pitch) @ x_rotation_matrix(roll)
 
 
+def create_rotation_matrices_from_euler_angles(roll: np.ndarray, pitch: np.ndarray, yaw: np.ndarray) -> np.ndarray:
+    """Vectorized version of `create_rotation_matrix_from_euler_angles`.
+
+    Args:
+        roll (np.ndarray): N roll (x-Euler) angles in radians.
+        pitch (np.ndarray): N pitch (y-Euler) angles in radians.
+        yaw (np.ndarray): N yaw (z-Euler) angles in radians.
+
+    Returns:
+        np.ndarray: Nx3x3 array of rotation matrices.
+    """
+    return z_rotation_matrices(yaw) @ y_rotation_matrices(pitch) @ x_rotation_matrices(roll)
+
+
+def rotation_vectors_from_matrices(R: np.ndarray) -> np.ndarray:
+    """Axis-angle (rotation vector) representation of a stack of rotation matrices.
+
+    Args:
+        R (np.ndarray): Nx3x3 array of rotation matrices.
+
+    Returns:
+        np.ndarray: Nx3 array, each row is the rotation axis scaled by the rotation angle in [0, π].
+
+    Raises:
+        ValueError: If `R` is not a Nx3x3 array.
+    """
+    if R.ndim != 3 or R.shape[1:] != (3, 3):
+        raise ValueError("R must be a Nx3x3 array.")
+
+    # Twice the axis scaled by sin(angle), from the skew symmetric part of R
+    v = np.stack([R[:, 2, 1] - R[:, 1, 2], R[:, 0, 2] - R[:, 2, 0], R[:, 1, 0] - R[:, 0, 1]], axis=1)
+    trace = R[:, 0, 0] + R[:, 1, 1] + R[:, 2, 2]
+    sin_angle = np.linalg.norm(v, axis=1) / 2
+    angle = np.arctan2(sin_angle, (trace - 1) / 2)
+
+    small = sin_angle < 1e-9
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scale = np.where(small, 0.5, angle / (2 * sin_angle))
+    vectors = v * scale[:, None]
+
+    # Close to π the skew part vanishes, the axis is read from the symmetric part (R + I) / 2 = k k^T
+    flipped = small & (angle > np.pi / 2)
+    if np.any(flipped):
+        B = (R[flipped] + np.eye(3)) / 2
+        column = np.argmax(np.diagonal(B, axis1=1, axis2=2), axis=1)
+        rows = np.arange(B.shape[0])
+        axis = B[rows, :, column] / np.sqrt(B[rows, column, column])[:, None]
+        axis *= np.where(np.einsum("ij,ij->i", axis, v[flipped]) < 0, -1.0, 1.0)[:, None]
+        vectors[flipped] = axis * angle[flipped][:, None]
+    return vectors
+
+
+def quaternions_from_matrices(R: np.ndarray) -> np.ndarray:
+    """Unit quaternions (w, x, y, z) of a stack of rotation matrices.
+
+    Args:
+        R (np.ndarray): Nx3x3 array of rotation matrices.
+
+    Returns:
+        np.ndarray: Nx4 array of unit quaternions with a non negative w.
+    """
+    if R.ndim != 3 or R.shape[1:] != (3, 3):
+        raise ValueError("R must be a Nx3x3 array.")
+
+    # 4 q q^T is a linear function of R, its largest diagonal entry gives the most stable column
+    K = np.empty((R.shape[0], 4, 4))
+    K[:, 0, 0] = 1 + R[:, 0, 0] + R[:, 1, 1] + R[:, 2, 2]
+    K[:, 1, 1] = 1 + R[:, 0, 0] - R[:, 1, 1] - R[:, 2, 2]
+    K[:, 2, 2] = 1 - R[:, 0, 0] + R[:, 1, 1] - R[:, 2, 2]
+    K[:, 3, 3] = 1 - R[:, 0, 0] - R[:, 1, 1] + R[:, 2, 2]
+    K[:, 0, 1] = K[:, 1, 0] = R[:, 2, 1] - R[:, 1, 2]
+    K[:, 0, 2] = K[:, 2, 0] = R[:, 0, 2] - R[:, 2, 0]
+    K[:, 0, 3] = K[:, 3, 0] = R[:, 1, 0] - R[:, 0, 1]
+    K[:, 1, 2] = K[:, 2, 1] = R[:, 1, 0] + R[:, 0, 1]
+    K[:, 1, 3] = K[:, 3, 1] = R[:, 0, 2] + R[:, 2, 0]
+    K[:, 2, 3] = K[:, 3, 2] = R[:, 2, 1] + R[:, 1, 2]
+
+    rows = np.arange(R.shape[0])
+    column = np.argmax(np.diagonal(K, axis1=1, axis2=2), axis=1)
+    q = K[rows, :, column]
+    q /= np.linalg.norm(q, axis=1, keepdims=True)
+    return q * np.where(q[:, :1] < 0, -1.0, 1.0)
+
+
+def matrices_from_quaternions(q: np.ndarray) -> np.ndarray:
+    """Rotation matrices (Nx3x3) of a stack of unit quaternions (Nx4, w first)."""
+    w, x, y, z = np.asarray(q, dtype=float).T
+    R = np.empty((w.shape[0], 3, 3))
+    R[:, 0, 0] = 1 - 2 * (y * y + z * z)
+    R[:, 0, 1] = 2 * (x * y - w * z)
+    R[:, 0, 2] = 2 * (x * z + w * y)
+    R[:, 1, 0] = 2 * (x * y + w * z)
+    R[:, 1, 1] = 1 - 2 * (x * x + z * z)
+    R[:, 1, 2] = 2 * (y * z - w * x)
+    R[:, 2, 0] = 2 * (x * z - w * y)
+    R[:, 2, 1] = 2 * (y * z + w * x)
+    R[:, 2, 2] = 1 - 2 * (x * x + y * y)
+    return R
+
+
+def slerp(q0: np.ndarray, q1: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Spherical linear interpolation between two unit quaternions along the shortest arc.
+
+    Args:
+        q0 (np.ndarray): Start quaternion (w, x, y, z).
+        q1 (np.ndarray): End quaternion (w, x, y, z).
+        t (np.ndarray): N interpolation parameters in [0, 1].
+
+    Returns:
+        np.ndarray: Nx4 array of unit quaternions.
+    """
+    q0 = np.asarray(q0, dtype=float)
+    q1 = np.asarray(q1, dtype=float)
+    t = np.asarray(t, dtype=float)[:, None]
+    dot = float(np.dot(q0, q1))
+    if dot < 0:
+        q1, dot = -q1, -dot
+    if dot > 1 - 1e-9:
+        q = q0 + t * (q1 - q0)
+        return q / np.linalg.norm(q, axis=1, keepdims=True)
+    theta = np.arccos(dot)
+    return (np.sin((1 - t) * theta) * q0 + np.sin(t * theta) * q1) / np.sin(theta)
+
+
 def nearest_by_2pi_ref(angle: float, ref: float) -> float:
     """Find the nearest angle to 'ref' that is a multiple of 2π away from 'angle' in any direction.
 
@@ -149,3 +377,19 @@ def nearest_by_2pi_ref(angle: float, ref: float) -> float:
         return angle + n * 2 * np.pi
     except Exception:
         return angle
+
+
+def nearest_by_2pi_ref_batch(angles: np.ndarray, refs: np.ndarray) -> np.ndarray:
+    """Vectorized version of `nearest_by_2pi_ref`, element-wise over broadcastable arrays.
+
+    Args:
+        angles (np.ndarray): The starting angles in radians.
+        refs (np.ndarray): The reference angles in radians.
+
+    Returns:
+        np.ndarray: The angles shifted by the multiple of 2π that brings them closest to 'refs'.
+            Non finite entries are returned unchanged.
+    """
+    with np.errstate(invalid="ignore"):
+        n = np.round((refs - angles) / (2 * np.pi))
+    return np.where(np.isfinite(n), angles + n * 2 * np.pi, angles)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import dataclasses
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional
+
+import numpy as np
+
+from ribot.utils.messages import MessageOp
+
+"""
+    ----------------------------------------
+                    Sequenced Commands
+    ----------------------------------------
+"""
+
+# Sequence numbers travel as raw uint32 payloads (see `PayloadMessage`), float arguments would round them
+SEQUENCE_MARK_CODE = 23  # MOVE code sent after the moves of a command, payload: sequence number
+COMMAND_QUEUED_CODE = 24  # firmware reply once the command is queued, payload: sequence number, move queue size
+COMMAND_DONE_CODE = 26  # firmware reply once the command ends, payload: sequence number, 1 if completed else 0 (stopped)
+
+SEQUENCE_STRUCT = struct.Struct("<I")
+ACK_STRUCT = struct.Struct("<II")
+# Replies the link decoder keeps as raw payloads
+ACK_PAYLOAD_CODES = frozenset({(MessageOp.MOVE, COMMAND_QUEUED_CODE), (MessageOp.MOVE, COMMAND_DONE_CODE)})
+
+MAX_SEQUENCE = 1 << 32  # uint32 range, wraps to 0
+
+
+@dataclasses.dataclass
+class Command:
+    """A move command tracked from the moment it is sent until the firmware completes its last move.
+
+    `queued` resolves to the firmware move queue size once the command is queued (cancelled if it
+    ends unacknowledged) and `done` to whether it completed (False if the moves were stopped or the
+    connection ended). Both are `concurrent.futures.Future`, `asyncio.wrap_future` makes them awaitable.
+    """
+
+    sequence: int
+    name: str
+    num_moves: int
+    sent_at: float
+    queued: Future = dataclasses.field(default_factory=Future)
+    done: Future = dataclasses.field(default_factory=Future)
+    queued_at: float = 0
+    done_at: float = 0
+
+    @property
+    def queue_latency(self) -> Optional[float]:
+        """Seconds from sending the command to the firmware queueing it."""
+        return self.queued_at - self.sent_at if self.queued_at else None
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from sending the command to its last move completing, time waiting behind earlier moves included."""
+        return self.done_at - self.sent_at if self.done_at else None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the command ends, returns whether it completed.
+
+        Raises:
+            TimeoutError: If it does not end within `timeout` seconds.
+        """
+        return bool(self.done.result(timeout))
+
+    @property
+    def completed(self) -> Optional[bool]:
+        return bool(self.done.result()) if self.done.done() else None
+
+
+class CommandLedger:
+    """Commands in flight by sequence number, resolved by the firmware acks (see `SEQUENCE_MARK_CODE`).
+
+    Ended commands are kept in `history` (the last `history_size`) to report latencies.
+    """
+
+    def __init__(self, history_size: int = 256) -> None:
+        self.lock: threading.Lock = threading.Lock()
+        self.next_sequence: int = 0
+        self.pending: Dict[int, Command] = {}
+        self.history: Deque[Command] = deque(maxlen=history_size)
+
+    def issue(self, name: str, num_moves: int) -> Command:
+        with self.lock:
+            command = Command(self.next_sequence, name, num_moves, time.time())
+            self.next_sequence = (self.next_sequence + 1) % MAX_SEQUENCE
+            self.pending[command.sequence] = command
+        return command
+
+    def acknowledge(self, sequence: int, queue_size: int) -> None:
+        with self.lock:
+            command = self.pending.get(sequence)
+            if command is None or command.queued.done():
+                return
+            command.queued_at = time.time()
+            command.queued.set_result(queue_size)
+
+    def complete(self, sequence: int, completed: bool = True) -> None:
+        with self.lock:
+            command = self.pending.pop(sequence, None)
+            if command is None:
+                return
+            command.done_at = time.time()
+            command.queued.cancel()  # no-op once acknowledged
+            self.history.append(command)
+        command.done.set_result(completed)
+
+    def cancel_all(self) -> None:
+        """Ends every pending command as not completed, their acks will not come (e.g. the connection ended)."""
+        with self.lock:
+            sequences = list(self.pending)
+        for sequence in sequences:
+            self.complete(sequence, completed=False)
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Latency percentiles (seconds) of the completed commands in `history`."""
+        with self.lock:
+            completed = [command for command in self.history if command.completed]
+        if not completed:
+            return {"count": 0}
+        stats: Dict[str, float] = {"count": len(completed)}
+        latencies = np.array([[command.latency, command.queue_latency] for command in completed], dtype=float)
+        for key, values in (("latency", latencies[:, 0]), ("queue_latency", latencies[:, 1])):
+            p50, p95, p100 = np.percentile(values, [50, 95, 100])
+            stats.update({f"{key}_p50": float(p50), f"{key}_p95": float(p95), f"{key}_max": float(p100)})
+        return stats
+
+    def recent(self, count: int = 20) -> List[Command]:
+        with self.lock:
+            return list(self.history)[-count:]
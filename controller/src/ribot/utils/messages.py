@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
+import socket
 import struct
 from enum import Enum
+from typing import AbstractSet, Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
 
 __author__ = "Alberto Abarzua"
 
@@ -13,6 +18,26 @@ class MessageOp(Enum):
     CONFIG = "C"
 
 
+_OP_BYTES = {op: op.value.encode() for op in MessageOp}
+_OPS = {op_byte: op for op, op_byte in _OP_BYTES.items()}
+
+HEADER_STRUCT = struct.Struct("<cii")  # op + code + num_args
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+@functools.lru_cache(maxsize=None)
+def message_struct(num_args: int) -> struct.Struct:
+    """Compiled layout of a whole message with `num_args` arguments, built once per argument count."""
+    return struct.Struct(f"<cii{num_args}f")
+
+
+@functools.lru_cache(maxsize=None)
+def args_struct(num_args: int) -> struct.Struct:
+    """Compiled layout of `num_args` arguments, built once per argument count."""
+    return struct.Struct(f"<{num_args}f")
+
+
 @dataclasses.dataclass
 class Message:
     op: MessageOp
@@ -39,27 +64,28 @@ class Message:
         for arg in self.args:
             assert isinstance(arg, float), f"args must be a list of floats, not {type(arg)}"
 
+    @property
+    def encoded_size(self) -> int:
+        return Message.LENGTH_HEADERS + 4 * self.num_args
+
     def encode(self) -> bytes:
-        return struct.pack(
-            "<cii" + "f" * len(self.args),
-            self.op.value.encode(),
-            self.code,
-            self.num_args,
-            *self.args,
-        )
+        return message_struct(self.num_args).pack(_OP_BYTES[self.op], self.code, self.num_args, *self.args)
+
+    def encode_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """Packs the message into a writable buffer at `offset`, returns the offset right after it."""
+        message_struct(self.num_args).pack_into(buffer, offset, _OP_BYTES[self.op], self.code, self.num_args, *self.args)
+        return offset + self.encoded_size
 
     @staticmethod
-    def decode_headers(bytes: bytes) -> tuple[MessageOp, int, int]:
-        op, code, num_args = struct.unpack_from("<cii", bytes, offset=0)
-        op = op.decode()
-        return MessageOp(op), code, num_args
+    def decode_headers(bytes: Buffer, offset: int = 0) -> tuple[MessageOp, int, int]:
+        op, code, num_args = HEADER_STRUCT.unpack_from(bytes, offset)
+        return _OPS[op], code, num_args
 
     @staticmethod
-    def decode(bytes: bytes) -> Message:
-        op, code, num_args = struct.unpack_from("<cii", bytes, offset=0)
-        args = struct.unpack_from("<" + "f" * num_args, bytes, offset=9)
-        op = op.decode()
-        return Message(MessageOp(op), code, args)  # type: ignore
+    def decode(bytes: Buffer, offset: int = 0) -> Message:
+        op, code, num_args = HEADER_STRUCT.unpack_from(bytes, offset)
+        args = args_struct(num_args).unpack_from(bytes, offset + Message.LENGTH_HEADERS)
+        return Message(_OPS[op], code, list(args))
 
     def __str__(self) -> str:
         first_args = self.args[: self.num_args // 2]
@@ -68,3 +94,167 @@ class Message:
         second_args_str = ", ".join([f"{arg:.3f}" for arg in second_args])
         args_str = f"\n{first_args_str}\n{second_args_str}"
         return f"op: {self.op}, code: {self.code}, num_args: {self.num_args}, args: {args_str}"
+
+
+class PayloadMessage(Message):
+    """Message whose body is raw bytes instead of float arguments, padded to whole 4 byte arguments.
+
+    Used for packed payloads (e.g. fixed point integers) that float arguments would not carry intact.
+    """
+
+    def __init__(self, op: MessageOp, code: int, payload: bytes) -> None:
+        super().__init__(op, code, [])
+        self.payload: bytes = payload + bytes(-len(payload) % 4)
+        self.num_args = len(self.payload) // 4
+
+    def encode(self) -> bytes:
+        return HEADER_STRUCT.pack(_OP_BYTES[self.op], self.code, self.num_args) + self.payload
+
+    def encode_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        HEADER_STRUCT.pack_into(buffer, offset, _OP_BYTES[self.op], self.code, self.num_args)
+        start = offset + Message.LENGTH_HEADERS
+        buffer[start : start + len(self.payload)] = self.payload
+        return start + len(self.payload)
+
+
+MOVE_BATCH_CODE = 19
+# The firmware receives every message into a 1024 byte buffer
+MAX_FRAME_ARGS = (1024 - Message.LENGTH_HEADERS) // 4
+
+
+def move_batch_messages(setpoints: np.ndarray, max_args: int = MAX_FRAME_ARGS) -> List[Message]:
+    """Packs rows of timed moves into as few batched frames (MOVE 19) as fit in the firmware buffer.
+
+    Every row is a waypoint: the joint angles, the duration and optionally a tool value (NaN leaves
+    the tool). A frame holds the number of waypoints, the values per waypoint and then the waypoints,
+    the firmware expands it into one queued timed move (MOVE 15, or MOVE 17 with a tool value) per
+    waypoint.
+
+    Raises:
+        ValueError: If the setpoints are not a 2D array or a single row does not fit in a frame.
+    """
+    rows = np.asarray(setpoints, dtype=float)
+    if rows.ndim != 2:
+        raise ValueError("Setpoints must be a 2D array with one waypoint per row")
+    stride = rows.shape[1]
+    per_frame = (max_args - 2) // stride
+    if per_frame < 1:
+        raise ValueError(f"Waypoints of {stride} values do not fit in frames of {max_args} arguments")
+    return [
+        Message(MessageOp.MOVE, MOVE_BATCH_CODE, [float(len(chunk)), float(stride), *chunk.ravel().tolist()])
+        for chunk in (rows[start : start + per_frame] for start in range(0, len(rows), per_frame))
+    ]
+
+
+class MessageEncoder:
+    """Packs messages back to back into a reusable buffer, growing it only when a batch does not fit.
+
+    The returned view is only valid until the next call, send it before encoding again.
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self.buffer: bytearray = bytearray(capacity)
+
+    def encode(self, messages: Union[Message, Iterable[Message]]) -> memoryview:
+        batch: Iterable[Message] = [messages] if isinstance(messages, Message) else messages
+        buffer = self.buffer
+        offset = 0
+        for message in batch:
+            codec = message_struct(message.num_args)
+            end = offset + codec.size
+            if end > len(buffer):
+                # A fresh buffer, views of the previous one may still be alive and block resizing it
+                grown = bytearray(max(end, 2 * len(buffer)))
+                grown[:offset] = buffer[:offset]
+                buffer = self.buffer = grown
+            if type(message) is Message:
+                codec.pack_into(buffer, offset, _OP_BYTES[message.op], message.code, message.num_args, *message.args)
+            else:
+                message.encode_into(buffer, offset)
+            offset = end
+        return memoryview(buffer)[:offset]
+
+
+class MessageDecoder:
+    """Incremental decoder of a stream of messages, as read from a socket in arbitrary pieces.
+
+    Bytes are appended to a buffer, with large `recv_into` reads straight into its free space, and
+    every complete message in it is yielded when iterating. A message split across reads stays
+    buffered until the rest arrives. Consumed bytes are dropped by moving the (partial) remainder to
+    the front of the buffer when the free space runs out, the buffer only grows for messages larger
+    than it.
+
+    Args:
+        capacity (int): Initial size of the buffer in bytes.
+        max_args (int): Largest number of arguments accepted, a header above it means the stream is corrupted.
+        payload_codes (AbstractSet[Tuple[MessageOp, int]]): Op and code of the messages whose body is
+            raw bytes, yielded as `PayloadMessage` instead of decoding float arguments.
+    """
+
+    def __init__(
+        self, capacity: int = 65536, max_args: int = 4096, payload_codes: AbstractSet[Tuple[MessageOp, int]] = frozenset()
+    ) -> None:
+        self.buffer: bytearray = bytearray(capacity)
+        self.max_args: int = max_args
+        self.payload_codes: AbstractSet[Tuple[MessageOp, int]] = payload_codes
+        self.start: int = 0  # first byte not decoded yet
+        self.end: int = 0  # end of the received bytes
+
+    @property
+    def pending(self) -> int:
+        """Bytes received but not decoded yet."""
+        return self.end - self.start
+
+    def _reserve(self, size: int) -> None:
+        """Makes room for `size` more bytes after the received ones."""
+        if len(self.buffer) - self.end >= size:
+            return
+        pending = self.pending
+        if len(self.buffer) - pending >= size:
+            self.buffer[:pending] = self.buffer[self.start : self.end]
+        else:
+            grown = bytearray(max(pending + size, 2 * len(self.buffer)))
+            grown[:pending] = self.buffer[self.start : self.end]
+            self.buffer = grown
+        self.start, self.end = 0, pending
+
+    def feed(self, data: Buffer) -> None:
+        size = len(data)
+        self._reserve(size)
+        self.buffer[self.end : self.end + size] = data
+        self.end += size
+
+    def recv_into(self, connection: socket.socket, min_free: int = 4096) -> int:
+        """Reads as much as the socket has and the free space fits, in a single call.
+
+        Returns the number of bytes read, 0 when the peer closed the connection. Socket errors
+        (e.g. `BlockingIOError` when nothing is available) propagate.
+        """
+        self._reserve(min_free)
+        with memoryview(self.buffer) as view:
+            received = connection.recv_into(view[self.end :])
+        self.end += received
+        return received
+
+    def __iter__(self) -> Iterator[Message]:
+        """Yields every complete message received so far, in order.
+
+        Raises:
+            ValueError: If a header has an unknown op or too many arguments, the framing of the stream is lost.
+        """
+        while self.pending >= Message.LENGTH_HEADERS:
+            op, code, num_args = HEADER_STRUCT.unpack_from(self.buffer, self.start)
+            if op not in _OPS or not 0 <= num_args <= self.max_args:
+                raise ValueError(f"Corrupted message stream, header: {op!r} {code} {num_args}")
+            size = Message.LENGTH_HEADERS + 4 * num_args
+            if self.pending < size:
+                break
+            start = self.start + Message.LENGTH_HEADERS
+            self.start += size
+            if self.payload_codes and (_OPS[op], code) in self.payload_codes:
+                yield PayloadMessage(_OPS[op], code, bytes(self.buffer[start : self.start]))
+                continue
+            args = args_struct(num_args).unpack_from(self.buffer, start)
+            yield Message(_OPS[op], code, list(args))
+        if self.start == self.end:
+            self.start = self.end = 0
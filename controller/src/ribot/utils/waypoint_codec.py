@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import struct
+from enum import IntFlag
+from typing import List, Tuple
+
+import numpy as np
+
+from ribot.utils.messages import MAX_FRAME_ARGS, Message, MessageOp, PayloadMessage
+
+"""
+    ----------------------------------------
+                    Link Features
+    ----------------------------------------
+"""
+
+LINK_FEATURES_REQUEST_CODE = 41  # CONFIG code asking the firmware for its link features
+LINK_FEATURES_RESPONSE_CODE = 42  # CONFIG reply, args: features
+
+
+class LinkFeature(IntFlag):
+    """Optional protocol extensions, the firmware reports the ones it supports once per connection."""
+
+    MOVE_BATCH = 1  # MOVE 19, batches of float waypoints
+    COMPACT_MOVE_BATCH = 2  # MOVE 21, batches of fixed point waypoints
+    SEQUENCED_COMMANDS = 4  # MOVE 23, commands acked when queued and when completed, see `command_ledger`
+
+
+"""
+    ----------------------------------------
+                    Compact Batches
+    ----------------------------------------
+"""
+
+COMPACT_BATCH_CODE = 21
+
+# Bits of the flags byte
+WIDTH_MASK = 0b11  # index in INT_WIDTHS of the integer type of the angles
+DELTA = 0b100  # angles are deltas to the previous waypoint of the batch
+CONSTANT_DURATION = 0b1000  # every waypoint lasts the duration in the header, no duration per waypoint
+
+INT_WIDTHS: Tuple[np.dtype, ...] = (np.dtype("<i1"), np.dtype("<i2"), np.dtype("<i4"))
+TOOL_KEEP = np.iinfo(np.int16).min  # tool value of waypoints that leave the tool as it is
+
+# num_waypoints, stride, flags, angle scale, duration (constant) or duration scale, tool scale
+HEADER = struct.Struct("<HBBfff")
+
+
+def _scale(max_abs: float, limit: int) -> float:
+    """Scale mapping `max_abs` to at most `limit`, as a float32 like in the payload so encoding and decoding agree.
+
+    Rounded up, a scale rounded down would push the largest values past the integer range.
+    """
+    if max_abs <= 0:
+        return 1.0
+    scale = np.float32(max_abs / limit)
+    if float(scale) < max_abs / limit:
+        scale = np.nextafter(scale, np.float32(np.inf))
+    return max(float(scale), float(np.finfo(np.float32).tiny))
+
+
+def _waypoint_size(num_joints: int, stride: int, flags: int) -> int:
+    size = num_joints * INT_WIDTHS[flags & WIDTH_MASK].itemsize
+    size += 0 if flags & CONSTANT_DURATION else 2
+    size += 2 if stride == num_joints + 2 else 0
+    return size
+
+
+def _encode_chunk(rows: np.ndarray, num_joints: int, delta: bool, max_error: float) -> Tuple[bytes, int]:
+    angles = rows[:, :num_joints]
+    durations = rows[:, num_joints]
+    reference = angles[0] if delta else (angles.max(axis=0) + angles.min(axis=0)) / 2
+    reference = reference.astype(np.float32)
+    offsets = angles - reference.astype(float)
+    if delta:
+        spread = float(np.abs(np.diff(angles, axis=0)).max(initial=0.0))
+    else:
+        spread = float(np.abs(offsets).max(initial=0.0))
+    # One integer of margin for the rounding, deltas of rounded positions may exceed the rounded delta
+    width = next(
+        (idx for idx, dtype in enumerate(INT_WIDTHS) if spread / (np.iinfo(dtype).max - 1) <= 2 * max_error),
+        len(INT_WIDTHS) - 1,
+    )
+    angle_scale = _scale(spread, int(np.iinfo(INT_WIDTHS[width]).max) - 1)
+    # Quantized on a single grid, the deltas of the integer positions add up exactly
+    positions = np.round(offsets / angle_scale).astype(np.int64)
+    values = np.diff(positions, axis=0, prepend=0) if delta else positions
+
+    flags = width | (DELTA if delta else 0)
+    body = [reference.astype("<f4").tobytes(), values.astype(INT_WIDTHS[width]).tobytes()]
+    if np.ptp(durations) <= 1e-6:
+        flags |= CONSTANT_DURATION
+        duration_value = float(durations[0])
+    else:
+        duration_value = _scale(float(durations.max()), int(np.iinfo(np.uint16).max))
+        body.append(np.round(durations / duration_value).astype("<u2").tobytes())
+
+    tool_scale = 1.0
+    if rows.shape[1] == num_joints + 2:
+        tools = rows[:, num_joints + 1]
+        keep = np.isnan(tools)
+        tool_scale = _scale(float(np.abs(tools[~keep]).max(initial=0.0)), int(np.iinfo(np.int16).max))
+        body.append(np.where(keep, TOOL_KEEP, np.round(np.nan_to_num(tools) / tool_scale)).astype("<i2").tobytes())
+
+    header = HEADER.pack(len(rows), rows.shape[1], flags, angle_scale, duration_value, tool_scale)
+    return header + b"".join(body), flags
+
+
+def compact_batch_messages(
+    setpoints: np.ndarray, num_joints: int = 6, delta: bool = True, max_error: float = 1e-4, max_args: int = MAX_FRAME_ARGS
+) -> List[Message]:
+    """Packs rows of timed moves into compact fixed point batches (MOVE 21).
+
+    Rows are waypoints like those of `move_batch_messages`: the joint angles, the duration and
+    optionally a tool value (NaN leaves the tool). Per frame, angles are integers (int8, int16 or
+    int32, the narrowest that keeps every angle within `max_error` radians) times a scale, relative
+    to float reference angles or, with `delta`, to the previous waypoint. Dense trajectories move
+    little between waypoints, so their deltas mostly fit in a byte. Durations are a single float when
+    they are all equal, else uint16 with a scale. Tool values are int16 with a scale.
+
+    Integers come from positions quantized on a single grid per frame, so delta decoding does not
+    drift and every angle stays within `max_error` of the setpoint.
+
+    Layout: header (`HEADER`), reference angles (float32 per joint), angles (int per waypoint and joint),
+    durations (uint16 per waypoint, unless constant), tool values (int16 per waypoint, with a tool column).
+
+    Raises:
+        ValueError: If the rows do not hold the angles, a duration and optionally a tool value.
+    """
+    rows = np.asarray(setpoints, dtype=float)
+    if rows.ndim != 2 or rows.shape[1] not in (num_joints + 1, num_joints + 2):
+        raise ValueError(f"Setpoints must be rows of {num_joints} angles, a duration and optionally a tool value")
+    stride = rows.shape[1]
+    room = max_args * 4 - HEADER.size - 4 * num_joints
+
+    messages: List[Message] = []
+    start = 0
+    while start < len(rows):
+        # As many waypoints as the narrowest encoding fits, fewer rows never need a wider one
+        count = room // _waypoint_size(num_joints, stride, CONSTANT_DURATION)
+        while True:
+            payload, flags = _encode_chunk(rows[start : start + count], num_joints, delta, max_error)
+            if len(payload) <= max_args * 4:
+                break
+            count = room // _waypoint_size(num_joints, stride, flags)
+        messages.append(PayloadMessage(MessageOp.MOVE, COMPACT_BATCH_CODE, payload))
+        start += count
+    return messages
+
+
+def decode_compact_batch(payload: bytes, num_joints: int = 6) -> np.ndarray:
+    """Rows (angles, duration, optionally tool value) of a compact batch payload, as the firmware decodes it."""
+    num_waypoints, stride, flags, angle_scale, duration_value, tool_scale = HEADER.unpack_from(payload, 0)
+    offset = HEADER.size
+    reference = np.frombuffer(payload, dtype="<f4", count=num_joints, offset=offset).astype(float)
+    offset += 4 * num_joints
+
+    dtype = INT_WIDTHS[flags & WIDTH_MASK]
+    values = np.frombuffer(payload, dtype=dtype, count=num_waypoints * num_joints, offset=offset).reshape(-1, num_joints)
+    offset += values.nbytes
+    positions = np.cumsum(values, axis=0, dtype=np.int64) if flags & DELTA else values.astype(np.int64)
+    columns = [reference + positions * angle_scale]
+
+    if flags & CONSTANT_DURATION:
+        columns.append(np.full((num_waypoints, 1), duration_value))
+    else:
+        durations = np.frombuffer(payload, dtype="<u2", count=num_waypoints, offset=offset)
+        offset += durations.nbytes
+        columns.append(durations[:, None] * duration_value)
+
+    if stride == num_joints + 2:
+        tools = np.frombuffer(payload, dtype="<i2", count=num_waypoints, offset=offset)
+        columns.append(np.where(tools == TOOL_KEEP, np.nan, tools * tool_scale)[:, None])
+    return np.hstack(columns)
@@ -143,16 +143,35 @@ ArmClientCode ArmClient::receive_message(Message **msg_loc) {
     int32_t code, num_args;
     Message::parse_headers(buffer, &op, &code, &num_args);
     int32_t size_args = sizeof(float) * num_args;
-    if (size_args > 0) {
-        result =
-            read(this->clientSocket, buffer + Message::HEADER_SIZE, size_args);
+    if (num_args < 0 ||
+        size_args > static_cast<int32_t>(sizeof(buffer)) - Message::HEADER_SIZE) {
+        return ArmClientCode::FAILED_TO_RECEIVE_ARGS;
+    }
+    // Batched frames are large, their body may arrive in several segments
+    int32_t received = 0;
+    uint64_t start_time = get_current_time_microseconds();
+    while (received < size_args) {
+        result = read(this->clientSocket,
+                      buffer + Message::HEADER_SIZE + received,
+                      size_args - received);
         if (result < 0) {
             if (errno == EAGAIN || errno == EWOULDBLOCK) {
-                return ArmClientCode::NO_NEW_DATA;
-            } else {
-                return ArmClientCode::FAILED_TO_RECEIVE_ARGS;
+                // Yield while the rest arrives, a peer that stops mid frame
+                // must not stall the control loop
+                if (get_current_time_microseconds() - start_time >
+                    RECEIVE_ARGS_TIMEOUT_US) {
+                    return ArmClientCode::FAILED_TO_RECEIVE_ARGS;
+                }
+                task_feed();
+                run_delay(1);
+                continue;
             }
+            return ArmClientCode::FAILED_TO_RECEIVE_ARGS;
+        }
+        if (result == 0) {
+            return ArmClientCode::FAILED_TO_RECEIVE_ARGS;
         }
+        received += result;
     }
     *msg_loc = new Message(buffer);
     return ArmClientCode::SUCCESS;
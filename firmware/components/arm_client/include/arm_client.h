@@ -10,6 +10,10 @@
 
 #include "config.h"
 #include "messages.h"
+#include "utils.h"
+
+// Longest wait for the rest of a message body once its header was read
+#define RECEIVE_ARGS_TIMEOUT_US (200 * 1000)
 /**
  * @brief ArmClient class, This class is used to create a TCP socket to
  * comunicate with the python controller This is completely independent from the
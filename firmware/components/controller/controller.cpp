@@ -1,5 +1,6 @@
 #include "controller.h"
 
+#include <cmath>
 #include <cstdint>
 
 #include "movement.h"
@@ -112,10 +113,217 @@ bool Controller::recieve_message() {
         return false;
     }
     std::queue<Message *> *message_queue = this->message_queues[op];
-    message_queue->push(msg);
+    if (op == MessageOp::MOVE && msg->get_code() == 23) {
+        this->mark_command(msg, message_queue);
+        delete msg;
+        // Marks queue nothing, the frame after one is read in the same
+        // iteration
+        this->recieve_message();
+        return true;
+    }
+    // Nothing pops the queue while receiving, its growth is what was queued
+    size_t queue_size = message_queue->size();
+    if (op == MessageOp::MOVE && msg->get_code() == 19) {
+        this->expand_move_batch(msg, message_queue);
+        delete msg;
+    } else if (op == MessageOp::MOVE && msg->get_code() == 21) {
+        this->expand_compact_move_batch(msg, message_queue);
+        delete msg;
+    } else {
+        message_queue->push(msg);
+    }
+    if (op == MessageOp::MOVE) {
+        this->moves_since_mark += message_queue->size() - queue_size;
+    }
     return true;
 }
 
+/**
+ * Sequence mark (MOVE 23, raw payload: uint32 sequence number) sent right
+ * after the moves of a command. The last queued move carries the sequence
+ * number, acked with MOVE 24 (raw payload: uint32 sequence number, uint32 move
+ * queue size) now and with MOVE 26 (raw payload: uint32 sequence number,
+ * uint32 1) once it completes. With an empty queue the command already
+ * completed. A command that queued no moves (rejected or empty batches, or
+ * moves dropped by a stop before its mark) ends right away with MOVE 26 (raw
+ * payload: uint32 sequence number, uint32 0), the moves of earlier commands
+ * are never retagged.
+ */
+void Controller::mark_command(Message *mark, std::queue<Message *> *queue) {
+    if (mark->get_num_args() < 1) {
+        return;
+    }
+    uint32_t sequence;
+    memcpy(&sequence, mark->get_args(), sizeof(sequence));
+    uint32_t ack[2] = {sequence, static_cast<uint32_t>(queue->size())};
+    float *args_buff = static_cast<float *>(malloc(sizeof(ack)));
+    memcpy(args_buff, ack, sizeof(ack));
+    Message *ack_message = new Message(MessageOp::MOVE, 24, 2, args_buff);
+    this->arm_client.send_message(ack_message);
+    delete ack_message;
+
+    uint32_t num_moves = this->moves_since_mark;
+    this->moves_since_mark = 0;
+    if (num_moves == 0 ||
+        (queue->size() > 0 && queue->back()->get_sequence() >= 0)) {
+        this->send_command_done(sequence, false);
+    } else if (queue->size() == 0) {
+        this->send_command_done(sequence, true);
+    } else {
+        queue->back()->set_sequence(sequence);
+    }
+}
+
+void Controller::send_command_done(uint32_t sequence, bool completed) {
+    uint32_t done[2] = {sequence, completed ? 1u : 0u};
+    float *args_buff = static_cast<float *>(malloc(sizeof(done)));
+    memcpy(args_buff, done, sizeof(done));
+    Message *done_message = new Message(MessageOp::MOVE, 26, 2, args_buff);
+    this->arm_client.send_message(done_message);
+    delete done_message;
+}
+
+/**
+ * Expands a batch of timed moves (MOVE 19) into one queued move per waypoint.
+ * args: number of waypoints, values per waypoint, then per waypoint the
+ * angles, the duration and optionally a tool value (NaN leaves the tool).
+ * Waypoints with a tool value become MOVE 17, the others MOVE 15.
+ */
+void Controller::expand_move_batch(Message *batch,
+                                   std::queue<Message *> *queue) {
+    float *args = batch->get_args();
+    int32_t num_args = batch->get_num_args();
+    if (num_args < 2) {
+        return;
+    }
+    int32_t num_waypoints = static_cast<int32_t>(args[0]);
+    int32_t stride = static_cast<int32_t>(args[1]);
+    int32_t num_joints = static_cast<int32_t>(this->joints.size());
+    bool valid_stride = stride == num_joints + 1 || stride == num_joints + 2;
+    if (!valid_stride || num_waypoints < 0 ||
+        num_args != 2 + num_waypoints * stride) {
+        std::cout << "Invalid move batch" << std::endl;
+        return;
+    }
+
+    for (int32_t k = 0; k < num_waypoints; k++) {
+        float *waypoint = args + 2 + k * stride;
+        bool with_tool = stride == num_joints + 2 &&
+                         !std::isnan(waypoint[num_joints + 1]);
+        int32_t size = with_tool ? num_joints + 2 : num_joints + 1;
+        float *move_args = static_cast<float *>(malloc(size * sizeof(float)));
+        memcpy(move_args, waypoint, size * sizeof(float));
+        queue->push(
+            new Message(MessageOp::MOVE, with_tool ? 17 : 15, size, move_args));
+    }
+}
+
+static int32_t read_fixed_point(const uint8_t *src, uint8_t width) {
+    switch (width) {
+        case 0: {
+            int8_t value;
+            memcpy(&value, src, sizeof(value));
+            return value;
+        }
+        case 1: {
+            int16_t value;
+            memcpy(&value, src, sizeof(value));
+            return value;
+        }
+        default: {
+            int32_t value;
+            memcpy(&value, src, sizeof(value));
+            return value;
+        }
+    }
+}
+
+/**
+ * Expands a compact batch of timed moves (MOVE 21) into one queued move per
+ * waypoint. The arguments are raw little endian bytes:
+ * header: uint16 waypoints, uint8 values per waypoint, uint8 flags,
+ *         float angle scale, float duration (or duration scale), float tool
+ *         scale
+ * float reference angle per joint
+ * angles: int8/int16/int32 (flags bits 0-1) per waypoint and joint, deltas to
+ *         the previous waypoint when flags bit 2 is set
+ * durations: uint16 per waypoint, unless flags bit 3 (constant duration)
+ * tool values: int16 per waypoint when there is a tool column, INT16_MIN
+ *         leaves the tool
+ */
+void Controller::expand_compact_move_batch(Message *batch,
+                                           std::queue<Message *> *queue) {
+    const uint8_t *payload = reinterpret_cast<const uint8_t *>(batch->get_args());
+    size_t size = batch->get_num_args() * sizeof(float);
+    const size_t header_size = 16;
+    int32_t num_joints = static_cast<int32_t>(this->joints.size());
+    if (size < header_size + num_joints * sizeof(float)) {
+        std::cout << "Invalid compact move batch" << std::endl;
+        return;
+    }
+
+    uint16_t num_waypoints;
+    float angle_scale, duration_value, tool_scale;
+    memcpy(&num_waypoints, payload, sizeof(num_waypoints));
+    uint8_t stride = payload[2];
+    uint8_t flags = payload[3];
+    memcpy(&angle_scale, payload + 4, sizeof(float));
+    memcpy(&duration_value, payload + 8, sizeof(float));
+    memcpy(&tool_scale, payload + 12, sizeof(float));
+
+    uint8_t width = flags & 0b11;
+    bool delta = flags & 0b100;
+    bool constant_duration = flags & 0b1000;
+    bool tool_column = stride == num_joints + 2;
+    size_t int_size = static_cast<size_t>(1) << width;
+    size_t angles_offset = header_size + num_joints * sizeof(float);
+    size_t durations_offset =
+        angles_offset + num_waypoints * num_joints * int_size;
+    size_t tools_offset =
+        durations_offset + (constant_duration ? 0 : 2 * num_waypoints);
+    size_t end = tools_offset + (tool_column ? 2 * num_waypoints : 0);
+    if ((stride != num_joints + 1 && !tool_column) || width > 2 ||
+        end > size) {
+        std::cout << "Invalid compact move batch" << std::endl;
+        return;
+    }
+
+    std::vector<float> reference(num_joints);
+    memcpy(reference.data(), payload + header_size, num_joints * sizeof(float));
+    std::vector<int64_t> position(num_joints, 0);
+    for (uint16_t k = 0; k < num_waypoints; k++) {
+        int16_t tool_raw = INT16_MIN;
+        if (tool_column) {
+            memcpy(&tool_raw, payload + tools_offset + 2 * k, sizeof(tool_raw));
+        }
+        bool with_tool = tool_raw != INT16_MIN;
+        int32_t move_size = with_tool ? num_joints + 2 : num_joints + 1;
+        float *move_args =
+            static_cast<float *>(malloc(move_size * sizeof(float)));
+
+        for (int32_t j = 0; j < num_joints; j++) {
+            int32_t value = read_fixed_point(
+                payload + angles_offset + (k * num_joints + j) * int_size, width);
+            position[j] = delta ? position[j] + value : value;
+            move_args[j] = static_cast<float>(
+                reference[j] + static_cast<double>(position[j]) * angle_scale);
+        }
+        if (constant_duration) {
+            move_args[num_joints] = duration_value;
+        } else {
+            uint16_t duration_raw;
+            memcpy(&duration_raw, payload + durations_offset + 2 * k,
+                   sizeof(duration_raw));
+            move_args[num_joints] = duration_raw * duration_value;
+        }
+        if (with_tool) {
+            move_args[num_joints + 1] = tool_raw * tool_scale;
+        }
+        queue->push(new Message(MessageOp::MOVE, with_tool ? 17 : 15, move_size,
+                                move_args));
+    }
+}
+
 bool Controller::is_homed() {
     if (this->homed) {
         return true;
@@ -206,6 +414,9 @@ void Controller::handle_messages() {
             (this->*handler)(msg);
             if (msg->is_complete()) {
                 message_queue->pop();
+                if (msg->get_sequence() >= 0) {
+                    this->send_command_done(msg->get_sequence(), true);
+                }
                 delete msg;
             }
         }
@@ -328,6 +539,54 @@ void Controller::message_handler_move(Message *message) {
                 }
             }
         } break;
+        case 15: {  // Move Joints in a given time, args: angles..., duration
+            int num_joints = num_args - 1;
+            if (!called) {
+                float duration = args[num_joints];
+                for (int i = 0; i < num_joints; i++) {
+                    this->joints[i]->set_target_angle(args[i], duration);
+                }
+                message->set_called(true);
+            } else {
+                bool all_at_target = true;
+                for (int i = 0; i < num_joints; i++) {
+                    all_at_target &= this->joints[i]->at_target();
+                    if (!all_at_target) {
+                        break;
+                    }
+                }
+
+                if (all_at_target) {
+                    message->set_complete(true);
+                }
+            }
+        } break;
+        case 17: {  // Timed move with a tool target, args: angles...,
+                    // duration, tool value. The tool is not waited for, it
+                    // keeps moving during the next moves.
+            int num_joints = num_args - 2;
+            if (!called) {
+                float duration = args[num_joints];
+                for (int i = 0; i < num_joints; i++) {
+                    this->joints[i]->set_target_angle(args[i], duration);
+                }
+                this->tool->get_movement_driver()->set_target_angle(
+                    args[num_joints + 1]);
+                message->set_called(true);
+            } else {
+                bool all_at_target = true;
+                for (int i = 0; i < num_joints; i++) {
+                    all_at_target &= this->joints[i]->at_target();
+                    if (!all_at_target) {
+                        break;
+                    }
+                }
+
+                if (all_at_target) {
+                    message->set_complete(true);
+                }
+            }
+        } break;
         default:
             break;
     }
@@ -380,8 +639,13 @@ void Controller::message_handler_status(Message *message) {
                 msg->set_complete(true);
                 msg->set_called(true);
                 move_queue->pop();
+                if (msg->get_sequence() >= 0) {
+                    this->send_command_done(msg->get_sequence(), false);
+                }
                 delete msg;
             }
+            // The moves of a command not marked yet are gone too
+            this->moves_since_mark = 0;
 
             for (uint8_t i = 0; i < this->joints.size(); i++) {
                 float current_angle = this->joints[i]->get_current_angle();
@@ -650,6 +914,36 @@ void Controller::message_handler_config(Message *message) {
 
         } break;
 
+        case 37: {  // set acceleration rad/s^2
+            uint8_t joint_idx = static_cast<uint8_t>(args[0]);
+            MovementDriver *movement_driver =
+                this->joints[joint_idx]->get_movement_driver();
+
+            movement_driver->set_acceleration(args[1]);
+        } break;
+        case 39: {  // get acceleration rad/s^2
+            uint8_t joint_idx = static_cast<uint8_t>(args[0]);
+            MovementDriver *movement_driver =
+                this->joints[joint_idx]->get_movement_driver();
+            float *args_buff = static_cast<float *>(malloc(2 * sizeof(float)));
+            args_buff[0] = args[0];
+            args_buff[1] = movement_driver->get_acceleration();
+            Message *config_message =
+                new Message(MessageOp::CONFIG, 40, 2, args_buff);
+            this->arm_client.send_message(config_message);
+            delete config_message;
+        } break;
+
+        case 41: {  // get link features: 1 = MOVE 19 batches, 2 = MOVE 21
+                    // compact batches, 4 = MOVE 23 sequenced commands
+            float *args_buff = static_cast<float *>(malloc(sizeof(float)));
+            args_buff[0] = 1 | 2 | 4;
+            Message *config_message =
+                new Message(MessageOp::CONFIG, 42, 1, args_buff);
+            this->arm_client.send_message(config_message);
+            delete config_message;
+        } break;
+
         default:
             break;
     }
@@ -40,6 +40,9 @@ class Controller {
 
     bool homed = false;
     bool stop_flag = false;
+    // Moves queued since the last sequence mark, the moves of the next
+    // marked command
+    uint32_t moves_since_mark = 0;
 
 #ifndef ESP_PLATFORM
     std::thread *step_thread = nullptr;
@@ -53,6 +56,11 @@ class Controller {
     void stop(int signum);
     void step();
     bool recieve_message();
+    void expand_move_batch(Message *batch, std::queue<Message *> *queue);
+    void expand_compact_move_batch(Message *batch,
+                                   std::queue<Message *> *queue);
+    void mark_command(Message *mark, std::queue<Message *> *queue);
+    void send_command_done(uint32_t sequence, bool completed);
     void handle_messages();
     void run_step_task();
     void stop_step_task();
@@ -25,6 +25,7 @@ class Joint {
     EndStop* get_end_stop();
 
     float set_target_angle(float target_angle);
+    float set_target_angle(float target_angle, float duration);
     float get_target_angle();
     float get_current_angle();
 
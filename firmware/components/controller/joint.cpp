@@ -23,6 +23,11 @@ float Joint::set_target_angle(float target_angle) {
     return this->movement_driver->get_target_angle();
 }
 
+float Joint::set_target_angle(float target_angle, float duration) {
+    this->movement_driver->set_target_angle(target_angle, duration);
+    return this->movement_driver->get_target_angle();
+}
+
 float Joint::get_target_angle() {
     return this->movement_driver->get_target_angle();
 }
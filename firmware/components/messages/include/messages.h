@@ -17,6 +17,8 @@ class Message {
     float* args;
     bool complete = false;
     bool called = false;
+    int64_t sequence = -1;  // uint32 sequence number of the command it
+                            // ends, -1 if none
 
    public:
     static const uint8_t HEADER_SIZE = sizeof(char) + sizeof(int32_t) * 2;
@@ -38,6 +40,8 @@ class Message {
     bool was_called();
     bool set_called(bool called);
     void set_complete(bool complete);
+    int64_t get_sequence();
+    void set_sequence(int64_t sequence);
     static int parse_headers(char* message_bytes, MessageOp* op, int32_t* code,
                              int32_t* num_args);
     static MessageOp get_op_from_char(char op);
@@ -85,6 +85,10 @@ bool Message::set_called(bool called) {
 
 void Message::set_complete(bool complete) { this->complete = complete; }
 
+int64_t Message::get_sequence() { return this->sequence; }
+
+void Message::set_sequence(int64_t sequence) { this->sequence = sequence; }
+
 int Message::parse_headers(char *message_bytes, MessageOp *op, int32_t *code,
                            int32_t *num_args) {
     char op_char = message_bytes[0];
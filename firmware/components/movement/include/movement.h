@@ -24,6 +24,7 @@ class MovementDriver {
     float target_angle = 0;
     float speed = 0.1;  // rad per second
     float prev_speed = 0.1;
+    float acceleration = 1.0;  // rad per second^2, used by the host planner
 
     uint64_t last_step_time = 0;
     uint32_t step_interval = 0;
@@ -39,6 +40,7 @@ class MovementDriver {
 
    public:
     void set_target_angle(float angle);
+    void set_target_angle(float angle, float duration);
     void set_current_angle(float angle);
     float get_current_angle();
     float get_target_angle();
@@ -47,6 +49,8 @@ class MovementDriver {
     void set_speed(float speed);
     void update_speed();
     float get_speed();
+    void set_acceleration(float acceleration);
+    float get_acceleration();
     int64_t angle_to_steps(float angle);
     float steps_to_angle(int64_t steps);
     int8_t get_dir_inverted();
@@ -5,10 +5,27 @@
 #include "utils.h"
 
 void MovementDriver::set_target_angle(float angle) {
+    this->update_speed();  // drop the speed of a previous timed target
     this->last_step_time = get_current_time_microseconds();
     this->target_angle = angle;
 }
 
+void MovementDriver::set_target_angle(float angle, float duration) {
+    this->update_speed();
+    this->last_step_time = get_current_time_microseconds();
+    this->target_angle = angle;
+    if (duration <= 0) {
+        return;
+    }
+    // Spread the steps over the duration, never faster than the configured
+    // speed
+    int64_t steps = std::max(
+        (int64_t)1,
+        this->angle_to_steps(std::abs(angle - this->current_angle)));
+    uint32_t timed_interval = duration * 1000000.0 / (float)steps;
+    this->step_interval = std::max(this->step_interval, timed_interval);
+}
+
 void MovementDriver::set_current_angle(float angle) {
     this->current_angle = angle;
     this->current_steps = this->angle_to_steps(angle);
@@ -69,6 +86,12 @@ void MovementDriver::print_state() {
 
 float MovementDriver::get_speed() { return this->speed; }
 
+void MovementDriver::set_acceleration(float acceleration) {
+    this->acceleration = acceleration;
+}
+
+float MovementDriver::get_acceleration() { return this->acceleration; }
+
 int64_t MovementDriver::angle_to_steps(float angle) {
     return static_cast<int64_t>(angle / (2 * PI) * this->steps_per_revolution);
 }